@@ -0,0 +1,69 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases bootstrapped by init_db() already have these tables, so the
+    # baseline only creates what is missing.
+    op.create_table(
+        'experiment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=True),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('goal_metric', sa.String(length=50), nullable=True),
+        sa.Column('desired_outcome', sa.String(length=50), nullable=True),
+        sa.Column('null_hypothesis', sa.String(length=50), nullable=True),
+        sa.Column('alternative_hypothesis', sa.String(length=50), nullable=True),
+        sa.Column('sample_size_group_a', sa.Integer(), nullable=True),
+        sa.Column('sample_size_group_b', sa.Integer(), nullable=True),
+        sa.Column('significance_level', sa.Float(), nullable=True),
+        sa.Column('power', sa.Float(), nullable=True),
+        sa.Column('bias_control_method', sa.String(length=50), nullable=True),
+        sa.Column('identified_confounders', sa.String(length=50), nullable=True),
+        sa.Column('success_metrics', sa.String(length=50), nullable=True),
+        sa.Column('experiment_type', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'experiment_data',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('experiment_id', sa.Integer(), nullable=True),
+        sa.Column('variant', sa.String(length=50), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('conversion', sa.Boolean(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=True),
+        sa.Column('engagement_minutes', sa.Float(), nullable=True),
+        sa.Column('additional_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('user_id', sa.String(length=50), nullable=True),
+        sa.Column('session_id', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['experiment_id'], ['experiment.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('experiment_data')
+    op.drop_table('experiment')
@@ -0,0 +1,63 @@
+"""add variant_rollup table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'variant_rollup',
+        sa.Column('experiment_id', sa.Integer(), nullable=False),
+        sa.Column('variant', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.Column('conversions', sa.BigInteger(), nullable=False),
+        sa.Column('revenue_sum', sa.Float(), nullable=False),
+        sa.Column('revenue_sq_sum', sa.Float(), nullable=False),
+        sa.Column('engagement_sum', sa.Float(), nullable=False),
+        sa.Column('engagement_sq_sum', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['experiment_id'], ['experiment.id']),
+        sa.PrimaryKeyConstraint('experiment_id', 'variant'),
+        if_not_exists=True,
+    )
+    # Backfill from existing raw data.
+    op.execute(
+        """
+        INSERT INTO variant_rollup (
+            experiment_id, variant, count, conversions,
+            revenue_sum, revenue_sq_sum, engagement_sum, engagement_sq_sum, updated_at
+        )
+        SELECT
+            experiment_id,
+            variant,
+            count(*),
+            sum(CASE WHEN conversion THEN 1 ELSE 0 END),
+            sum(coalesce(revenue, 0.0)),
+            sum(coalesce(revenue, 0.0) * coalesce(revenue, 0.0)),
+            sum(coalesce(engagement_minutes, 0.0)),
+            sum(coalesce(engagement_minutes, 0.0) * coalesce(engagement_minutes, 0.0)),
+            now()
+        FROM experiment_data
+        WHERE experiment_id IS NOT NULL
+        GROUP BY experiment_id, variant
+        ON CONFLICT (experiment_id, variant) DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('variant_rollup')
@@ -0,0 +1,31 @@
+"""add (experiment_id, timestamp) index to experiment_data
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_experiment_data_experiment_id_timestamp',
+        'experiment_data',
+        ['experiment_id', 'timestamp'],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_experiment_data_experiment_id_timestamp', table_name='experiment_data')
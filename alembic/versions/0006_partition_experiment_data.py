@@ -0,0 +1,122 @@
+"""partition experiment_data by month on timestamp (DB_PARTITION_EVENTS)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 15:30:00.000000
+
+"""
+import os
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Secondary indexes of experiment_data as of this revision.
+INDEXES = (
+    ('ix_experiment_data_experiment_id_variant', 'experiment_id, variant'),
+    ('ix_experiment_data_experiment_id_id', 'experiment_id, id'),
+    ('ix_experiment_data_experiment_id_timestamp', 'experiment_id, timestamp'),
+)
+
+# The helpers below are copies of app.db.partitions as of this revision, so that
+# later changes to the application cannot change what this migration does.
+PARENT_TABLE = 'experiment_data'
+DEFAULT_PARTITION = 'experiment_data_default'
+
+
+def _env_bool(name: str) -> bool:
+    return os.getenv(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def _is_partitioned(conn) -> bool:
+    return bool(conn.execute(sa.text(
+        'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))'
+    ), {'table': PARENT_TABLE}).scalar())
+
+
+def _create_default_partition(conn) -> None:
+    conn.execute(sa.text(f'CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT'))
+
+
+def _create_partition(conn, month: date) -> None:
+    name = f'{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}'
+    if conn.execute(sa.text('SELECT to_regclass(:name)'), {'name': name}).scalar() is not None:
+        return
+    start = datetime.combine(month, datetime.min.time())
+    end = datetime.combine(_add_months(month, 1), datetime.min.time())
+    conn.execute(sa.text(f'CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)'))
+    conn.execute(sa.text(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+        f'WHERE timestamp >= :start AND timestamp < :end RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved'
+    ), {'start': start, 'end': end})
+    conn.execute(sa.text(
+        f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+def _ensure_partitions(conn, months_ahead: int, first_month) -> None:
+    # Monthly partitions from the oldest event's month through months_ahead months from now.
+    today = datetime.now()
+    current = date(today.year, today.month, 1)
+    month = date(first_month.year, first_month.month, 1) if first_month is not None else current
+    while month <= _add_months(current, months_ahead):
+        _create_partition(conn, month)
+        month = _add_months(month, 1)
+
+
+def _rebuild(old_name: str, partitioned: bool) -> None:
+    # Move experiment_data aside, recreate it (partitioned or not) with the
+    # same columns and id sequence, then copy the rows across.
+    for name, _ in INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    op.execute(f'ALTER TABLE experiment_data RENAME TO {old_name}')
+    op.execute(f'ALTER TABLE {old_name} RENAME CONSTRAINT experiment_data_pkey TO {old_name}_pkey')
+    op.execute(f'ALTER TABLE {old_name} DROP CONSTRAINT IF EXISTS experiment_data_experiment_id_fkey')
+
+    op.execute(
+        f'CREATE TABLE experiment_data (LIKE {old_name} INCLUDING DEFAULTS)'
+        + (' PARTITION BY RANGE (timestamp)' if partitioned else '')
+    )
+    # A partitioned table's primary key must include the partition key.
+    op.execute(f'ALTER TABLE experiment_data ADD PRIMARY KEY ({"id, timestamp" if partitioned else "id"})')
+    op.execute('ALTER TABLE experiment_data ADD FOREIGN KEY (experiment_id) REFERENCES experiment (id)')
+    for name, columns in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON experiment_data ({columns})')
+    op.execute('ALTER SEQUENCE experiment_data_id_seq OWNED BY experiment_data.id')
+
+    if partitioned:
+        bind = op.get_bind()
+        first = bind.execute(sa.text(f'SELECT min(timestamp) FROM {old_name}')).scalar()
+        _create_default_partition(bind)
+        _ensure_partitions(bind, int(os.getenv('DB_PARTITION_MONTHS_AHEAD', '3')), first_month=first)
+
+    op.execute(f'INSERT INTO experiment_data SELECT * FROM {old_name}')
+    op.execute(f'DROP TABLE {old_name}')
+
+
+def upgrade() -> None:
+    # Partitioning is opt-in; without DB_PARTITION_EVENTS this revision is a no-op.
+    if not _env_bool('DB_PARTITION_EVENTS') or _is_partitioned(op.get_bind()):
+        return
+    _rebuild('experiment_data_unpartitioned', partitioned=True)
+
+
+def downgrade() -> None:
+    if not _is_partitioned(op.get_bind()):
+        return
+    _rebuild('experiment_data_partitioned', partitioned=False)
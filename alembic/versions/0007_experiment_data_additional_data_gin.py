@@ -0,0 +1,34 @@
+"""add GIN index on experiment_data.additional_data
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 16:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # jsonb_path_ops only supports containment (@>), but is smaller and faster than the default opclass.
+    op.create_index(
+        'ix_experiment_data_additional_data',
+        'experiment_data',
+        ['additional_data'],
+        postgresql_using='gin',
+        postgresql_ops={'additional_data': 'jsonb_path_ops'},
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_experiment_data_additional_data', table_name='experiment_data')
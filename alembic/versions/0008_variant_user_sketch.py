@@ -0,0 +1,41 @@
+"""add variant_user_sketch table
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # No backfill: user_id was never written before this revision. Events loaded
+    # out of band can be sketched with `python -m app.db.user_sketches rebuild`.
+    op.create_table(
+        'variant_user_sketch',
+        sa.Column('experiment_id', sa.Integer(), nullable=False),
+        sa.Column('variant', sa.String(length=50), nullable=False),
+        sa.Column('bucket', sa.Date(), nullable=False),
+        sa.Column('users', sa.LargeBinary(), nullable=False),
+        sa.Column('converters', sa.LargeBinary(), nullable=False),
+        sa.Column('events', sa.BigInteger(), nullable=False),
+        sa.Column('revenue_sum', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['experiment_id'], ['experiment.id']),
+        sa.PrimaryKeyConstraint('experiment_id', 'variant', 'bucket'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('variant_user_sketch')
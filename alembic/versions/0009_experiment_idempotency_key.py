@@ -0,0 +1,45 @@
+"""add idempotency key to experiment and widen its free-text columns
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns that hold sentences, now that creation persists them.
+WIDENED_COLUMNS = ('desired_outcome', 'null_hypothesis', 'alternative_hypothesis', 'identified_confounders')
+
+
+def upgrade() -> None:
+    for column in WIDENED_COLUMNS:
+        op.alter_column('experiment', column, type_=sa.String(length=255), existing_type=sa.String(length=50))
+    op.add_column('experiment', sa.Column('idempotency_key', sa.String(length=100), nullable=True))
+    op.add_column('experiment', sa.Column('request_fingerprint', sa.String(length=64), nullable=True))
+    op.create_index(
+        'ix_experiment_idempotency_key',
+        'experiment',
+        ['idempotency_key'],
+        unique=True,
+        postgresql_where=sa.text('idempotency_key IS NOT NULL'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_experiment_idempotency_key', table_name='experiment')
+    op.drop_column('experiment', 'request_fingerprint')
+    op.drop_column('experiment', 'idempotency_key')
+    # Fails if longer values have been stored since the upgrade.
+    for column in WIDENED_COLUMNS:
+        op.alter_column('experiment', column, type_=sa.String(length=50), existing_type=sa.String(length=255))
@@ -0,0 +1,33 @@
+"""add partial index on active experiments
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every read filters on deleted_at IS NULL; the partial index holds active experiments only, in id order.
+    op.create_index(
+        'ix_experiment_active_id',
+        'experiment',
+        ['id'],
+        postgresql_where=sa.text('deleted_at IS NULL'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_experiment_active_id', table_name='experiment')
@@ -0,0 +1,48 @@
+"""add sequential_state table
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # No backfill: the state of existing experiments is created from their rollups
+    # on the next ingestion batch or the first read of the sequential endpoint.
+    op.create_table(
+        'sequential_state',
+        sa.Column('experiment_id', sa.Integer(), nullable=False),
+        sa.Column('variant', sa.String(length=50), nullable=False),
+        sa.Column('metric', sa.String(length=50), nullable=False),
+        sa.Column('control', sa.String(length=50), nullable=False),
+        sa.Column('n', sa.BigInteger(), nullable=False),
+        sa.Column('control_n', sa.BigInteger(), nullable=False),
+        sa.Column('difference', sa.Float(), nullable=True),
+        sa.Column('log_likelihood_ratio', sa.Float(), nullable=True),
+        sa.Column('p_value', sa.Float(), nullable=True),
+        sa.Column('ci_lower', sa.Float(), nullable=True),
+        sa.Column('ci_upper', sa.Float(), nullable=True),
+        sa.Column('alpha', sa.Float(), nullable=False),
+        sa.Column('decision', sa.String(length=20), nullable=False),
+        sa.Column('decided_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['experiment_id'], ['experiment.id']),
+        sa.PrimaryKeyConstraint('experiment_id', 'variant', 'metric'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sequential_state')
@@ -0,0 +1,43 @@
+"""add variant weights and assignment salt to experiment
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('experiment', sa.Column('variant_weights', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('experiment', sa.Column('assignment_salt', sa.String(length=32), nullable=True))
+    # Existing experiments split traffic evenly over the variants they have data for.
+    op.execute(
+        """
+        UPDATE experiment
+        SET variant_weights = weights.variant_weights
+        FROM (
+            SELECT experiment_id, jsonb_object_agg(variant, 1.0) AS variant_weights
+            FROM variant_rollup
+            GROUP BY experiment_id
+        ) AS weights
+        WHERE experiment.id = weights.experiment_id
+        """
+    )
+    op.execute("UPDATE experiment SET assignment_salt = substr(md5(random()::text || id::text), 1, 16)")
+
+
+def downgrade() -> None:
+    op.drop_column('experiment', 'assignment_salt')
+    op.drop_column('experiment', 'variant_weights')
@@ -0,0 +1,40 @@
+"""record the event rows created with a keyed experiment
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('experiment', sa.Column('created_data_ids', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    # Keyed experiments created so far were replayed by matching creation times; record what that matched.
+    op.execute(
+        """
+        UPDATE experiment
+        SET created_data_ids = COALESCE((
+            SELECT jsonb_agg(experiment_data.id ORDER BY experiment_data.id)
+            FROM experiment_data
+            WHERE experiment_data.experiment_id = experiment.id
+              AND experiment_data.created_at = experiment.created_at
+        ), '[]'::jsonb)
+        WHERE idempotency_key IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('experiment', 'created_data_ids')
@@ -0,0 +1,298 @@
+# This file computes bootstrap confidence intervals for revenue and engagement across a process pool.
+
+import array
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.analysis.significance import json_safe
+from app.config import settings
+from app.db.models import ExperimentData
+
+# Metrics resampled, in row order of `SampleSet.values`.
+METRICS = ("revenue", "engagement_minutes")
+
+# Resamples per task. Fixed, so a given seed gives the same result whatever the worker count.
+RESAMPLES_PER_CHUNK = 250
+
+# Cap on the resample index/count matrices built at once inside a worker (elements, 8 bytes each).
+MAX_INDEX_ELEMENTS = 2_000_000
+
+# Rows fetched per round trip when loading samples.
+LOAD_BATCH_SIZE = 50_000
+
+_executor = None
+
+
+@dataclass
+class SampleSet:
+    """
+    Raw metric values for an experiment, grouped by variant.
+
+    Attributes:
+        variants (List[str]): Variant names, sorted by code point.
+        offsets (ndarray): Start of each variant's slice in `values`, plus the total length; shape (k + 1,).
+        values (ndarray): Metric values, shape (len(METRICS), total events).
+    """
+    variants: List[str]
+    offsets: np.ndarray
+    values: np.ndarray
+
+
+def load_samples(db: Session, experiment_id: int) -> SampleSet:
+    """
+    Loads revenue and engagement for every event of an experiment into contiguous arrays.
+
+    Only the three needed columns are fetched, grouped by variant, and
+    streamed in batches without building ORM objects.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The experiment to load.
+
+    Returns:
+        SampleSet: The values grouped by variant.
+    """
+    stmt = (
+        select(
+            ExperimentData.variant,
+            func.coalesce(ExperimentData.revenue, 0.0),
+            func.coalesce(ExperimentData.engagement_minutes, 0.0),
+        )
+        .where(ExperimentData.experiment_id == experiment_id)
+        # id makes the row order, and so the resamples for a given seed, reproducible.
+        .order_by(ExperimentData.variant, ExperimentData.id)
+        .execution_options(yield_per=LOAD_BATCH_SIZE)
+    )
+    variants, offsets = [], []
+    revenue, engagement = array.array("d"), array.array("d")
+    for variant, revenue_value, engagement_value in db.execute(stmt):
+        if not variants or variants[-1] != variant:
+            variants.append(variant)
+            offsets.append(len(revenue))
+        revenue.append(revenue_value)
+        engagement.append(engagement_value)
+    offsets.append(len(revenue))
+
+    values = np.vstack([np.frombuffer(revenue, dtype=np.float64), np.frombuffer(engagement, dtype=np.float64)])
+    return sort_variants(SampleSet(variants=variants, offsets=np.asarray(offsets, dtype=np.int64), values=values))
+
+
+def sort_variants(samples: SampleSet) -> SampleSet:
+    """
+    Puts the variant slices of a sample set in Python string order.
+
+    The database groups variants in its collation order, which can differ from
+    code point order (case, accents). Snapshots sort in Python, so samples read
+    either way must too for a seed to give the same resamples.
+    """
+    order = sorted(range(len(samples.variants)), key=samples.variants.__getitem__)
+    if order == list(range(len(order))):
+        return samples
+    sizes = np.diff(samples.offsets)[order]
+    values = np.concatenate(
+        [samples.values[:, samples.offsets[index]:samples.offsets[index + 1]] for index in order], axis=1,
+    )
+    return SampleSet(
+        variants=[samples.variants[index] for index in order],
+        offsets=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+        values=values,
+    )
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Returns the shared bootstrap process pool, creating it on first use.
+
+    Workers are started with forkserver so they never inherit the server's
+    threads or open database connections.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.bootstrap_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def _resample_chunk(shm_name: str, shape: tuple, offsets: np.ndarray, n_resamples: int, seed) -> np.ndarray:
+    """
+    Worker task: draws `n_resamples` bootstrap means per variant and metric.
+
+    The values are read in place from shared memory; nothing but the
+    resulting means crosses the process boundary.
+
+    Returns:
+        ndarray: Resampled means, shape (k, len(METRICS), n_resamples).
+    """
+    shm = SharedMemory(name=shm_name)
+    values = segment = None
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        rng = np.random.default_rng(seed)
+        means = np.empty((len(offsets) - 1, shape[0], n_resamples))
+        for variant in range(len(offsets) - 1):
+            start, end = offsets[variant], offsets[variant + 1]
+            segment = values[:, start:end]
+            size = end - start
+            step = max(1, MAX_INDEX_ELEMENTS // size)
+            for first in range(0, n_resamples, step):
+                last = min(n_resamples, first + step)
+                indices = rng.integers(0, size, size=(last - first, size))
+                # Turn each resample's indices into per-event draw counts, so all
+                # metrics' resampled sums become one matrix product instead of a
+                # random-access gather per metric.
+                counts = np.empty((last - first, size))
+                for row, draw in enumerate(indices):
+                    counts[row] = np.bincount(draw, minlength=size)
+                means[variant, :, first:last] = (segment @ counts.T) / size
+        return means
+    finally:
+        # Views must be released before the mapping can be closed.
+        values = segment = None
+        shm.close()
+
+
+def bootstrap_means(samples: SampleSet, n_resamples: int, seed: Optional[int] = None,
+                    cancel_event: Optional[threading.Event] = None) -> np.ndarray:
+    """
+    Resamples each variant's events with replacement and returns the resampled means.
+
+    The values are copied once into a shared memory block and the resamples are
+    split into fixed-size chunks, each run by a worker process with its own
+    child seed spawned from `seed`.
+
+    Args:
+        samples (SampleSet): The experiment's values.
+        n_resamples (int): Number of bootstrap resamples.
+        seed (Optional[int]): Seed for reproducible results.
+        cancel_event (Optional[threading.Event]): When set, pending chunks are dropped and CancelledError is raised.
+
+    Returns:
+        ndarray: Resampled means, shape (k, len(METRICS), n_resamples).
+    """
+    shape = samples.values.shape
+    shm = SharedMemory(create=True, size=max(1, samples.values.nbytes))
+    try:
+        shared = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        shared[:] = samples.values
+        del shared
+
+        chunk_sizes = [
+            min(RESAMPLES_PER_CHUNK, n_resamples - first)
+            for first in range(0, n_resamples, RESAMPLES_PER_CHUNK)
+        ]
+        seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+        executor = get_executor()
+        futures = [
+            executor.submit(_resample_chunk, shm.name, shape, samples.offsets, size, child_seed)
+            for size, child_seed in zip(chunk_sizes, seeds)
+        ]
+        try:
+            return np.concatenate([_wait(future, cancel_event) for future in futures], axis=2)
+        finally:
+            for future in futures:
+                future.cancel()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _wait(future, cancel_event: Optional[threading.Event]):
+    if cancel_event is None:
+        return future.result()
+    while True:
+        if cancel_event.is_set():
+            raise CancelledError()
+        try:
+            return future.result(timeout=0.1)
+        except TimeoutError:
+            continue
+
+
+def _interval(distribution: np.ndarray, confidence: float):
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(distribution, [tail, 100 - tail], axis=-1)
+
+
+def analyze_bootstrap(samples: SampleSet, control: Optional[str] = None, n_resamples: int = 1000,
+                      seed: Optional[int] = None, confidence: float = 0.95,
+                      cancel_event: Optional[threading.Event] = None) -> dict:
+    """
+    Computes percentile bootstrap intervals for each variant's mean and for its difference and lift against the control.
+
+    Args:
+        samples (SampleSet): The experiment's values.
+        control (Optional[str]): Control variant; defaults to the first variant in sort order.
+        n_resamples (int): Number of bootstrap resamples.
+        seed (Optional[int]): Seed for reproducible results.
+        confidence (float): Interval coverage, e.g. 0.95.
+        cancel_event (Optional[threading.Event]): Stops the resampling early when set.
+
+    Returns:
+        dict: Per-variant, per-metric point estimates and intervals.
+
+    Raises:
+        KeyError: If `control` is not one of the variants.
+    """
+    variants = samples.variants
+    control = control if control is not None else sorted(variants)[0]
+    if control not in variants:
+        raise KeyError(control)
+    control_index = variants.index(control)
+
+    distribution = bootstrap_means(samples, n_resamples, seed, cancel_event=cancel_event)
+    observed = np.array([
+        samples.values[:, samples.offsets[i]:samples.offsets[i + 1]].mean(axis=-1)
+        for i in range(len(variants))
+    ])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        difference = distribution - distribution[[control_index]]
+        lift = distribution / distribution[[control_index]] - 1
+        mean_low, mean_high = _interval(distribution, confidence)
+        diff_low, diff_high = _interval(difference, confidence)
+        lift_low, lift_high = _interval(lift, confidence)
+        # Two-sided bootstrap p-value for "no difference".
+        p_value = np.minimum(1.0, 2 * np.minimum((difference <= 0).mean(axis=-1), (difference >= 0).mean(axis=-1)))
+        observed_lift = observed / observed[[control_index]] - 1
+
+    results = {}
+    for v, variant in enumerate(variants):
+        results[variant] = {"n": int(samples.offsets[v + 1] - samples.offsets[v])}
+        for m, metric in enumerate(METRICS):
+            entry = {
+                "mean": json_safe(observed[v, m]),
+                "mean_ci": [json_safe(mean_low[v, m]), json_safe(mean_high[v, m])],
+            }
+            if v != control_index:
+                entry.update(
+                    difference=json_safe(observed[v, m] - observed[control_index, m]),
+                    difference_ci=[json_safe(diff_low[v, m]), json_safe(diff_high[v, m])],
+                    lift=json_safe(observed_lift[v, m]),
+                    lift_ci=[json_safe(lift_low[v, m]), json_safe(lift_high[v, m])],
+                    p_value=json_safe(p_value[v, m]),
+                )
+            results[variant][metric] = entry
+
+    return {
+        "control": control,
+        "resamples": n_resamples,
+        "seed": seed,
+        "confidence": confidence,
+        "variants": results,
+    }
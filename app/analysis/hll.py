@@ -0,0 +1,88 @@
+# This file implements HyperLogLog sketches for approximate distinct-user counts.
+
+import hashlib
+from typing import Iterable, Optional
+import numpy as np
+
+# 2**14 one-byte registers per sketch: 16 KiB, about 0.8% standard error.
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_STANDARD_ERROR = 1.04 / np.sqrt(HLL_REGISTERS)
+
+_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+
+def hash_values(values: Iterable[str]) -> np.ndarray:
+    """
+    Hashes strings to 64-bit integers that are stable across processes and restarts.
+    """
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little") for value in values),
+        dtype=np.uint64,
+    )
+
+
+def _leading_zeros(words: np.ndarray) -> np.ndarray:
+    # Vectorized count of leading zero bits by binary search over the shift width.
+    words = words.copy()
+    zeros = np.zeros(words.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = words < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[empty] += shift
+        words[empty] <<= np.uint64(shift)
+    zeros[words == 0] = 64
+    return zeros
+
+
+def empty_sketch() -> np.ndarray:
+    return np.zeros(HLL_REGISTERS, dtype=np.uint8)
+
+
+def build_sketch(hashes: np.ndarray) -> np.ndarray:
+    """
+    Builds a sketch from 64-bit hashes, as returned by `hash_values`.
+
+    The top `HLL_PRECISION` bits pick the register; the register keeps the
+    highest rank (leading zeros + 1) seen in the remaining bits.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.intp)
+    rest = hashes << np.uint64(HLL_PRECISION)
+    rank = np.minimum(_leading_zeros(rest) + 1, 64 - HLL_PRECISION + 1).astype(np.uint8)
+    registers = empty_sketch()
+    np.maximum.at(registers, index, rank)
+    return registers
+
+
+def merge(*sketches: np.ndarray) -> np.ndarray:
+    """
+    Merges sketches; the result counts the union of their values.
+    """
+    return np.maximum.reduce(sketches) if sketches else empty_sketch()
+
+
+def estimate(registers: np.ndarray) -> float:
+    """
+    Estimates the number of distinct values added to a sketch.
+
+    Uses linear counting while registers are still empty, which is exact
+    enough for small counts where the raw estimate is biased.
+    """
+    raw = _ALPHA * HLL_REGISTERS ** 2 / np.sum(np.exp2(-registers.astype(np.float64)))
+    empty = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * HLL_REGISTERS and empty:
+        return HLL_REGISTERS * np.log(HLL_REGISTERS / empty)
+    return float(raw)
+
+
+def to_bytes(registers: np.ndarray) -> bytes:
+    return registers.astype(np.uint8).tobytes()
+
+
+def from_bytes(data: Optional[bytes]) -> np.ndarray:
+    """
+    Loads a sketch stored with `to_bytes`; missing or empty data is an empty sketch.
+    """
+    if not data:
+        return empty_sketch()
+    return np.frombuffer(data, dtype=np.uint8).copy()
@@ -0,0 +1,312 @@
+# This file runs long analyses in the background and caches their results by data version.
+
+import asyncio
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app.analysis.bootstrap import analyze_bootstrap
+from app.analysis.significance import analyze_significance
+from app.api.schemas import BootstrapParams, SignificanceParams
+from app.config import settings
+from app.db.aggregations import get_data_version, get_variant_stats
+from app.db.base import SessionLocal
+from app.db.models import BaseExperiment
+from app.db.snapshots import get_samples
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+# Cancellation was requested but the worker thread has not stopped yet; becomes "cancelled" once it has.
+CANCELLING = "cancelling"
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Longest `cancel` waits for a job to stop before reporting it as cancelling.
+CANCEL_WAIT_SECONDS = 0.5
+
+# Finished jobs kept for status lookups before the oldest are forgotten.
+MAX_FINISHED_JOBS = 1000
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when too many analyses are already waiting or running.
+    """
+
+
+@dataclass
+class Job:
+    """
+    One background analysis of an experiment.
+
+    Attributes:
+        id (str): Job identifier returned to the client.
+        experiment_id (int): The experiment analysed.
+        kind (str): The analysis, a key of `ANALYSES`.
+        params (BaseModel): Validated analysis parameters.
+        status (str): pending, running, cancelling, succeeded, failed or cancelled.
+        data_version (Optional[str]): Version of the data the result was computed from.
+        cached (bool): Whether the result came from the cache without running the analysis.
+        result (Optional[dict]): The analysis result once succeeded.
+        error (Optional[str]): The failure reason once failed.
+    """
+    id: str
+    experiment_id: int
+    kind: str
+    params: BaseModel
+    status: str = PENDING
+    data_version: Optional[str] = None
+    cached: bool = False
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "experiment_id": self.experiment_id,
+            "kind": self.kind,
+            "params": self.params.model_dump(),
+            "status": self.status,
+            "data_version": self.data_version,
+            "cached": self.cached,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def _levels(experiment: BaseExperiment):
+    alpha = experiment.significance_level if experiment.significance_level is not None else 0.05
+    power = experiment.power if experiment.power is not None else 0.80
+    return alpha, power
+
+
+def _run_significance(db: Session, experiment: BaseExperiment, params: SignificanceParams, cancel_event: threading.Event) -> dict:
+    variant_stats = get_variant_stats(db, experiment.id)
+    if not variant_stats:
+        raise LookupError("No experiment data found for the experiment")
+    alpha, power = _levels(experiment)
+    analysis = analyze_significance(variant_stats, control=params.control, alpha=alpha, power=power)
+    return {"significance_level": alpha, "power": power, **analysis}
+
+
+def _run_bootstrap(db: Session, experiment: BaseExperiment, params: BootstrapParams, cancel_event: threading.Event) -> dict:
+    samples = get_samples(db, experiment.id)
+    if not samples.variants:
+        raise LookupError("No experiment data found for the experiment")
+    alpha, _ = _levels(experiment)
+    # The samples are in memory; don't hold a pooled connection while resampling.
+    db.close()
+    return analyze_bootstrap(
+        samples, control=params.control, n_resamples=params.resamples, seed=params.seed,
+        confidence=1 - alpha, cancel_event=cancel_event,
+    )
+
+
+# Analyses available as background jobs: kind -> (parameter model, runner).
+ANALYSES = {
+    "significance": (SignificanceParams, _run_significance),
+    "bootstrap": (BootstrapParams, _run_bootstrap),
+}
+
+
+def parse_params(kind: str, params: dict) -> BaseModel:
+    """
+    Validates raw parameters against the analysis' parameter model.
+
+    Raises:
+        pydantic.ValidationError: If the parameters are invalid.
+    """
+    return ANALYSES[kind][0].model_validate(params)
+
+
+def _execute(job: Job):
+    """
+    Runs a job's analysis on a worker thread with its own session.
+
+    The data version is read before the data itself, so the result is never
+    cached under a version newer than the data it was computed from.
+
+    Returns:
+        tuple: (data_version, result).
+    """
+    db = SessionLocal()
+    try:
+        experiment = db.get(BaseExperiment, job.experiment_id)
+        if experiment is None or experiment.deleted_at is not None:
+            raise LookupError("Experiment not found")
+        data_version = get_data_version(db, job.experiment_id)
+        return data_version, ANALYSES[job.kind][1](db, experiment, job.params, job.cancel_event)
+    finally:
+        db.close()
+
+
+class JobManager:
+    """
+    Runs analyses as asyncio tasks on a bounded number of worker threads and caches their results.
+
+    Results are cached by (experiment, data version, kind, parameters), so a
+    repeated request against unchanged data is answered without running the
+    analysis again, and identical requests already in flight share one job.
+    All methods must be called from the event loop.
+
+    Attributes:
+        workers (int): Analyses that may run at once.
+        queue_size (int): Most jobs waiting or running before `submit` refuses new ones.
+        cache_size (int): Results kept in the LRU result cache.
+    """
+
+    def __init__(self, workers: int, queue_size: int, cache_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.cache_size = cache_size
+        self._semaphore = asyncio.Semaphore(workers)
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def cache_key(experiment_id: int, data_version: str, kind: str, params: BaseModel) -> tuple:
+        return experiment_id, data_version, kind, json.dumps(params.model_dump(), sort_keys=True)
+
+    def submit(self, experiment_id: int, kind: str, params: BaseModel, data_version: str) -> Job:
+        """
+        Returns a job for the analysis: finished if the result is cached, otherwise queued or already running.
+
+        Args:
+            experiment_id (int): The experiment to analyse.
+            kind (str): The analysis, a key of `ANALYSES`.
+            params (BaseModel): Parameters validated with `parse_params`.
+            data_version (str): The experiment's current data version, from `get_data_version`.
+
+        Returns:
+            Job: The job; its status is "succeeded" when served from the cache.
+
+        Raises:
+            JobQueueFull: If `queue_size` jobs are already waiting or running.
+        """
+        key = self.cache_key(experiment_id, data_version, kind, params)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            job = Job(
+                id=uuid.uuid4().hex, experiment_id=experiment_id, kind=kind, params=params,
+                status=SUCCEEDED, data_version=data_version, cached=True, result=self._cache[key],
+            )
+            job.finished_at = job.created_at
+            self._remember(job)
+            return job
+
+        if key in self._in_flight:
+            return self._jobs[self._in_flight[key]]
+        if len(self._in_flight) >= self.queue_size:
+            raise JobQueueFull()
+
+        job = Job(id=uuid.uuid4().hex, experiment_id=experiment_id, kind=kind, params=params)
+        self._remember(job)
+        self._in_flight[key] = job.id
+        job.task = asyncio.create_task(self._run(job, key))
+        return job
+
+    async def _run(self, job: Job, key: tuple):
+        try:
+            async with self._semaphore:
+                job.status = RUNNING
+                job.started_at = datetime.now()
+                data_version, result = await run_in_threadpool(_execute, job)
+            if job.cancel_event.is_set():
+                # Cancelled while the worker thread ran; its result is discarded.
+                raise CancelledError()
+            job.data_version = data_version
+            job.result = result
+            job.status = SUCCEEDED
+            self._store(self.cache_key(job.experiment_id, data_version, job.kind, job.params), result)
+        except (asyncio.CancelledError, CancelledError):
+            # The worker thread cannot be interrupted; the event lets it stop at its next check.
+            job.cancel_event.set()
+            job.status = CANCELLED
+        except KeyError as error:
+            job.status = FAILED
+            job.error = f"Unknown control variant: {error.args[0]}"
+        except Exception as error:
+            job.status = FAILED
+            job.error = str(error) or type(error).__name__
+        finally:
+            job.finished_at = datetime.now()
+            job.task = None
+            self._in_flight.pop(key, None)
+
+    def _store(self, key: tuple, result: dict):
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _remember(self, job: Job):
+        self._jobs[job.id] = job
+        finished = [job_id for job_id, known in self._jobs.items() if known.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def cancel(self, job_id: str, wait: float = CANCEL_WAIT_SECONDS) -> Optional[Job]:
+        """
+        Cancels a pending or running job. Finished jobs are returned unchanged.
+
+        A pending job stops at once. A running one is not interrupted: its
+        task keeps waiting for the worker thread, so it keeps its worker slot
+        until the analysis next checks its cancel event and returns. If it
+        has not stopped within `wait` seconds it is returned as "cancelling".
+        Its status becomes "cancelled" once the thread returns.
+
+        Args:
+            job_id (str): The job to cancel.
+            wait (float): Seconds to wait for the job to stop.
+
+        Returns:
+            Optional[Job]: The job, or None if it is unknown.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and job.status not in FINISHED:
+            job.cancel_event.set()
+            task = job.task
+            if task is not None:
+                if job.status == PENDING:
+                    # Still waiting for a worker slot: nothing runs yet, so the task can simply be cancelled.
+                    task.cancel()
+                # asyncio.wait does not cancel the task on timeout; the job keeps stopping in the background.
+                await asyncio.wait({task}, timeout=wait)
+                if not task.done():
+                    job.status = CANCELLING
+        return job
+
+    def shutdown(self):
+        """
+        Cancels every unfinished job.
+        """
+        for job in self._jobs.values():
+            job.cancel_event.set()
+            if job.task is not None:
+                job.task.cancel()
+
+
+job_manager = JobManager(settings.analysis_workers, settings.analysis_queue_size, settings.analysis_cache_size)
@@ -0,0 +1,140 @@
+# This file computes always-valid sequential tests (mSPRT) from per-variant sufficient statistics.
+
+from typing import Optional
+import numpy as np
+from scipy import stats as sp_stats
+from app.analysis.significance import METRICS, json_safe, stats_to_arrays
+
+# Decision states of a variant/metric comparison.
+CONTINUE = "continue"
+REJECT = "reject"
+ACCEPT = "accept"
+DECISIONS = (CONTINUE, REJECT, ACCEPT)
+
+# Standardized effect (difference in standard deviations) the mixing distribution is
+# centred on when the experiment has no planned sample sizes to derive it from.
+DEFAULT_STANDARDIZED_EFFECT = 0.1
+
+
+def standardized_effect(alpha: float, power: float, planned_control: Optional[int], planned_variant: Optional[int]) -> float:
+    """
+    Returns the standardized minimum detectable effect of a fixed-horizon test at the planned sample sizes.
+
+    The mixture variance of the mSPRT is tuned to this effect, so the test is
+    most sensitive to the effect the experiment was sized for.
+
+    Args:
+        alpha (float): Two-sided significance level.
+        power (float): Target power.
+        planned_control (Optional[int]): Planned events in the control group.
+        planned_variant (Optional[int]): Planned events in each variant group.
+
+    Returns:
+        float: The effect in units of the metric's standard deviation.
+    """
+    if not planned_control or not planned_variant:
+        return DEFAULT_STANDARDIZED_EFFECT
+    z = sp_stats.norm.ppf(1 - alpha / 2) + sp_stats.norm.ppf(power)
+    return float(z * np.sqrt(1 / planned_control + 1 / planned_variant))
+
+
+def msprt(n, sums, sq_sums, control_index: int, alpha: float, effect: float) -> dict:
+    """
+    Runs a two-sample mixture sequential probability ratio test of every variant against the control.
+
+    Uses the normal mixture mSPRT of Johari, Pekelis and Walsh: the difference
+    in means is compared with a N(0, tau^2) mixture over alternatives, where
+    tau is `effect` standard deviations of the metric. The likelihood ratio
+    and confidence interval depend only on the current sufficient statistics,
+    so they can be recomputed after every batch; `1 / ratio` is a p-value that
+    stays valid however often it is looked at, provided the running minimum is
+    kept across looks.
+
+    Args:
+        n (ndarray): Events per variant, shape (k,).
+        sums (ndarray): Per-metric sums, shape (m, k).
+        sq_sums (ndarray): Per-metric sums of squares, shape (m, k).
+        control_index (int): Column of the control variant.
+        alpha (float): Significance level of the always-valid confidence interval.
+        effect (float): Standardized effect the mixture is centred on, see `standardized_effect`.
+
+    Returns:
+        dict: Arrays of shape (m, k) keyed by result name. Undefined entries (fewer than two events) are NaN.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / n
+        variances = np.maximum((sq_sums - n * means ** 2) / (n - 1), 0.0)
+        variance_c = variances[:, [control_index]]
+        difference = means - means[:, [control_index]]
+
+        v = variances / n + variance_c / n[control_index]
+        tau2 = effect ** 2 * (variances + variance_c) / 2
+        log_ratio = 0.5 * np.log(v / (v + tau2)) + tau2 * difference ** 2 / (2 * v * (v + tau2))
+        p_value = np.minimum(1.0, np.exp(-log_ratio))
+        margin = np.sqrt(v * (v + tau2) / tau2 * (2 * np.log(1 / alpha) + np.log((v + tau2) / v)))
+
+    return {
+        "difference": difference,
+        "log_likelihood_ratio": log_ratio,
+        "p_value": p_value,
+        "ci_lower": difference - margin,
+        "ci_upper": difference + margin,
+    }
+
+
+def decide(p_value: float, alpha: float, n_control: float, n_variant: float,
+           planned_control: Optional[int], planned_variant: Optional[int]) -> str:
+    """
+    Maps a running always-valid p-value to a decision.
+
+    A comparison is rejected (significant) as soon as the p-value reaches
+    `alpha`, and accepted (stopped for futility) once both groups have
+    reached their planned sample sizes without a rejection.
+    """
+    if p_value is not None and p_value <= alpha:
+        return REJECT
+    if planned_control and planned_variant and n_control >= planned_control and n_variant >= planned_variant:
+        return ACCEPT
+    return CONTINUE
+
+
+def sequential_observations(variant_stats: dict, alpha: float, power: float, planned_control: Optional[int] = None,
+                            planned_variant: Optional[int] = None, control: Optional[str] = None) -> dict:
+    """
+    Computes the current mSPRT observation of every variant/metric comparison against the control.
+
+    Args:
+        variant_stats (dict): Statistics keyed by variant, as returned by `get_variant_stats`.
+        alpha (float): Significance level.
+        power (float): Target power, used with the planned sample sizes to tune the test.
+        planned_control (Optional[int]): Planned events in the control group (`sample_size_group_a`).
+        planned_variant (Optional[int]): Planned events per variant group (`sample_size_group_b`).
+        control (Optional[str]): Control variant; defaults to the first variant in sort order.
+
+    Returns:
+        dict: The control and, keyed by (variant, metric), the observation with its decision. Undefined values are None.
+
+    Raises:
+        KeyError: If `control` is not one of the variants.
+    """
+    variants, n, sums, sq_sums = stats_to_arrays(variant_stats)
+    control = control if control is not None else sorted(variants)[0]
+    if control not in variants:
+        raise KeyError(control)
+    control_index = variants.index(control)
+
+    effect = standardized_effect(alpha, power, planned_control, planned_variant)
+    results = msprt(n, sums, sq_sums, control_index, alpha, effect)
+    observations = {}
+    for column, variant in enumerate(variants):
+        if column == control_index:
+            continue
+        for row, metric in enumerate(METRICS):
+            observation = {name: json_safe(values[row, column]) for name, values in results.items()}
+            observation["n"] = int(n[column])
+            observation["control_n"] = int(n[control_index])
+            observation["decision"] = decide(
+                observation["p_value"], alpha, n[control_index], n[column], planned_control, planned_variant,
+            )
+            observations[(variant, metric)] = observation
+    return {"control": control, "observations": observations}
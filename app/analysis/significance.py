@@ -0,0 +1,150 @@
+# This file runs frequentist A/B significance tests from per-variant sufficient statistics.
+
+from typing import Optional
+import numpy as np
+from scipy import stats as sp_stats
+
+# Metrics analysed, in row order of the arrays below. Conversion is a 0/1 metric,
+# so its sum of squares equals its sum.
+METRICS = ("conversion", "revenue", "engagement_minutes")
+
+_SUM_FIELDS = ("conversions", "revenue_sum", "engagement_sum")
+_SQ_SUM_FIELDS = ("conversions", "revenue_sq_sum", "engagement_sq_sum")
+
+
+def stats_to_arrays(variant_stats: dict):
+    """
+    Stacks per-variant sufficient statistics into arrays.
+
+    Args:
+        variant_stats (dict): Statistics keyed by variant, as returned by `get_variant_stats`.
+
+    Returns:
+        tuple: (variants, n, sums, sq_sums) where `n` has shape (k,) and
+        `sums`/`sq_sums` have shape (len(METRICS), k).
+    """
+    variants = list(variant_stats)
+    n = np.array([variant_stats[v]["count"] for v in variants], dtype=float)
+    sums = np.array([[variant_stats[v][f] for v in variants] for f in _SUM_FIELDS], dtype=float)
+    sq_sums = np.array([[variant_stats[v][f] for v in variants] for f in _SQ_SUM_FIELDS], dtype=float)
+    return variants, n, sums, sq_sums
+
+
+def compare_to_control(n, sums, sq_sums, control_index: int, alpha: float = 0.05, power: float = 0.8) -> dict:
+    """
+    Tests every variant against the control for every metric in one vectorized pass.
+
+    Conversion uses a pooled two-proportion z-test; revenue and engagement use
+    Welch's unequal-variance t-test. Confidence intervals are for the absolute
+    difference (variant - control) at level 1 - alpha, and `mde` is the
+    smallest absolute difference detectable at the given power with the
+    current sample sizes.
+
+    Args:
+        n (ndarray): Events per variant, shape (k,).
+        sums (ndarray): Per-metric sums, shape (m, k).
+        sq_sums (ndarray): Per-metric sums of squares, shape (m, k).
+        control_index (int): Column of the control variant.
+        alpha (float): Two-sided significance level.
+        power (float): Target power used for the minimum detectable effect.
+
+    Returns:
+        dict: Arrays of shape (m, k) keyed by result name. The control column compares the control with itself.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / n
+        variances = (sq_sums - n * means ** 2) / (n - 1)
+        variances = np.maximum(variances, 0.0)
+
+        n_c = n[control_index]
+        mean_c = means[:, [control_index]]
+        var_c = variances[:, [control_index]]
+        difference = means - mean_c
+        lift = difference / mean_c
+
+        # Welch standard error and Welch-Satterthwaite degrees of freedom for every metric.
+        a = variances / n
+        b = var_c / n_c
+        se = np.sqrt(a + b)
+        df = (a + b) ** 2 / (a ** 2 / (n - 1) + b ** 2 / (n_c - 1))
+
+        # Conversion row: pooled proportion for the test statistic, normal reference distribution.
+        pooled = (sums[0] + sums[0, control_index]) / (n + n_c)
+        se_pooled = np.sqrt(pooled * (1 - pooled) * (1 / n + 1 / n_c))
+        se_unpooled = np.sqrt(means[0] * (1 - means[0]) / n + mean_c[0] * (1 - mean_c[0]) / n_c)
+
+        statistic = difference / se
+        statistic[0] = difference[0] / se_pooled
+        p_value = 2 * sp_stats.t.sf(np.abs(statistic), df)
+        p_value[0] = 2 * sp_stats.norm.sf(np.abs(statistic[0]))
+
+        critical = sp_stats.t.ppf(1 - alpha / 2, df)
+        critical[0] = sp_stats.norm.ppf(1 - alpha / 2)
+        interval_se = se.copy()
+        interval_se[0] = se_unpooled
+        margin = critical * interval_se
+
+        z_power = sp_stats.norm.ppf(power)
+        mde = (critical + z_power) * interval_se
+
+    return {
+        "control_mean": np.broadcast_to(mean_c, means.shape),
+        "variant_mean": means,
+        "difference": difference,
+        "lift": lift,
+        "ci_lower": difference - margin,
+        "ci_upper": difference + margin,
+        "statistic": statistic,
+        "p_value": p_value,
+        "significant": p_value < alpha,
+        "mde": mde,
+    }
+
+
+def json_safe(value):
+    """
+    Converts a NumPy scalar to a plain Python value, mapping NaN and infinities to None.
+    """
+    value = value.item() if hasattr(value, "item") else value
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def analyze_significance(variant_stats: dict, control: Optional[str] = None, alpha: float = 0.05, power: float = 0.8) -> dict:
+    """
+    Compares each variant with the control on conversion, revenue and engagement.
+
+    Args:
+        variant_stats (dict): Statistics keyed by variant, as returned by `get_variant_stats`.
+        control (Optional[str]): Control variant; defaults to the first variant in sort order.
+        alpha (float): Two-sided significance level.
+        power (float): Target power for the minimum detectable effect.
+
+    Returns:
+        dict: Per-variant, per-metric results; undefined values (e.g. too few events) are None.
+
+    Raises:
+        KeyError: If `control` is not one of the variants.
+    """
+    variants, n, sums, sq_sums = stats_to_arrays(variant_stats)
+    control = control if control is not None else sorted(variants)[0]
+    control_index = variants.index(control) if control in variants else None
+    if control_index is None:
+        raise KeyError(control)
+
+    results = compare_to_control(n, sums, sq_sums, control_index, alpha=alpha, power=power)
+    return {
+        "control": control,
+        "variants": {
+            variant: {
+                "n": int(n[column]),
+                **{
+                    metric: {name: json_safe(values[row, column]) for name, values in results.items()}
+                    for row, metric in enumerate(METRICS)
+                },
+            }
+            for column, variant in enumerate(variants)
+            if column != control_index
+        },
+    }
@@ -0,0 +1,180 @@
+# This file assigns users to variants from an in-memory snapshot of the active experiments.
+
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select
+from app.config import settings
+from app.db.base import SessionLocal
+from app.db.models import BaseExperiment
+
+logger = logging.getLogger(__name__)
+
+# Users are hashed onto [0, HASH_SPACE) and each variant owns a contiguous range of it.
+HASH_SPACE = 2 ** 32
+
+
+def hash_bucket(salt: str, user_id: str) -> int:
+    """
+    Maps a user to a point of the hash space, uniformly and deterministically for a given salt.
+    """
+    digest = hashlib.blake2b(f"{salt}:{user_id}".encode(), digest_size=4).digest()
+    return int.from_bytes(digest, "big")
+
+
+class AssignmentConfig:
+    """
+    The traffic split of one experiment, ready for lock-free lookups.
+
+    Variants take consecutive ranges of the hash space, in name order, sized
+    by their weights. Each experiment has its own salt, so a user's position
+    is independent across experiments. A user keeps their variant as long as
+    the weights do not change; changing them only moves users near the range
+    boundaries.
+
+    Attributes:
+        experiment_id (int): The experiment.
+        salt (str): Per-experiment hash salt.
+        weights (Dict[str, float]): Relative traffic per variant.
+    """
+
+    __slots__ = ("experiment_id", "salt", "weights", "_variants", "_boundaries")
+
+    def __init__(self, experiment_id: int, salt: str, weights: Dict[str, float]):
+        self.experiment_id = experiment_id
+        self.salt = salt
+        self.weights = weights
+        self._variants = sorted(variant for variant, weight in weights.items() if weight > 0)
+        if not self._variants:
+            raise ValueError(f"Experiment {experiment_id} has no variant with a positive weight")
+        total = sum(weights[variant] for variant in self._variants)
+        cumulative = 0.0
+        self._boundaries = []
+        for variant in self._variants[:-1]:
+            cumulative += weights[variant]
+            self._boundaries.append(int(HASH_SPACE * cumulative / total))
+
+    def assign(self, user_id: str) -> str:
+        return self._variants[bisect.bisect_right(self._boundaries, hash_bucket(self.salt, user_id))]
+
+    def assign_many(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        return {user_id: self.assign(user_id) for user_id in user_ids}
+
+
+def load_assignment_configs(db) -> Dict[int, AssignmentConfig]:
+    """
+    Reads the traffic split of every active experiment that has one.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        Dict[int, AssignmentConfig]: Configs keyed by experiment id.
+    """
+    rows = db.execute(
+        select(BaseExperiment.id, BaseExperiment.assignment_salt, BaseExperiment.variant_weights)
+        .where(BaseExperiment.deleted_at.is_(None), BaseExperiment.variant_weights.is_not(None))
+    ).all()
+    configs = {}
+    for experiment_id, salt, weights in rows:
+        try:
+            configs[experiment_id] = AssignmentConfig(experiment_id, salt or str(experiment_id), weights)
+        except ValueError as exc:
+            logger.warning("Skipping experiment in assignment snapshot: %s", exc)
+    return configs
+
+
+class AssignmentService:
+    """
+    Serves assignments from a snapshot of the active experiments, refreshed by a background thread.
+
+    Lookups read a dict that is replaced wholesale on every refresh, so they
+    never take a lock or touch the database. The snapshot is reloaded every
+    `refresh_interval` seconds and as soon as `notify` is called, which the
+    API does after creating or soft-deleting an experiment.
+
+    Attributes:
+        refresh_interval (float): Seconds between periodic reloads.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._configs: Optional[Dict[int, AssignmentConfig]] = None
+        self._loaded_at: Optional[float] = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._configs is not None
+
+    def get(self, experiment_id: int) -> Optional[AssignmentConfig]:
+        configs = self._configs
+        return configs.get(experiment_id) if configs is not None else None
+
+    def refresh(self, session_factory=SessionLocal) -> int:
+        """
+        Reloads the snapshot now, in the calling thread.
+
+        Args:
+            session_factory: Creates the database session to read from.
+
+        Returns:
+            int: The number of experiments in the new snapshot.
+        """
+        with session_factory() as db:
+            configs = load_assignment_configs(db)
+        self._configs = configs
+        self._loaded_at = time.monotonic()
+        return len(configs)
+
+    def notify(self):
+        """
+        Asks the background thread to reload the snapshot without waiting for the interval.
+        """
+        self._wake.set()
+
+    def start(self, session_factory=SessionLocal):
+        """
+        Starts the background refresh thread; the first load happens in that thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(session_factory,), name="assignment-refresh", daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, session_factory):
+        while not self._stopping.is_set():
+            try:
+                count = self.refresh(session_factory)
+                logger.debug("Assignment snapshot refreshed with %d experiments", count)
+            except Exception:
+                # Keep serving the previous snapshot; the next wake-up retries.
+                logger.exception("Assignment snapshot refresh failed")
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def stats(self) -> dict:
+        configs = self._configs
+        return {
+            "ready": configs is not None,
+            "experiments": len(configs) if configs is not None else 0,
+            "age_seconds": time.monotonic() - self._loaded_at if self._loaded_at is not None else None,
+        }
+
+
+assignment_service = AssignmentService(refresh_interval=settings.assignment_refresh_seconds)
@@ -0,0 +1,143 @@
+import logging
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Depends, APIRouter, Header, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.assignment import assignment_service
+from app.api.cache import response_cache
+from app.api.experiments import MAX_IDEMPOTENCY_KEY_LENGTH, create_experiment_record
+from app.api.schemas import (
+    ExperimentCreate,
+    ExperimentResponse,
+)
+from app.db.async_base import get_async_db
+from app.db.models import BaseExperiment
+from app.instrumentation.logs import log_payload
+from app.db.aggregations import rollups_to_stats, stats_to_metrics, variant_stats_query
+
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the experiment CRUD and metrics handlers in app.api.routes.
+# They serve the same paths and response shapes; app.main mounts them ahead of
+# the sync router when DB_MODE=async.
+app = APIRouter()
+
+
+async def _get_active_experiment(db: AsyncSession, experiment_id: int) -> BaseExperiment:
+    experiment = (await db.execute(
+        select(BaseExperiment).where(BaseExperiment.id == experiment_id, BaseExperiment.deleted_at.is_(None))
+    )).scalar_one_or_none()
+    if experiment is None:
+        raise HTTPException(status_code=404, detail="Experiment not found")
+    return experiment
+
+@app.post("/experiment/")
+async def create_experiment_async(
+    experiment: ExperimentCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_IDEMPOTENCY_KEY_LENGTH),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Create an experiment together with its initial variant rows, in one transaction.
+
+    Runs the same creation code as the sync handler on the async connection.
+
+    Args:
+        experiment (ExperimentCreate): The experiment and its variant rows.
+        response (Response): Used to flag replayed responses.
+        idempotency_key (Optional[str]): Client-chosen key identifying this creation.
+        db (AsyncSession): The async database session dependency.
+
+    Returns:
+        dict: The created experiment and its variant rows.
+
+    Raises:
+        HTTPException: 409 if the idempotency key was already used with a different body.
+    """
+    logger.info("Creating experiment with %d variant rows", len(experiment.experiment_variants))
+    log_payload(logger, "experiment.create", experiment)
+
+    result, created = await db.run_sync(create_experiment_record, experiment, idempotency_key)
+    if created:
+        await response_cache.invalidate_async(result["experiment"].id)
+        assignment_service.notify()
+    else:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+@app.get("/experiment/{experiment_id}")
+async def get_experiment_async(experiment_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Retrieve a experiment by its ID from the database without blocking the event loop.
+
+    Shares the response cache and ETag handling of the sync handler.
+
+    Args:
+        experiment_id (int): The ID of the experiment to retrieve.
+        request (Request): The incoming request, for If-None-Match.
+        db (AsyncSession): The async database session dependency.
+
+    Returns:
+        dict: A dictionary containing the experiment data.
+
+    Raises:
+        HTTPException: If the experiment is not found, raises a 404 HTTP exception.
+    """
+    cached, generation = await response_cache.lookup_async(request, "experiment", experiment_id)
+    if cached is not None:
+        return cached
+    experiment = ExperimentResponse.model_validate(await _get_active_experiment(db, experiment_id))
+    return await response_cache.store_async(request, "experiment", experiment_id, experiment, generation)
+
+@app.delete("/experiment/{experiment_id}")
+async def soft_delete_experiment_async(experiment_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Soft delete a experiment by setting its `deleted_at` timestamp.
+
+    Args:
+        experiment_id (int): The ID of the experiment to be deleted.
+        db (AsyncSession): The async database session dependency.
+
+    Returns:
+        dict: A message indicating that the experiment has been deleted.
+
+    Raises:
+        HTTPException: If the experiment with the given ID is not found.
+    """
+    experiment = await _get_active_experiment(db, experiment_id)
+    experiment.deleted_at = datetime.now()
+    await db.commit()
+    await response_cache.invalidate_async(experiment_id)
+    assignment_service.notify()
+    return {"message": "Experiment deleted successfully"}
+
+@app.get("/api/experiment/{experiment_id}/metrics/basic")
+async def get_experiment_basic_metrics_async(experiment_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Retrieve basic experiment metrics by experiment ID from the per-variant rollups.
+
+    Shares the response cache and ETag handling of the sync handler.
+
+    Args:
+        experiment_id (int): The ID of the experiment to retrieve metrics for.
+        request (Request): The incoming request, for If-None-Match.
+        db (AsyncSession): The async database session dependency.
+
+    Returns:
+        dict: A dictionary containing the basic experiment metrics.
+
+    Raises:
+        HTTPException: If the experiment is not found, raises a 404 HTTP exception.
+    """
+    cached, generation = await response_cache.lookup_async(request, "metrics:basic", experiment_id)
+    if cached is not None:
+        return cached
+    await _get_active_experiment(db, experiment_id)
+
+    stats = rollups_to_stats((await db.execute(variant_stats_query(experiment_id))).scalars())
+    if not stats:
+        raise HTTPException(status_code=404, detail="No experiment data found for the experiment")
+    metrics = {variant: stats_to_metrics(values) for variant, values in stats.items()}
+    return await response_cache.store_async(request, "metrics:basic", experiment_id, {"experiment_id":experiment_id,"metrics":metrics}, generation)
@@ -0,0 +1,273 @@
+# This file caches rendered experiment and metrics responses, with ETag revalidation and invalidation on writes.
+
+import hashlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.config import settings
+
+# Response kinds cached per experiment; invalidating an experiment drops all of them.
+CACHED_KINDS = ("experiment", "metrics:basic")
+
+# Clients may keep a copy but must revalidate it (cheaply, with If-None-Match) before use.
+CACHE_CONTROL = "no-cache"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """
+    A rendered JSON response body and its entity tag.
+    """
+    etag: str
+    body: bytes
+
+
+class CacheBackend(ABC):
+    """
+    Storage interface for cached responses.
+
+    The in-process backend keeps entries per worker. A shared backend
+    (e.g. Redis or memcached) lets every worker see the same entries and
+    invalidations; it must serialize `CachedResponse` itself and honour the
+    TTL passed to `set`.
+
+    Attributes:
+        blocking (bool): Whether calls wait on I/O; async handlers then run them in the thread pool.
+    """
+
+    blocking = True
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: CachedResponse, ttl: float):
+        ...
+
+    @abstractmethod
+    def delete(self, keys: Iterable[str]):
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Thread-safe in-process backend with per-entry expiry and LRU eviction.
+
+    Attributes:
+        max_entries (int): Entries kept before the least recently used is evicted.
+    """
+
+    # Its lock is only held for dict operations, so calling it on the event loop is cheaper than a thread hop.
+    blocking = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored.
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _respond(request: Request, cached: CachedResponse) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    Read-through cache of JSON responses keyed by experiment and response kind.
+
+    Handlers look a response up before touching the database and store what
+    they rendered on a miss; every write to an experiment calls `invalidate`.
+    Each key has a generation counter that `invalidate` bumps before deleting.
+    `store` writes only if the generation still matches the one seen by
+    `lookup`, and checks it again after the write, deleting its own entry if an
+    invalidation ran meanwhile. Only the counters are locked, never backend I/O.
+
+    The `*_async` methods are for handlers running on the event loop; they run
+    the backend calls in the thread pool when the backend is `blocking`.
+
+    Attributes:
+        backend (CacheBackend): Where entries are kept; replace with `set_backend`.
+        ttl (float): Seconds an entry lives; 0 disables caching (ETags are still sent).
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, experiment_id: int) -> str:
+        return f"{kind}:{experiment_id}"
+
+    def set_backend(self, backend: CacheBackend):
+        self.backend = backend
+
+    def _generation(self, key: str) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def _bump(self, experiment_id: int) -> List[str]:
+        keys = [self.key(kind, experiment_id) for kind in CACHED_KINDS]
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+        return keys
+
+    def _count(self, cached: Optional[CachedResponse]):
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    async def _call(self, method: Callable, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    def lookup(self, request: Request, kind: str, experiment_id: int) -> Tuple[Optional[Response], int]:
+        """
+        Serves a cached response, or a 304 if the client's copy is still current.
+
+        Args:
+            request (Request): The incoming request, for If-None-Match.
+            kind (str): One of `CACHED_KINDS`.
+            experiment_id (int): The ID of the experiment.
+
+        Returns:
+            Tuple[Optional[Response], int]: The response, or None on a miss, and the
+            generation to pass to `store`.
+        """
+        key = self.key(kind, experiment_id)
+        generation = self._generation(key)
+        cached = self.backend.get(key) if self.ttl > 0 else None
+        self._count(cached)
+        return (_respond(request, cached) if cached is not None else None), generation
+
+    async def lookup_async(self, request: Request, kind: str, experiment_id: int) -> Tuple[Optional[Response], int]:
+        """
+        Same as `lookup`, without blocking the event loop on the backend.
+        """
+        key = self.key(kind, experiment_id)
+        generation = self._generation(key)
+        cached = await self._call(self.backend.get, key) if self.ttl > 0 else None
+        self._count(cached)
+        return (_respond(request, cached) if cached is not None else None), generation
+
+    def _render(self, content: Any) -> CachedResponse:
+        body = JSONResponse(jsonable_encoder(content)).body
+        return CachedResponse(etag=_etag(body), body=body)
+
+    def store(self, request: Request, kind: str, experiment_id: int, content: Any, generation: int) -> Response:
+        """
+        Renders `content` as JSON, caches it unless the experiment was written to since `lookup`, and responds.
+
+        Args:
+            request (Request): The incoming request, for If-None-Match.
+            kind (str): One of `CACHED_KINDS`.
+            experiment_id (int): The ID of the experiment.
+            content (Any): The handler's result.
+            generation (int): The generation returned by `lookup`.
+
+        Returns:
+            Response: The rendered response with its ETag, or a 304.
+        """
+        cached = self._render(content)
+        key = self.key(kind, experiment_id)
+        if self.ttl > 0 and self._generation(key) == generation:
+            self.backend.set(key, cached, self.ttl)
+            if self._generation(key) != generation:
+                # Invalidated while writing; its delete may have run before the set landed.
+                self.backend.delete([key])
+        return _respond(request, cached)
+
+    async def store_async(self, request: Request, kind: str, experiment_id: int, content: Any,
+                          generation: int) -> Response:
+        """
+        Same as `store`, without blocking the event loop on the backend.
+        """
+        cached = self._render(content)
+        key = self.key(kind, experiment_id)
+        if self.ttl > 0 and self._generation(key) == generation:
+            await self._call(self.backend.set, key, cached, self.ttl)
+            if self._generation(key) != generation:
+                await self._call(self.backend.delete, [key])
+        return _respond(request, cached)
+
+    def invalidate(self, experiment_id: int):
+        """
+        Drops every cached response of an experiment. Call after the write has committed.
+        """
+        self.backend.delete(self._bump(experiment_id))
+
+    async def invalidate_async(self, experiment_id: int):
+        """
+        Same as `invalidate`, without blocking the event loop on the backend.
+        """
+        await self._call(self.backend.delete, self._bump(experiment_id))
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+        }
+
+
+response_cache = ResponseCache(MemoryCacheBackend(settings.response_cache_size), settings.response_cache_ttl)
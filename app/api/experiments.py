@@ -0,0 +1,147 @@
+# This file creates an experiment and its initial variant rows in a single transaction, idempotently.
+
+import hashlib
+import secrets
+from typing import List, Optional
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.api.schemas import ExperimentCreate, ExperimentDataResponse, ExperimentResponse
+from app.db.ingest import build_event_row, utc_now
+from app.db.models import BaseExperiment, ExperimentData
+from app.db.rollups import apply_rollup_deltas, compute_rollup_deltas
+from app.db.sequential import update_sequential_state
+from app.db.user_sketches import apply_sketch_deltas, compute_sketch_deltas
+
+# ExperimentCreate fields stored on the experiment row (everything but the variant rows).
+EXPERIMENT_FIELDS = (
+    "name",
+    "description",
+    "goal_metric",
+    "experiment_type",
+    "desired_outcome",
+    "null_hypothesis",
+    "alternative_hypothesis",
+    "sample_size_group_a",
+    "sample_size_group_b",
+    "significance_level",
+    "power",
+    "bias_control_method",
+    "identified_confounders",
+    "success_metrics",
+)
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 100
+
+
+def request_fingerprint(experiment: ExperimentCreate) -> str:
+    return hashlib.sha256(experiment.model_dump_json().encode()).hexdigest()
+
+
+def variant_weights(experiment: ExperimentCreate) -> Optional[dict]:
+    """
+    Returns the traffic split to assign users with: the requested one, or an even split over the initial variants.
+    """
+    if experiment.variant_weights is not None:
+        return experiment.variant_weights
+    variants = sorted({variant_data.variant for variant_data in experiment.experiment_variants})
+    return dict.fromkeys(variants, 1.0) or None
+
+
+def _creation_response(experiment: BaseExperiment, rows: List) -> dict:
+    return {
+        "experiment": ExperimentResponse.model_validate(experiment),
+        "experiment_data": [ExperimentDataResponse.model_validate(row) for row in rows],
+    }
+
+
+def _replay(db: Session, experiment: BaseExperiment, fingerprint: str) -> dict:
+    if experiment.request_fingerprint != fingerprint:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used with a different request")
+    rows = []
+    if experiment.created_data_ids:
+        rows = db.execute(
+            select(ExperimentData)
+            .where(ExperimentData.experiment_id == experiment.id, ExperimentData.id.in_(experiment.created_data_ids))
+            .order_by(ExperimentData.id)
+        ).scalars().all()
+    return _creation_response(experiment, rows)
+
+
+def _find_by_idempotency_key(db: Session, idempotency_key: str) -> Optional[BaseExperiment]:
+    return db.execute(
+        select(BaseExperiment).where(BaseExperiment.idempotency_key == idempotency_key)
+    ).scalar_one_or_none()
+
+
+def create_experiment_record(db: Session, experiment: ExperimentCreate, idempotency_key: Optional[str] = None) -> tuple:
+    """
+    Creates an experiment with its variant rows, rollups, user sketches and sequential state, and commits once.
+
+    The experiment's id comes back from its INSERT ... RETURNING on flush and
+    all variant rows go in one multi-row INSERT ... RETURNING, so the response
+    is built from returned values without refreshing anything. A failure at
+    any point leaves nothing behind.
+
+    With an idempotency key, a request that repeats an earlier one (same key,
+    same body) returns the originally created experiment instead of creating
+    another; concurrent duplicates are resolved by the unique index on the key.
+
+    Args:
+        db (Session): The database session.
+        experiment (ExperimentCreate): The validated request.
+        idempotency_key (Optional[str]): The client's Idempotency-Key header.
+
+    Returns:
+        tuple: The response dict and True if the experiment was created, False if it was replayed.
+
+    Raises:
+        HTTPException: 409 if the key was used before with a different request.
+    """
+    fingerprint = request_fingerprint(experiment) if idempotency_key else None
+    if idempotency_key:
+        existing = _find_by_idempotency_key(db, idempotency_key)
+        if existing is not None:
+            return _replay(db, existing, fingerprint), False
+
+    now = utc_now()
+    new_experiment = BaseExperiment(
+        **{field: getattr(experiment, field) for field in EXPERIMENT_FIELDS},
+        idempotency_key=idempotency_key,
+        request_fingerprint=fingerprint,
+        variant_weights=variant_weights(experiment),
+        assignment_salt=secrets.token_hex(8),
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(new_experiment)
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent request with the same key won the race.
+        db.rollback()
+        existing = _find_by_idempotency_key(db, idempotency_key) if idempotency_key else None
+        if existing is None:
+            raise
+        return _replay(db, existing, fingerprint), False
+
+    rows = [build_event_row(new_experiment.id, variant_data, now) for variant_data in experiment.experiment_variants]
+    inserted = []
+    if rows:
+        inserted = db.execute(
+            insert(ExperimentData).returning(*ExperimentData.__table__.c, sort_by_parameter_order=True),
+            rows,
+        ).all()
+        apply_rollup_deltas(db, new_experiment.id, compute_rollup_deltas(rows))
+        apply_sketch_deltas(db, new_experiment.id, compute_sketch_deltas(rows))
+        update_sequential_state(db, new_experiment.id, experiment=new_experiment)
+
+    if idempotency_key:
+        # Replays return exactly these rows, not events ingested later.
+        new_experiment.created_data_ids = [row.id for row in inserted]
+
+    # Serialized before the commit expires the experiment's attributes.
+    response = _creation_response(new_experiment, [dict(row._mapping) for row in inserted])
+    db.commit()
+    return response, True
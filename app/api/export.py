@@ -0,0 +1,145 @@
+# This file encodes streamed event exports as NDJSON, CSV or Parquet.
+
+import csv
+import io
+import json
+from typing import Callable, Iterable, Iterator, List, Optional
+from app.db.base import SessionLocal
+from app.db.export import EXPORT_COLUMNS, iter_event_batches
+
+_JSON_COLUMN = EXPORT_COLUMNS.index("additional_data")
+
+
+def _json_default(value):
+    # datetimes are the only non-JSON values in an event row.
+    return value.isoformat()
+
+
+def encode_ndjson(batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """
+    Encodes batches of event rows as newline-delimited JSON, one chunk per batch.
+    """
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_json_default) + "\n" for row in batch
+        ).encode()
+
+
+def encode_csv(batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """
+    Encodes batches of event rows as CSV with a header line, one chunk per batch.
+
+    `additional_data` is written as a JSON string and datetimes in ISO format.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for row in batch:
+            row = list(row)
+            if row[_JSON_COLUMN] is not None:
+                row[_JSON_COLUMN] = json.dumps(row[_JSON_COLUMN])
+            writer.writerow(value.isoformat() if hasattr(value, "isoformat") else value for value in row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands back whatever was written since the last `drain`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def encode_parquet(batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """
+    Encodes batches of event rows as a Parquet file, one row group per batch.
+
+    Each row group is sent as soon as it is written; the footer follows the
+    last one. `additional_data` is stored as a JSON string column.
+    """
+    # Imported lazily: pyarrow is large and only needed for this format.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("experiment_id", pa.int64()),
+        ("variant", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("conversion", pa.bool_()),
+        ("revenue", pa.float64()),
+        ("engagement_minutes", pa.float64()),
+        ("additional_data", pa.string()),
+        ("user_id", pa.string()),
+        ("session_id", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            columns = [list(column) for column in zip(*batch)]
+            columns[_JSON_COLUMN] = [None if value is None else json.dumps(value) for value in columns[_JSON_COLUMN]]
+            arrays = [pa.array(column, type=field.type) for column, field in zip(columns, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# Export formats: name -> (media type, file extension, encoder).
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson", encode_ndjson),
+    "csv": ("text/csv", "csv", encode_csv),
+    "parquet": ("application/vnd.apache.parquet", "parquet", encode_parquet),
+}
+
+
+def stream_export(experiment_id: int, encoder: Callable[[Iterable[List[tuple]]], Iterator[bytes]],
+                  after: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Streams an experiment's events in the given encoding.
+
+    The generator owns its session, since the response body is produced
+    after the request's dependencies have been closed; the server-side cursor
+    is released when the stream ends or the client disconnects.
+
+    Args:
+        experiment_id (int): The experiment to export.
+        encoder (Callable): One of the encoders in `EXPORT_FORMATS`.
+        after (Optional[int]): Resume after this event id.
+
+    Yields:
+        bytes: Encoded chunks, about one per fetched batch.
+    """
+    db = SessionLocal()
+    try:
+        yield from encoder(iter_event_batches(db, experiment_id, after))
+    finally:
+        db.close()
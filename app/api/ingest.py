@@ -0,0 +1,283 @@
+# This file parses and validates bulk event uploads before handing them to app.db.ingest.
+
+import csv
+import io
+import json
+import logging
+import time
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+from app.api.cache import response_cache
+from app.api.schemas import ExperimentEventData
+from app.db.ingest import INGEST_BATCH_SIZE, build_event_row, insert_event_rows, utc_now
+
+# Upper bound on rejections echoed back, so a bad upload cannot blow up the response.
+MAX_REPORTED_REJECTIONS = 1000
+
+# Longest NDJSON line the streaming endpoint will buffer before rejecting it.
+MAX_LINE_BYTES = 1024 * 1024
+
+JSON_CONTENT_TYPES = ("application/json",)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+
+logger = logging.getLogger(__name__)
+
+_batch_adapter = TypeAdapter(List[ExperimentEventData])
+
+# (row index, parsed record or None, parse error or None)
+Record = Tuple[int, Optional[object], Optional[str]]
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or "application/json").split(";")[0].strip().lower()
+
+
+def iter_records(body: bytes, content_type: Optional[str]) -> Iterator[Record]:
+    """
+    Splits a bulk upload into individual records according to its Content-Type.
+
+    Args:
+        body (bytes): The raw request body.
+        content_type (Optional[str]): The request Content-Type header.
+
+    Yields:
+        Record: One (index, record, error) tuple per row.
+
+    Raises:
+        HTTPException: 415 for unsupported content types, 400 if a JSON array body is malformed.
+    """
+    media_type = _media_type(content_type)
+    if media_type in JSON_CONTENT_TYPES:
+        try:
+            records = json.loads(body)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {exc}")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of events")
+        for index, record in enumerate(records):
+            if record is None:
+                yield index, None, "Event must be a JSON object"
+            else:
+                yield index, record, None
+    elif media_type in NDJSON_CONTENT_TYPES:
+        for index, line in enumerate(io.BytesIO(body)):
+            yield parse_ndjson_line(index, line)
+    elif media_type in CSV_CONTENT_TYPES:
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8")))
+        for index, record in enumerate(reader):
+            # Empty CSV cells mean "not provided", not an empty string.
+            yield index, {key: (value if value != "" else None) for key, value in record.items()}, None
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {media_type}")
+
+
+def parse_ndjson_line(index: int, line: bytes) -> Record:
+    """
+    Parses one NDJSON line. Blank lines parse to an empty record that is skipped later.
+    """
+    line = line.strip()
+    if not line:
+        return index, None, None
+    try:
+        return index, json.loads(line), None
+    except ValueError as exc:
+        return index, None, f"Invalid JSON: {exc}"
+
+
+def _format_errors(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    ]
+
+
+def validate_ndjson_line(index: int, line: bytes) -> Record:
+    """
+    Parses and validates one NDJSON line against `ExperimentEventData` in a single step.
+    """
+    line = line.strip()
+    if not line:
+        return index, None, None
+    try:
+        return index, ExperimentEventData.model_validate_json(line), None
+    except ValidationError as exc:
+        return index, None, "; ".join(_format_errors(exc))
+
+
+async def iter_ndjson_stream(chunks: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[Record]:
+    """
+    Splits a streamed NDJSON body into validated records without buffering the whole body.
+
+    At most one partial line (capped at `max_line_bytes`) is held in memory;
+    longer lines are discarded and reported as rejections.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body stream.
+        max_line_bytes (int): The longest accepted line.
+
+    Yields:
+        Record: One (index, event, error) tuple per line.
+    """
+    partial = b""
+    index = 0
+    oversized = False
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (partial + chunk).split(b"\n")
+        partial = lines.pop()
+        for line in lines:
+            # The end of a line already cut short, or a whole line that arrived in one chunk.
+            if oversized or len(line) > max_line_bytes:
+                oversized = False
+                yield index, None, f"Line exceeds {max_line_bytes} bytes"
+            else:
+                yield validate_ndjson_line(index, line)
+            index += 1
+        if len(partial) > max_line_bytes:
+            oversized = True
+            partial = b""
+    if oversized:
+        yield index, None, f"Line exceeds {max_line_bytes} bytes"
+    elif partial.strip():
+        yield validate_ndjson_line(index, partial)
+
+
+class BulkIngestor:
+    """
+    Accumulates records into fixed-size batches, validates each batch and writes it.
+
+    Each flushed batch is committed on its own, so a long upload never holds one
+    huge transaction open.
+
+    Attributes:
+        inserted (int): Rows written so far.
+        rejected (int): Rows rejected so far.
+        rejections (list): The first `MAX_REPORTED_REJECTIONS` rejections.
+    """
+
+    def __init__(self, db: Session, experiment_id: int, batch_size: int = INGEST_BATCH_SIZE):
+        self.db = db
+        self.experiment_id = experiment_id
+        self.batch_size = batch_size
+        self.inserted = 0
+        self.rejected = 0
+        self.rejections = []
+        self._pending: List[Record] = []
+        self._started = time.perf_counter()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, record: Record) -> bool:
+        """
+        Queues a record. Returns True when the batch is full and should be flushed.
+        """
+        if record[1] is None and record[2] is None:
+            return False
+        self._pending.append(record)
+        return len(self._pending) >= self.batch_size
+
+    def _reject(self, index: int, errors: list):
+        self.rejected += 1
+        if len(self.rejections) < MAX_REPORTED_REJECTIONS:
+            self.rejections.append({"row": index, "errors": errors})
+
+    def _validate(self, batch: List[Record]) -> List[ExperimentEventData]:
+        parsed = [(index, record) for index, record, error in batch if error is None]
+        for index, _, error in batch:
+            if error is not None:
+                self._reject(index, [error])
+
+        # Fast path: validate the whole batch in one call. Records that are
+        # already validated events pass through without being revalidated.
+        try:
+            return _batch_adapter.validate_python([record for _, record in parsed])
+        except ValidationError:
+            pass
+
+        events = []
+        for index, record in parsed:
+            try:
+                events.append(ExperimentEventData.model_validate(record))
+            except ValidationError as exc:
+                self._reject(index, _format_errors(exc))
+        return events
+
+    def flush(self) -> int:
+        """
+        Validates, writes and commits the pending batch.
+
+        Returns:
+            int: The number of rows written by this flush.
+        """
+        batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        events = self._validate(batch)
+        now = utc_now()
+        rows = [build_event_row(self.experiment_id, event, now) for event in events]
+        written = insert_event_rows(self.db, rows)
+        self.db.commit()
+        response_cache.invalidate(self.experiment_id)
+        self.inserted += written
+        return written
+
+    def report(self) -> dict:
+        """
+        Summarises the ingestion run.
+        """
+        elapsed = time.perf_counter() - self._started
+        logger.info("Ingested %d events into experiment %d (%d rejected) in %.3fs",
+                    self.inserted, self.experiment_id, self.rejected, elapsed)
+        return {
+            "experiment_id": self.experiment_id,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "rejections": self.rejections,
+            "elapsed_seconds": round(elapsed, 4),
+            "rows_per_second": round(self.inserted / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+def ingest_records(db: Session, experiment_id: int, records: Iterator[Record]) -> dict:
+    """
+    Ingests an iterable of records in batches and returns the ingestion report.
+    """
+    ingestor = BulkIngestor(db, experiment_id)
+    for record in records:
+        if ingestor.add(record):
+            ingestor.flush()
+    ingestor.flush()
+    return ingestor.report()
+
+
+async def ingest_stream(db: Session, experiment_id: int, chunks: AsyncIterator[bytes], batch_size: int = INGEST_BATCH_SIZE) -> dict:
+    """
+    Ingests a streamed NDJSON body with bounded memory.
+
+    Only one batch of validated events is held at a time. Each full batch is
+    written in the threadpool and awaited before more of the body is read, so
+    when the database falls behind the server stops reading from the socket
+    and the client is throttled by TCP flow control.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The experiment the events belong to.
+        chunks (AsyncIterator[bytes]): The request body stream.
+        batch_size (int): Rows per write.
+
+    Returns:
+        dict: The ingestion report.
+    """
+    ingestor = BulkIngestor(db, experiment_id, batch_size=batch_size)
+    async for record in iter_ndjson_stream(chunks):
+        if ingestor.add(record):
+            await run_in_threadpool(ingestor.flush)
+    await run_in_threadpool(ingestor.flush)
+    return ingestor.report()
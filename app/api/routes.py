@@ -1,149 +1,112 @@
 import logging
 from datetime import datetime
-from typing import Optional,List
-from fastapi import HTTPException, Depends, APIRouter
+from typing import List, Literal, Optional
+from fastapi import HTTPException, Depends, APIRouter, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, ConfigDict
+from app.api.assignment import AssignmentConfig, assignment_service
+from app.api.cache import response_cache
+from app.api.experiments import MAX_IDEMPOTENCY_KEY_LENGTH, create_experiment_record
+from app.api.export import EXPORT_FORMATS, stream_export
+from app.api.ingest import NDJSON_CONTENT_TYPES, ingest_records, ingest_stream, iter_records
+from app.api.schemas import (
+    AnalysisRequest,
+    AssignmentBatchRequest,
+    ExperimentCreate,
+    ExperimentListItem,
+    ExperimentResponse,
+)
 from app.db.base import get_db
-from app.db.models import BaseExperiment, ExperimentData
+from app.db.models import BaseExperiment
+from app.instrumentation.logs import log_payload
+from app.analysis.bootstrap import analyze_bootstrap
+from app.analysis.hll import HLL_STANDARD_ERROR
+from app.analysis.jobs import SUCCEEDED, JobQueueFull, job_manager, parse_params
+from app.analysis.significance import analyze_significance
+from app.db.aggregations import (
+    get_data_version,
+    get_segment_stats,
+    get_user_stats,
+    get_variant_metrics,
+    get_variant_stats,
+    get_variant_stats_by_experiment,
+    get_variant_timeseries,
+    stats_to_metrics,
+    user_stats_to_metrics,
+)
+from app.db.experiments import get_experiments, list_experiments
+from app.db.export import get_events_page
+from app.db.sequential import OBSERVATION_FIELDS, experiment_parameters, get_sequential_state, update_sequential_state
+from app.db.snapshots import get_samples
+from app.db.user_sketches import get_approximate_user_stats
 
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Most ids accepted by one multi-get request.
+MAX_BATCH_IDS = 100
+
+# sequential_state columns reported per variant and metric.
+SEQUENTIAL_FIELDS = OBSERVATION_FIELDS + ("decision",)
 
 app = APIRouter()
 
-class ExperimentBase(BaseModel):
-    variant:str
-    timestamp:datetime
-    conversion:bool
-    revenue:float=0.0
-    engagement_minutes:float=0.0
-
-
-class ExperimentVariantData(BaseModel):
-    variant: str
-    conversion: bool
-    revenue: Optional[float] = 0.0
-    engagement_minutes: Optional[float] = 0.0
-    additional_data: Optional[str] = None
-
-class ExperimentCreate(BaseModel):
-    name: str
-    description: str
-    goal_metric: str
-    experiment_type: str
-    desired_outcome: str
-    null_hypothesis: str
-    alternative_hypothesis: str
-    sample_size_group_a: int
-    sample_size_group_b: int
-    significance_level: float
-    power: float
-    bias_control_method: str
-    identified_confounders: str
-    success_metrics: str
-    experiment_variants: List[ExperimentVariantData]  # This must be a list of ExperimentVariantData
-# Response model for ExperimentData
-class ExperimentDataResponse(BaseModel):
-
-    id: int
-    experiment_id: int
-    variant: str
-    timestamp: datetime
-    conversion: bool
-    revenue: float
-    engagement_minutes: float
-    additional_data: Optional[str]
-    created_at: datetime
-    updated_at: datetime
-
-    # Enable ORM mode for SQLAlchemy serialization
-    model_config = ConfigDict(from_attributes=True)
-
-# Request model for ExperimentDataBase
-class ExperimentDataBase(BaseModel):
-    """
-    ExperimentDataBase is a Pydantic model that represents the structure of experiment data for incoming requests.
-
-    Attributes:
-        name (str): The name of the experiment.
-        description (Optional[str]): A brief description of the experiment.
-        experiment_type (str): The type of the experiment.
-        variant (str): The variant of the experiment.
-        conversion (bool): Indicates if the experiment involves conversion.
-        revenue (Optional[float]): The revenue generated from the experiment.
-        engagement_minutes (Optional[float]): The engagement time in minutes.
-        additional_data (Optional[str]): Any additional data related to the experiment.
-    """
-    name: str
-    description: Optional[str]
-    experiment_type: str
-    variant: str
-    conversion: bool
-    revenue: Optional[float] = 0.0
-    engagement_minutes: Optional[float] = 0.0
-    additional_data: Optional[str] = None
-
-# Response model for BaseExperiment
-class ExperimentResponse(BaseModel):
-    id: int
-    name: str
-    description: Optional[str]
-    experiment_type: str
-    created_at: datetime
-    updated_at: datetime
-
-    model_config = ConfigDict(from_attributes=True)
+def _get_active_experiment(db: Session, experiment_id: int) -> BaseExperiment:
+    experiment = db.query(BaseExperiment).filter(BaseExperiment.id == experiment_id, BaseExperiment.deleted_at.is_(None)).first()
+    if experiment is None:
+        raise HTTPException(status_code=404, detail="Experiment not found")
+    return experiment
 
 @app.post("/experiment/")
-def create_experiment(experiment: ExperimentCreate, db: Session = Depends(get_db)):
-    logging.info("Incoming payload: %s", experiment.model_dump())
-
-
-    # Create BaseExperiment entry
-    new_experiment = BaseExperiment(
-        name=experiment.name,
-        description=experiment.description,
-        goal_metric=experiment.goal_metric,
-        experiment_type=experiment.experiment_type,
-        created_at=datetime.now(),
-        updated_at=datetime.now()
-    )
-    db.add(new_experiment)
-    db.commit()
-    db.refresh(new_experiment)
-
-    # Create ExperimentData entry
-    experiment_data_entries=[]
-    for variant_data in experiment.experiment_variants:
-        new_experiment_data = ExperimentData( 
-            experiment_id=new_experiment.id,
-            variant=variant_data.variant,
-            timestamp=datetime.now(),
-            conversion=variant_data.conversion,
-            revenue=variant_data.revenue,
-            engagement_minutes=variant_data.engagement_minutes,
-            additional_data=variant_data.additional_data,
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        db.add(new_experiment_data)
-        experiment_data_entries.append(new_experiment_data)
-    db.commit()
+def create_experiment(
+    experiment: ExperimentCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_IDEMPOTENCY_KEY_LENGTH),
+    db: Session = Depends(get_db),
+):
+    """
+    Create an experiment together with its initial variant rows, in one transaction.
 
-    # Return serialized response
-    return {
-    "experiment": ExperimentResponse.model_validate(new_experiment),
-    "experiment_data": [ExperimentDataResponse.model_validate(data) for data in experiment_data_entries]
-    }
+    Send an `Idempotency-Key` header to make retries safe: repeating a request
+    with the same key and body returns the experiment created the first time
+    (flagged by an `Idempotent-Replayed: true` header) instead of a duplicate.
+
+    Args:
+        experiment (ExperimentCreate): The experiment and its variant rows.
+        response (Response): Used to flag replayed responses.
+        idempotency_key (Optional[str]): Client-chosen key identifying this creation.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: The created experiment and its variant rows.
+
+    Raises:
+        HTTPException: 409 if the idempotency key was already used with a different body.
+    """
+    logger.info("Creating experiment with %d variant rows", len(experiment.experiment_variants))
+    log_payload(logger, "experiment.create", experiment)
+
+    result, created = create_experiment_record(db, experiment, idempotency_key)
+    if created:
+        response_cache.invalidate(result["experiment"].id)
+        assignment_service.notify()
+    else:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
 @app.get("/experiment/{experiment_id}")
-def get_experiment(experiment_id: int, db: Session = Depends(get_db)):
+def get_experiment(experiment_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Retrieve a experiment by its ID from the database.
 
+    Responses are served from the response cache when possible, and a client
+    sending a current ETag in If-None-Match gets a 304 without a database query.
+
     Args:
         experiment_id (int): The ID of the experiment to retrieve.
+        request (Request): The incoming request, for If-None-Match.
         db (Session): The database session dependency.
 
     Returns:
@@ -152,10 +115,88 @@ def get_experiment(experiment_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the experiment is not found, raises a 404 HTTP exception.
     """
+    cached, generation = response_cache.lookup(request, "experiment", experiment_id)
+    if cached is not None:
+        return cached
     experiment = db.query(BaseExperiment).filter(BaseExperiment.id == experiment_id, BaseExperiment.deleted_at.is_(None)).first()
     if experiment is None:
         raise HTTPException(status_code=404, detail="Experiment not found")
-    return ExperimentResponse.model_validate(experiment)
+    return response_cache.store(request, "experiment", experiment_id, ExperimentResponse.model_validate(experiment), generation)
+
+def _list_items(db: Session, experiments: List[BaseExperiment], include_summary: bool) -> List[ExperimentListItem]:
+    items = [ExperimentListItem.model_validate(experiment) for experiment in experiments]
+    if include_summary:
+        # One grouped rollup query for the whole page rather than one per experiment.
+        stats = get_variant_stats_by_experiment(db, [item.id for item in items])
+        for item in items:
+            item.variants = {
+                variant: stats_to_metrics(values) for variant, values in stats.get(item.id, {}).items()
+            }
+    return items
+
+@app.get("/experiments")
+def list_experiments_endpoint(
+    experiment_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    deleted: Literal["active", "deleted", "all"] = "active",
+    include_summary: bool = False,
+    after: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    List experiments in id order, with optional filters and per-variant metrics.
+
+    Pages are addressed by keyset: pass the `next_after` of one page as
+    `after` to get the next. With `include_summary` every item carries its
+    basic metrics per variant, read from the rollups in a single query for
+    the whole page.
+
+    Args:
+        experiment_type (Optional[str]): Only experiments of this type.
+        created_after (Optional[datetime]): Only experiments created at or after this time.
+        created_before (Optional[datetime]): Only experiments created before this time.
+        deleted (str): active (default), deleted or all.
+        include_summary (bool): Add per-variant basic metrics to each experiment.
+        after (Optional[int]): Return experiments with an id greater than this cursor.
+        limit (int): Maximum number of experiments per page.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: The experiments and `next_after`, which is null on the last page.
+    """
+    experiments, next_after = list_experiments(
+        db, limit, experiment_type=experiment_type, created_after=created_after,
+        created_before=created_before, deleted=deleted, after=after,
+    )
+    return {"experiments": _list_items(db, experiments, include_summary), "next_after": next_after}
+
+@app.get("/experiments/batch")
+def get_experiments_batch(
+    id: List[int] = Query(..., min_length=1, max_length=MAX_BATCH_IDS),
+    deleted: Literal["active", "deleted", "all"] = "active",
+    include_summary: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve several experiments by id in one request, e.g. `?id=1&id=2&id=3`.
+
+    Args:
+        id (List[int]): The experiment ids, at most 100.
+        deleted (str): active (default), deleted or all.
+        include_summary (bool): Add per-variant basic metrics to each experiment.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: The experiments found, in the order requested, and the ids that were not found.
+    """
+    experiments = get_experiments(db, id, deleted=deleted)
+    found = {experiment.id for experiment in experiments}
+    return {
+        "experiments": _list_items(db, experiments, include_summary),
+        "missing": [experiment_id for experiment_id in dict.fromkeys(id) if experiment_id not in found],
+    }
 
 @app.delete("/experiment/{experiment_id}")
 def soft_delete_experiment(experiment_id: int, db: Session = Depends(get_db)):
@@ -178,15 +219,72 @@ def soft_delete_experiment(experiment_id: int, db: Session = Depends(get_db)):
     
     experiment.deleted_at = datetime.now()
     db.commit()
+    response_cache.invalidate(experiment_id)
+    assignment_service.notify()
     return {"message": "Experiment deleted successfully"}
 
+def _assignment_config(experiment_id: int) -> AssignmentConfig:
+    config = assignment_service.get(experiment_id)
+    if config is None:
+        if not assignment_service.ready:
+            raise HTTPException(status_code=503, detail="Assignment snapshot is not loaded yet")
+        raise HTTPException(status_code=404, detail="Experiment not found or has no variant weights")
+    return config
+
+@app.get("/experiment/{experiment_id}/assign")
+async def assign_variant(experiment_id: int, user_id: str = Query(..., min_length=1, max_length=50)):
+    """
+    Assign a user to a variant of an experiment.
+
+    The assignment is a salted hash of the user id over the experiment's
+    `variant_weights`, so the same user always gets the same variant. It is
+    served from an in-memory snapshot of the active experiments without
+    touching the database; experiments created or deleted are picked up by
+    the snapshot's background refresh moments later.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        user_id (str): The user to assign.
+
+    Returns:
+        dict: The experiment, user and assigned variant.
+
+    Raises:
+        HTTPException: 404 if the experiment is not active or has no weights, 503 before the first snapshot load.
+    """
+    config = _assignment_config(experiment_id)
+    return {"experiment_id": experiment_id, "user_id": user_id, "variant": config.assign(user_id)}
+
+@app.post("/experiment/{experiment_id}/assign:batch")
+async def assign_variants(experiment_id: int, request: AssignmentBatchRequest):
+    """
+    Assign many users to variants of an experiment in one request.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        request (AssignmentBatchRequest): The users to assign, at most 10,000.
+
+    Returns:
+        dict: The experiment and the assigned variant keyed by user id.
+
+    Raises:
+        HTTPException: 404 if the experiment is not active or has no weights, 503 before the first snapshot load.
+    """
+    config = _assignment_config(experiment_id)
+    return {"experiment_id": experiment_id, "assignments": config.assign_many(request.user_ids)}
+
 @app.get("/api/experiment/{experiment_id}/metrics/basic")
-def get_experiment_basic_metrics(experiment_id: int, db: Session = Depends(get_db)):
+def get_experiment_basic_metrics(experiment_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Retrieve basic experiment metrics by experiment ID.
 
+    Metrics are read from the per-variant rollups, so the cost is independent
+    of the number of events. Like `get_experiment`, responses are cached and
+    revalidated with ETags until the experiment is next written to.
+
     Args:
         experiment_id (int): The ID of the experiment to retrieve metrics for.
+        request (Request): The incoming request, for If-None-Match.
         db (Session): The database session dependency.
 
     Returns:
@@ -195,37 +293,482 @@ def get_experiment_basic_metrics(experiment_id: int, db: Session = Depends(get_d
     Raises:
         HTTPException: If the experiment is not found, raises a 404 HTTP exception.
     """
+    cached, generation = response_cache.lookup(request, "metrics:basic", experiment_id)
+    if cached is not None:
+        return cached
     experiment = db.query(BaseExperiment).filter(BaseExperiment.id == experiment_id, BaseExperiment.deleted_at.is_(None)).first()
     if not experiment:
         raise HTTPException(status_code=404, detail="Experiment not found")
     
-    experiment_data=db.query(ExperimentData).filter(ExperimentData.experiment_id==experiment_id).all()
-    if not experiment_data:
+    metrics = get_variant_metrics(db, experiment_id)
+    if not metrics:
         raise HTTPException(status_code=404, detail="No experiment data found for the experiment")
-    
-    metrics={}
-
-    for data in experiment_data:
-        variant=data.variant
-        if variant not in metrics:
-            metrics[variant]={
-                "total_revenue":0.0,
-                "total_conversion":0,
-                "total_entries":0,
-                "total_engagement_minutes":0.0
-            }
-        metrics[variant]["total_revenue"]+=data.revenue
-        metrics[variant]["total_conversion"]+=1 if data.conversion else 0
-        metrics[variant]["total_entries"]+=1
-        metrics[variant]["total_engagement_minutes"]+=data.engagement_minutes
-    
-    for variant,values in metrics.items():
-        values["conversion_rate"]=(
-            (values["total_conversion"]/values["total_entries"]) * 100
-        ) if values["total_entries"]>0 else 0.0
-        
-        values["average_engagement_minutes"]=(
-            values["total_engagement_minutes"]/values["total_entries"]
-        ) if values["total_entries"]>0 else 0.0
-    return {"experiment_id":experiment_id,"metrics":metrics}
-        
\ No newline at end of file
+    return response_cache.store(request, "metrics:basic", experiment_id, {"experiment_id":experiment_id,"metrics":metrics}, generation)
+
+@app.get("/api/experiment/{experiment_id}/metrics/timeseries")
+def get_experiment_timeseries(
+    experiment_id: int,
+    bucket: Literal["minute", "hour", "day"] = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cumulative: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve counts, conversions and revenue per variant and time bucket.
+
+    Events are grouped by `date_trunc(bucket, timestamp)` in the database. In
+    cumulative mode each point holds running totals since `start` (or the
+    first event), ready to chart as-is.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        bucket (str): Bucket size: minute, hour or day.
+        start (Optional[datetime]): Only include events at or after this time.
+        end (Optional[datetime]): Only include events before this time.
+        cumulative (bool): Return running totals instead of per-bucket values.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: Points per variant, each with bucket start, count, conversions, revenue and conversion rate.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found, 400 if `start` is not before `end`.
+    """
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    _get_active_experiment(db, experiment_id)
+    series = get_variant_timeseries(db, experiment_id, bucket, start=start, end=end, cumulative=cumulative)
+    return {"experiment_id": experiment_id, "bucket": bucket, "cumulative": cumulative, "series": series}
+
+@app.get("/api/experiment/{experiment_id}/metrics/segments")
+def get_experiment_segments(
+    experiment_id: int,
+    by: List[str] = Query(..., min_length=1, max_length=3),
+    filter: List[str] = Query([]),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Break down per-variant metrics by keys of the events' `additional_data`.
+
+    Grouping runs in the database in a single query. `filter` values
+    (`key:value`) restrict the events with a JSONB containment test served by
+    the GIN index on `additional_data`. The sufficient statistics returned can
+    be fed straight into segment-level analyses.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        by (List[str]): One to three `additional_data` keys to group by, e.g. `by=country&by=device`.
+        filter (List[str]): `key:value` pairs the events must match, e.g. `filter=channel:email`.
+        start (Optional[datetime]): Only include events at or after this time.
+        end (Optional[datetime]): Only include events before this time.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: Segments, each with its key values and per-variant statistics and metrics. Events without a key
+        fall in the segment where that key is null.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found, 400 for an invalid key or filter.
+    """
+    filters = {}
+    for condition in filter:
+        key, separator, value = condition.partition(":")
+        if not separator:
+            raise HTTPException(status_code=400, detail=f"Filter must be key:value, got {condition!r}")
+        filters[key] = value
+
+    _get_active_experiment(db, experiment_id)
+    try:
+        segments, truncated = get_segment_stats(db, experiment_id, by, filters, start=start, end=end)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    for segment in segments:
+        segment["variants"] = {
+            variant: {"stats": stats, "metrics": stats_to_metrics(stats)}
+            for variant, stats in segment["variants"].items()
+        }
+    return {"experiment_id": experiment_id, "by": by, "filters": filters, "segments": segments, "truncated": truncated}
+
+@app.get("/api/experiment/{experiment_id}/metrics/users")
+def get_experiment_user_metrics(
+    experiment_id: int,
+    approximate: bool = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve per-user metrics: unique users, user-level conversion rate and revenue per user.
+
+    Only events sent with a `user_id` count. The exact mode collapses events
+    to users in the database, which scans every identified event in range.
+    The approximate mode merges the daily HyperLogLog sketches kept next to
+    the rollups instead: its cost depends on the number of days, user counts
+    carry about `relative_error` standard error, and the range is widened to
+    whole days.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        approximate (bool): Estimate distinct users from the sketches instead of counting them exactly.
+        start (Optional[datetime]): Only include events at or after this time.
+        end (Optional[datetime]): Only include events before this time.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: Per-variant user-level statistics and metrics.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found, 400 if `start` is not before `end`.
+    """
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    _get_active_experiment(db, experiment_id)
+    if approximate:
+        user_stats = get_approximate_user_stats(db, experiment_id, start=start, end=end)
+    else:
+        user_stats = get_user_stats(db, experiment_id, start=start, end=end)
+    return {
+        "experiment_id": experiment_id,
+        "approximate": approximate,
+        "relative_error": HLL_STANDARD_ERROR if approximate else 0.0,
+        "variants": {
+            variant: {"stats": stats, "metrics": user_stats_to_metrics(stats)}
+            for variant, stats in user_stats.items()
+        },
+    }
+
+def _bulk_ingest(db: Session, experiment_id: int, body: bytes, content_type: str):
+    _get_active_experiment(db, experiment_id)
+    return ingest_records(db, experiment_id, iter_records(body, content_type))
+
+@app.post("/experiment/{experiment_id}/events:bulk")
+async def bulk_ingest_events(experiment_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Bulk-load raw events for an experiment.
+
+    The body may be a JSON array (`application/json`), newline-delimited JSON
+    (`application/x-ndjson`) or CSV with a header row (`text/csv`). Rows are
+    validated and written in batches; invalid rows are reported, not fatal.
+
+    Args:
+        experiment_id (int): The ID of the experiment the events belong to.
+        request (Request): The incoming request carrying the events.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: Inserted and rejected counts, per-row rejections and throughput in rows/sec.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found, 400/415 for unreadable bodies.
+    """
+    body = await request.body()
+    return await run_in_threadpool(
+        _bulk_ingest, db, experiment_id, body, request.headers.get("content-type")
+    )
+
+@app.post("/experiment/{experiment_id}/events:stream")
+async def stream_ingest_events(experiment_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Stream raw events for an experiment as newline-delimited JSON.
+
+    Unlike the bulk endpoint the body is never held in memory: lines are
+    validated as they arrive and written in fixed-size batches, and reading
+    pauses while a batch is being written.
+
+    Args:
+        experiment_id (int): The ID of the experiment the events belong to.
+        request (Request): The incoming request streaming the events.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: Inserted and rejected counts, per-row rejections and throughput in rows/sec.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found, 415 if the body is not NDJSON.
+    """
+    media_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    if media_type not in NDJSON_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail="Streaming ingestion expects application/x-ndjson")
+    await run_in_threadpool(_get_active_experiment, db, experiment_id)
+    return await ingest_stream(db, experiment_id, request.stream())
+
+@app.get("/experiment/{experiment_id}/events")
+def list_events(
+    experiment_id: int,
+    after: Optional[int] = Query(None, ge=0),
+    limit: int = Query(1000, ge=1, le=10_000),
+    db: Session = Depends(get_db),
+):
+    """
+    Page through the raw events of an experiment in id order.
+
+    Pages are addressed by keyset rather than offset: pass the `next_after`
+    of one page as `after` to get the next, and every page costs the same
+    however far into the experiment it is.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        after (Optional[int]): Return events with an id greater than this cursor.
+        limit (int): Maximum number of events per page.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: The events and `next_after`, which is null on the last page.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found.
+    """
+    _get_active_experiment(db, experiment_id)
+    events, next_after = get_events_page(db, experiment_id, after, limit)
+    return {"experiment_id": experiment_id, "events": events, "next_after": next_after}
+
+@app.get("/experiment/{experiment_id}/events:export")
+def export_events(
+    experiment_id: int,
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    after: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream every event of an experiment as NDJSON, CSV or Parquet.
+
+    Rows are read through a server-side cursor and encoded batch by batch,
+    so memory stays flat however many events the experiment has. Pass the
+    last exported id as `after` to resume an interrupted export.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        format (str): ndjson, csv or parquet.
+        after (Optional[int]): Only export events with an id greater than this.
+        db (Session): The database session dependency.
+
+    Returns:
+        StreamingResponse: The encoded events, as an attachment.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found.
+    """
+    _get_active_experiment(db, experiment_id)
+    media_type, extension, encoder = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(experiment_id, encoder, after),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="experiment-{experiment_id}-events.{extension}"'},
+    )
+
+@app.get("/api/experiment/{experiment_id}/metrics/significance")
+def get_experiment_significance(experiment_id: int, control: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Test every variant against the control for conversion, revenue and engagement.
+
+    Conversion uses a two-proportion z-test and revenue/engagement use Welch's
+    t-test, at the experiment's `significance_level`; the minimum detectable
+    effect is reported at its `power`. Everything is computed from the
+    per-variant rollups, so the cost depends only on the number of variants.
+
+    Args:
+        experiment_id (int): The ID of the experiment to analyse.
+        control (Optional[str]): The control variant. Defaults to the first variant in sort order.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: Lift, difference, confidence interval, test statistic and p-value per variant and metric.
+
+    Raises:
+        HTTPException: 404 if the experiment or its data is not found, 400 if the control variant is unknown.
+    """
+    experiment = _get_active_experiment(db, experiment_id)
+    variant_stats = get_variant_stats(db, experiment_id)
+    if not variant_stats:
+        raise HTTPException(status_code=404, detail="No experiment data found for the experiment")
+
+    alpha, power = experiment_parameters(experiment)
+    try:
+        analysis = analyze_significance(variant_stats, control=control, alpha=alpha, power=power)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown control variant: {control}")
+    return {"experiment_id": experiment_id, "significance_level": alpha, "power": power, **analysis}
+
+@app.get("/api/experiment/{experiment_id}/metrics/sequential")
+def get_experiment_sequential(experiment_id: int, db: Session = Depends(get_db)):
+    """
+    Report the always-valid sequential test (mSPRT) of every variant against the control.
+
+    Unlike `/metrics/significance`, the p-values and confidence intervals stay
+    valid however often they are checked: they are updated from the rollups
+    as each ingestion batch commits, keeping the running minimum p-value and
+    the running intersection of intervals. The decision is `reject` once the
+    p-value reaches the experiment's `significance_level`, `accept` once both
+    groups reach their planned sample sizes without that, and `continue`
+    otherwise. Reading it costs one primary-key lookup per variant and metric.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: The control and, per variant and metric, the current test state and decision.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found or has fewer than two variants with data.
+    """
+    experiment = _get_active_experiment(db, experiment_id)
+    state = get_sequential_state(db, experiment_id)
+    if not state and update_sequential_state(db, experiment_id, experiment=experiment):
+        # Experiments with data from before the state table existed are initialized on first read.
+        db.commit()
+        state = get_sequential_state(db, experiment_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Sequential test needs data for at least two variants")
+
+    alpha, power = experiment_parameters(experiment)
+    variants = {}
+    for row in state:
+        variants.setdefault(row.variant, {})[row.metric] = {
+            **{field: getattr(row, field) for field in SEQUENTIAL_FIELDS},
+            "decided_at": row.decided_at,
+            "updated_at": row.updated_at,
+        }
+    return {
+        "experiment_id": experiment_id,
+        "significance_level": alpha,
+        "power": power,
+        "control": state[0].control,
+        "variants": variants,
+    }
+
+@app.get("/api/experiment/{experiment_id}/metrics/bootstrap")
+def get_experiment_bootstrap(
+    experiment_id: int,
+    control: Optional[str] = None,
+    resamples: int = Query(1000, ge=100, le=100_000),
+    seed: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Bootstrap confidence intervals for revenue and engagement per variant and against the control.
+
+    Unlike the normal-approximation intervals of the significance endpoint
+    these make no assumption about the shape of the distribution, which
+    matters for heavily skewed revenue. The events are read from the
+    experiment's memory-mapped snapshot, which is only extended when new
+    events have arrived. Resampling runs on a process pool; pass `seed` for
+    reproducible intervals.
+
+    Args:
+        experiment_id (int): The ID of the experiment to analyse.
+        control (Optional[str]): The control variant. Defaults to the first variant in sort order.
+        resamples (int): Number of bootstrap resamples.
+        seed (Optional[int]): Random seed.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: Means, differences and lifts with percentile intervals at 1 - significance_level.
+
+    Raises:
+        HTTPException: 404 if the experiment or its data is not found, 400 if the control variant is unknown.
+    """
+    experiment = _get_active_experiment(db, experiment_id)
+    samples = get_samples(db, experiment_id)
+    if not samples.variants:
+        raise HTTPException(status_code=404, detail="No experiment data found for the experiment")
+    # The samples are in memory; don't hold a pooled connection while resampling.
+    db.close()
+
+    alpha = experiment.significance_level if experiment.significance_level is not None else 0.05
+    try:
+        analysis = analyze_bootstrap(samples, control=control, n_resamples=resamples, seed=seed, confidence=1 - alpha)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown control variant: {control}")
+    return {"experiment_id": experiment_id, **analysis}
+
+def _analysis_data_version(db: Session, experiment_id: int) -> str:
+    _get_active_experiment(db, experiment_id)
+    return get_data_version(db, experiment_id)
+
+@app.post("/experiment/{experiment_id}/analyses", status_code=202)
+async def submit_analysis(experiment_id: int, analysis: AnalysisRequest, response: Response, db: Session = Depends(get_db)):
+    """
+    Start a long-running analysis in the background.
+
+    Results are cached per data version: if the experiment has received no
+    events since the same analysis last ran, the result is returned at once
+    with status 200. Otherwise the job is queued (or an identical job already
+    in flight is reused) and its id returned with status 202.
+
+    Args:
+        experiment_id (int): The ID of the experiment to analyse.
+        analysis (AnalysisRequest): The analysis kind and its parameters.
+        response (Response): Used to switch to 200 on a cache hit.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: The job, including its id, status and, when finished, its result.
+
+    Raises:
+        HTTPException: 404 if the experiment is not found, 422 if the parameters are invalid,
+        429 if the analysis queue is full.
+    """
+    try:
+        params = parse_params(analysis.kind, analysis.params)
+    except ValidationError as error:
+        raise HTTPException(status_code=422, detail=error.errors(include_url=False, include_context=False))
+
+    data_version = await run_in_threadpool(_analysis_data_version, db, experiment_id)
+    try:
+        job = job_manager.submit(experiment_id, analysis.kind, params, data_version)
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Too many analyses queued, retry later")
+    if job.status == SUCCEEDED:
+        response.status_code = 200
+    return job.to_dict()
+
+def _get_job(experiment_id: int, job_id: str):
+    job = job_manager.get(job_id)
+    if job is None or job.experiment_id != experiment_id:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return job
+
+@app.get("/experiment/{experiment_id}/analyses/{job_id}")
+async def get_analysis(experiment_id: int, job_id: str):
+    """
+    Retrieve the status of a background analysis and, once it has succeeded, its result.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        job_id (str): The job id returned when the analysis was submitted.
+
+    Returns:
+        dict: The job, including its status, result or error.
+
+    Raises:
+        HTTPException: 404 if the job is not found.
+    """
+    return _get_job(experiment_id, job_id).to_dict()
+
+@app.delete("/experiment/{experiment_id}/analyses/{job_id}")
+async def cancel_analysis(experiment_id: int, job_id: str):
+    """
+    Cancel a pending or running background analysis.
+
+    A running analysis stops at its next cancellation check; if it has not
+    stopped within half a second the job is returned as "cancelling" and
+    turns "cancelled" later.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        job_id (str): The job id returned when the analysis was submitted.
+
+    Returns:
+        dict: The job after cancellation, "cancelled" or still "cancelling".
+
+    Raises:
+        HTTPException: 404 if the job is not found, 409 if it has already finished.
+    """
+    job = _get_job(experiment_id, job_id)
+    if job.finished_at is not None:
+        raise HTTPException(status_code=409, detail=f"Analysis already {job.status}")
+    return (await job_manager.cancel(job_id)).to_dict()
@@ -0,0 +1,186 @@
+import json
+from datetime import datetime
+from typing import Annotated, Any, Dict, Literal, Optional,List, Union
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+class ExperimentBase(BaseModel):
+    variant:str
+    timestamp:datetime
+    conversion:bool
+    revenue:float=0.0
+    engagement_minutes:float=0.0
+
+
+class ExperimentVariantData(BaseModel):
+    variant: str
+    conversion: bool
+    revenue: Optional[float] = 0.0
+    engagement_minutes: Optional[float] = 0.0
+    # A JSON object of segment attributes (e.g. {"country": "US"}); plain strings are still accepted.
+    additional_data: Optional[Union[Dict[str, Any], str]] = None
+    # Identify the user behind the event, for per-user metrics.
+    user_id: Optional[str] = Field(None, max_length=50)
+    session_id: Optional[str] = Field(None, max_length=50)
+
+    @field_validator("additional_data", mode="before")
+    @classmethod
+    def parse_json_object(cls, value):
+        # CSV cells and older clients send the object as a JSON string; store it as an object so it can be segmented on.
+        if isinstance(value, str) and value.lstrip().startswith("{"):
+            try:
+                parsed = json.loads(value)
+            except ValueError:
+                return value
+            if isinstance(parsed, dict):
+                return parsed
+        return value
+
+class ExperimentEventData(ExperimentVariantData):
+    """
+    A single raw event sent to the bulk ingestion endpoint.
+
+    Attributes:
+        timestamp (Optional[datetime]): When the event happened. Defaults to the ingestion time.
+    """
+    timestamp: Optional[datetime] = None
+
+class ExperimentCreate(BaseModel):
+    # Lengths match the experiment table's columns, so oversized values are a 422 instead of a database error.
+    name: str = Field(max_length=50)
+    description: str = Field(max_length=255)
+    goal_metric: str = Field(max_length=50)
+    experiment_type: str = Field(max_length=50)
+    desired_outcome: str = Field(max_length=255)
+    null_hypothesis: str = Field(max_length=255)
+    alternative_hypothesis: str = Field(max_length=255)
+    sample_size_group_a: int
+    sample_size_group_b: int
+    significance_level: float = Field(gt=0, lt=1)
+    power: float = Field(gt=0, lt=1)
+    bias_control_method: str = Field(max_length=50)
+    identified_confounders: str = Field(max_length=255)
+    success_metrics: str = Field(max_length=50)
+    experiment_variants: List[ExperimentVariantData]  # This must be a list of ExperimentVariantData
+    # Relative traffic per variant for /assign; defaults to an even split over the variants above.
+    variant_weights: Optional[Dict[str, float]] = None
+
+    @field_validator("variant_weights")
+    @classmethod
+    def check_variant_weights(cls, value):
+        if value is None:
+            return value
+        if not value or any(not variant or len(variant) > 50 for variant in value):
+            raise ValueError("variant_weights must name variants of 1 to 50 characters")
+        if any(weight < 0 for weight in value.values()) or not any(weight > 0 for weight in value.values()):
+            raise ValueError("variant_weights must be non-negative with at least one positive weight")
+        return value
+# Response model for ExperimentData
+class ExperimentDataResponse(BaseModel):
+
+    id: int
+    experiment_id: int
+    variant: str
+    timestamp: datetime
+    conversion: bool
+    revenue: float
+    engagement_minutes: float
+    additional_data: Optional[Union[Dict[str, Any], str]]
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    # Enable ORM mode for SQLAlchemy serialization
+    model_config = ConfigDict(from_attributes=True)
+
+# Request model for ExperimentDataBase
+class ExperimentDataBase(BaseModel):
+    """
+    ExperimentDataBase is a Pydantic model that represents the structure of experiment data for incoming requests.
+
+    Attributes:
+        name (str): The name of the experiment.
+        description (Optional[str]): A brief description of the experiment.
+        experiment_type (str): The type of the experiment.
+        variant (str): The variant of the experiment.
+        conversion (bool): Indicates if the experiment involves conversion.
+        revenue (Optional[float]): The revenue generated from the experiment.
+        engagement_minutes (Optional[float]): The engagement time in minutes.
+        additional_data (Optional[str]): Any additional data related to the experiment.
+    """
+    name: str
+    description: Optional[str]
+    experiment_type: str
+    variant: str
+    conversion: bool
+    revenue: Optional[float] = 0.0
+    engagement_minutes: Optional[float] = 0.0
+    additional_data: Optional[str] = None
+
+# Response model for BaseExperiment
+class ExperimentResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str]
+    experiment_type: str
+    goal_metric: Optional[str] = None
+    desired_outcome: Optional[str] = None
+    null_hypothesis: Optional[str] = None
+    alternative_hypothesis: Optional[str] = None
+    sample_size_group_a: Optional[int] = None
+    sample_size_group_b: Optional[int] = None
+    significance_level: Optional[float] = None
+    power: Optional[float] = None
+    bias_control_method: Optional[str] = None
+    identified_confounders: Optional[str] = None
+    success_metrics: Optional[str] = None
+    variant_weights: Optional[Dict[str, float]] = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Response model for experiments returned by the list and multi-get endpoints
+class ExperimentListItem(ExperimentResponse):
+    """
+    ExperimentListItem is an experiment as listed, optionally with its per-variant basic metrics.
+
+    Attributes:
+        deleted_at (Optional[datetime]): When the experiment was soft-deleted, if it was.
+        variants (Optional[dict]): Basic metrics keyed by variant, when requested.
+    """
+    deleted_at: Optional[datetime] = None
+    variants: Optional[Dict[str, Dict[str, float]]] = None
+
+# Parameters for a background significance analysis
+class SignificanceParams(BaseModel):
+    control: Optional[str] = None
+
+# Parameters for a background bootstrap analysis
+class BootstrapParams(BaseModel):
+    control: Optional[str] = None
+    resamples: int = Field(1000, ge=100, le=100_000)
+    seed: Optional[int] = None
+
+# Request model for background analyses
+class AnalysisRequest(BaseModel):
+    """
+    AnalysisRequest asks for a background analysis of an experiment.
+
+    Attributes:
+        kind (str): The analysis to run.
+        params (dict): Analysis parameters, validated against the kind's parameter model.
+    """
+    kind: Literal["significance", "bootstrap"]
+    params: Dict[str, Any] = {}
+
+# Request model for batch variant assignment
+class AssignmentBatchRequest(BaseModel):
+    """
+    AssignmentBatchRequest lists the users to assign to an experiment's variants.
+
+    Attributes:
+        user_ids (List[str]): The users, at most 10,000.
+    """
+    user_ids: List[Annotated[str, Field(min_length=1, max_length=50)]] = Field(min_length=1, max_length=10_000)
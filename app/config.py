@@ -0,0 +1,116 @@
+# This file reads application settings from the environment.
+
+import os
+from dataclasses import dataclass
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Settings holds the runtime configuration, read once from environment variables.
+
+    Attributes:
+        database_url (str): SQLAlchemy URL of the Postgres database (DATABASE_URL).
+        db_mode (str): "sync" or "async" request path for the experiment endpoints (DB_MODE).
+        db_pool_size (int): Connections kept open per worker process (DB_POOL_SIZE).
+        db_max_overflow (int): Extra connections allowed above the pool size under load (DB_MAX_OVERFLOW).
+        db_pool_timeout (float): Seconds to wait for a free connection before failing (DB_POOL_TIMEOUT).
+        db_pool_recycle (int): Seconds after which a pooled connection is replaced; -1 disables (DB_POOL_RECYCLE).
+        db_pool_pre_ping (bool): Test connections on checkout so failovers do not surface as errors (DB_POOL_PRE_PING).
+        db_pool_warmup (int): Connections each worker opens at startup, capped at the pool size; 0 disables (DB_POOL_WARMUP).
+        db_statement_timeout_ms (int): Server-side statement timeout in milliseconds; 0 disables (DB_STATEMENT_TIMEOUT_MS).
+        db_pgbouncer (bool): Run behind PgBouncer in transaction pooling mode (DB_PGBOUNCER).
+        db_partition_events (bool): Have the migrations partition experiment_data by month (DB_PARTITION_EVENTS).
+        db_partition_months_ahead (int): Future monthly partitions kept ready (DB_PARTITION_MONTHS_AHEAD).
+        bootstrap_workers (int): Processes used for bootstrap resampling; 0 means one per CPU (BOOTSTRAP_WORKERS).
+        analysis_workers (int): Background analyses that may run at once (ANALYSIS_WORKERS).
+        analysis_queue_size (int): Most background analyses waiting or running before new ones are refused (ANALYSIS_QUEUE_SIZE).
+        analysis_cache_size (int): Analysis results kept in the result cache (ANALYSIS_CACHE_SIZE).
+        response_cache_ttl (float): Seconds experiment and metrics responses stay cached; 0 disables (RESPONSE_CACHE_TTL).
+        response_cache_size (int): Responses kept in the in-process response cache (RESPONSE_CACHE_SIZE).
+        n_plus_one_threshold (int): Repetitions of one SELECT within a request flagged as N+1; 0 disables (N_PLUS_ONE_THRESHOLD).
+        profiling_token (str): Secret the X-Profile header must carry to profile a request; empty disables (PROFILING_TOKEN).
+        profiling_interval_ms (float): Milliseconds between profiler samples (PROFILING_INTERVAL_MS).
+        log_level (str): Root log level (LOG_LEVEL).
+        log_levels (str): Per-logger levels as `name=LEVEL,name=LEVEL` (LOG_LEVELS).
+        log_format (str): "json" or "text" log lines (LOG_FORMAT).
+        log_queue_size (int): Log records buffered for the writer thread before new ones are dropped (LOG_QUEUE_SIZE).
+        log_payload_sample_rate (float): Fraction of request payloads logged at DEBUG level (LOG_PAYLOAD_SAMPLE_RATE).
+        log_payload_max_bytes (int): Longest logged payload; longer ones are truncated (LOG_PAYLOAD_MAX_BYTES).
+        assignment_refresh_seconds (float): Seconds between reloads of the assignment snapshot (ASSIGNMENT_REFRESH_SECONDS).
+        snapshot_dir (str): Directory of the columnar event snapshots used by analyses; empty, the default, disables them (SNAPSHOT_DIR).
+    """
+    database_url: str = "postgresql://user:password@db:5432/test_db"
+    db_mode: str = "sync"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_warmup: int = 2
+    db_statement_timeout_ms: int = 0
+    db_pgbouncer: bool = False
+    db_partition_events: bool = False
+    db_partition_months_ahead: int = 3
+    bootstrap_workers: int = 0
+    analysis_workers: int = 2
+    analysis_queue_size: int = 100
+    analysis_cache_size: int = 256
+    response_cache_ttl: float = 30.0
+    response_cache_size: int = 1024
+    n_plus_one_threshold: int = 10
+    profiling_token: str = ""
+    profiling_interval_ms: float = 5.0
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_format: str = "json"
+    log_queue_size: int = 10_000
+    log_payload_sample_rate: float = 0.0
+    log_payload_max_bytes: int = 2048
+    assignment_refresh_seconds: float = 30.0
+    snapshot_dir: str = ""
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        defaults = cls()
+        return cls(
+            database_url=os.getenv("DATABASE_URL", defaults.database_url),
+            db_mode=os.getenv("DB_MODE", defaults.db_mode).lower(),
+            db_pool_size=int(os.getenv("DB_POOL_SIZE", defaults.db_pool_size)),
+            db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", defaults.db_max_overflow)),
+            db_pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", defaults.db_pool_timeout)),
+            db_pool_recycle=int(os.getenv("DB_POOL_RECYCLE", defaults.db_pool_recycle)),
+            db_pool_pre_ping=_env_bool("DB_POOL_PRE_PING", defaults.db_pool_pre_ping),
+            db_pool_warmup=int(os.getenv("DB_POOL_WARMUP", defaults.db_pool_warmup)),
+            db_statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", defaults.db_statement_timeout_ms)),
+            db_pgbouncer=_env_bool("DB_PGBOUNCER", defaults.db_pgbouncer),
+            db_partition_events=_env_bool("DB_PARTITION_EVENTS", defaults.db_partition_events),
+            db_partition_months_ahead=int(os.getenv("DB_PARTITION_MONTHS_AHEAD", defaults.db_partition_months_ahead)),
+            bootstrap_workers=int(os.getenv("BOOTSTRAP_WORKERS", defaults.bootstrap_workers)),
+            analysis_workers=int(os.getenv("ANALYSIS_WORKERS", defaults.analysis_workers)),
+            analysis_queue_size=int(os.getenv("ANALYSIS_QUEUE_SIZE", defaults.analysis_queue_size)),
+            analysis_cache_size=int(os.getenv("ANALYSIS_CACHE_SIZE", defaults.analysis_cache_size)),
+            response_cache_ttl=float(os.getenv("RESPONSE_CACHE_TTL", defaults.response_cache_ttl)),
+            response_cache_size=int(os.getenv("RESPONSE_CACHE_SIZE", defaults.response_cache_size)),
+            n_plus_one_threshold=int(os.getenv("N_PLUS_ONE_THRESHOLD", defaults.n_plus_one_threshold)),
+            profiling_token=os.getenv("PROFILING_TOKEN", defaults.profiling_token),
+            profiling_interval_ms=float(os.getenv("PROFILING_INTERVAL_MS", defaults.profiling_interval_ms)),
+            log_level=os.getenv("LOG_LEVEL", defaults.log_level).upper(),
+            log_levels=os.getenv("LOG_LEVELS", defaults.log_levels),
+            log_format=os.getenv("LOG_FORMAT", defaults.log_format).lower(),
+            log_queue_size=int(os.getenv("LOG_QUEUE_SIZE", defaults.log_queue_size)),
+            log_payload_sample_rate=float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", defaults.log_payload_sample_rate)),
+            log_payload_max_bytes=int(os.getenv("LOG_PAYLOAD_MAX_BYTES", defaults.log_payload_max_bytes)),
+            assignment_refresh_seconds=float(os.getenv("ASSIGNMENT_REFRESH_SECONDS", defaults.assignment_refresh_seconds)),
+            snapshot_dir=os.getenv("SNAPSHOT_DIR", defaults.snapshot_dir),
+        )
+
+
+settings = Settings.from_env()
@@ -0,0 +1,444 @@
+# This file holds the SQL aggregation queries behind the metrics endpoints.
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import case, func, literal_column, select
+from sqlalchemy.orm import Session
+from app.db.models import ExperimentData, VariantRollup
+
+# Sufficient statistics kept per (experiment, variant), in the order used by variant_rollup.
+STAT_FIELDS = (
+    "count",
+    "conversions",
+    "revenue_sum",
+    "revenue_sq_sum",
+    "engagement_sum",
+    "engagement_sq_sum",
+)
+
+
+def _stat_columns():
+    revenue = func.coalesce(ExperimentData.revenue, 0.0)
+    engagement = func.coalesce(ExperimentData.engagement_minutes, 0.0)
+    return (
+        func.count().label("count"),
+        func.sum(case((ExperimentData.conversion, 1), else_=0)).label("conversions"),
+        func.sum(revenue).label("revenue_sum"),
+        func.sum(revenue * revenue).label("revenue_sq_sum"),
+        func.sum(engagement).label("engagement_sum"),
+        func.sum(engagement * engagement).label("engagement_sq_sum"),
+    )
+
+
+def _row_stats(row) -> dict:
+    return {
+        "count": int(row.count),
+        "conversions": int(row.conversions),
+        "revenue_sum": float(row.revenue_sum),
+        "revenue_sq_sum": float(row.revenue_sq_sum),
+        "engagement_sum": float(row.engagement_sum),
+        "engagement_sq_sum": float(row.engagement_sq_sum),
+    }
+
+
+def aggregate_raw_variant_stats(db: Session, experiment_id: Optional[int] = None,
+                                start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    """
+    Computes per-variant sufficient statistics straight from `experiment_data`.
+
+    This is the expensive path, used to rebuild and reconcile `variant_rollup`.
+    It runs a single GROUP BY served by the `(experiment_id, variant)` index.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (Optional[int]): Restrict to one experiment; all experiments if None.
+        start (Optional[datetime]): Only count events at or after this time.
+        end (Optional[datetime]): Only count events before this time.
+
+    Returns:
+        dict: Statistics keyed by (experiment_id, variant).
+    """
+    stmt = (
+        select(ExperimentData.experiment_id, ExperimentData.variant, *_stat_columns())
+        .group_by(ExperimentData.experiment_id, ExperimentData.variant)
+    )
+    if experiment_id is not None:
+        stmt = stmt.where(ExperimentData.experiment_id == experiment_id)
+    # Plain comparisons on the partition key, so a partitioned table only scans the partitions in range.
+    if start is not None:
+        stmt = stmt.where(ExperimentData.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(ExperimentData.timestamp < end)
+
+    return {(row.experiment_id, row.variant): _row_stats(row) for row in db.execute(stmt)}
+
+
+# Keys of additional_data that segments may be grouped or filtered by.
+SEGMENT_KEY_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+# Most (segment, variant) rows a breakdown returns.
+MAX_SEGMENT_ROWS = 10_000
+
+
+def segment_stats_query(experiment_id: int, keys: List[str], filters: Optional[Dict[str, str]] = None,
+                        start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """
+    Builds the per-segment, per-variant aggregation over keys of `additional_data`.
+
+    Filters are applied as one JSONB containment test (`@>`), which the GIN
+    index on `additional_data` serves; grouping extracts each key as text.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        keys (List[str]): `additional_data` keys to group by, e.g. ["country", "device"].
+        filters (Optional[Dict[str, str]]): Only count events whose `additional_data` has these values.
+        start (Optional[datetime]): Only count events at or after this time.
+        end (Optional[datetime]): Only count events before this time.
+
+    Returns:
+        Select: Rows of (segment values..., variant, `STAT_FIELDS`...), ordered by segment and variant.
+
+    Raises:
+        ValueError: If a key is not a valid segment key.
+    """
+    for key in list(keys) + list(filters or ()):
+        if not SEGMENT_KEY_PATTERN.fullmatch(key):
+            raise ValueError(f"Invalid segment key: {key}")
+    # Keys are validated and inlined, so the SELECT and GROUP BY expressions are identical on every driver.
+    segments = [ExperimentData.additional_data.op("->>")(literal_column(f"'{key}'")) for key in keys]
+    stmt = (
+        select(*segments, ExperimentData.variant, *_stat_columns())
+        .where(ExperimentData.experiment_id == experiment_id)
+        .group_by(*segments, ExperimentData.variant)
+        .order_by(*segments, ExperimentData.variant)
+    )
+    if filters:
+        stmt = stmt.where(ExperimentData.additional_data.contains(filters))
+    if start is not None:
+        stmt = stmt.where(ExperimentData.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(ExperimentData.timestamp < end)
+    return stmt
+
+
+def get_segment_stats(db: Session, experiment_id: int, keys: List[str], filters: Optional[Dict[str, str]] = None,
+                      start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """
+    Returns sufficient statistics per segment and variant, computed in one query.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The ID of the experiment.
+        keys (List[str]): `additional_data` keys to group by.
+        filters (Optional[Dict[str, str]]): Only count events whose `additional_data` has these values.
+        start (Optional[datetime]): Only count events at or after this time.
+        end (Optional[datetime]): Only count events before this time.
+
+    Returns:
+        tuple: (segments, truncated). Each segment is {"segment": {key: value}, "variants": {variant: stats}};
+        `truncated` is True if more than `MAX_SEGMENT_ROWS` rows matched.
+    """
+    stmt = segment_stats_query(experiment_id, keys, filters, start, end).limit(MAX_SEGMENT_ROWS + 1)
+    rows = db.execute(stmt).all()
+    truncated = len(rows) > MAX_SEGMENT_ROWS
+
+    segments = []
+    for row in rows[:MAX_SEGMENT_ROWS]:
+        values = dict(zip(keys, row[:len(keys)]))
+        if not segments or segments[-1]["segment"] != values:
+            segments.append({"segment": values, "variants": {}})
+        segments[-1]["variants"][row.variant] = _row_stats(row)
+    return segments, truncated
+
+
+def variant_stats_query(experiment_id: int):
+    """
+    Builds the `variant_rollup` SELECT for one experiment, shared by the sync and async readers.
+    """
+    return (
+        select(VariantRollup)
+        .where(VariantRollup.experiment_id == experiment_id, VariantRollup.count > 0)
+        .order_by(VariantRollup.variant)
+    )
+
+
+def rollups_to_stats(rollups) -> dict:
+    """
+    Converts `VariantRollup` rows into statistics keyed by variant name.
+    """
+    return {row.variant: {field: getattr(row, field) for field in STAT_FIELDS} for row in rollups}
+
+
+def get_variant_stats(db: Session, experiment_id: int) -> dict:
+    """
+    Reads the per-variant sufficient statistics for an experiment from `variant_rollup`.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The ID of the experiment.
+
+    Returns:
+        dict: Statistics keyed by variant name. Empty if the experiment has no data.
+    """
+    return rollups_to_stats(db.execute(variant_stats_query(experiment_id)).scalars())
+
+
+def get_variant_stats_by_experiment(db: Session, experiment_ids: Sequence[int]) -> Dict[int, dict]:
+    """
+    Reads the per-variant statistics of several experiments in a single query.
+
+    Args:
+        db (Session): The database session.
+        experiment_ids (Sequence[int]): The experiments to read.
+
+    Returns:
+        Dict[int, dict]: Statistics keyed by experiment id, then variant. Experiments without data are absent.
+    """
+    if not experiment_ids:
+        return {}
+    rollups = db.execute(
+        select(VariantRollup)
+        .where(VariantRollup.experiment_id.in_(set(experiment_ids)), VariantRollup.count > 0)
+        .order_by(VariantRollup.experiment_id, VariantRollup.variant)
+    ).scalars()
+    stats = {}
+    for row in rollups:
+        stats.setdefault(row.experiment_id, {})[row.variant] = {field: getattr(row, field) for field in STAT_FIELDS}
+    return stats
+
+
+# date_trunc units accepted by the timeseries endpoint.
+TIMESERIES_BUCKETS = ("minute", "hour", "day")
+
+
+def timeseries_query(experiment_id: int, bucket: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, cumulative: bool = False):
+    """
+    Builds the per-variant, per-bucket aggregation over `experiment_data.timestamp`.
+
+    The time range is applied to the raw timestamp, not to the truncated
+    bucket, so it can use the (experiment_id, timestamp) index and, when
+    `experiment_data` is partitioned, prune partitions outside the range.
+    In cumulative mode each bucket carries running totals since the start of
+    the range, computed with window functions over the grouped rows.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        bucket (str): One of `TIMESERIES_BUCKETS`.
+        start (Optional[datetime]): Inclusive lower bound on the event timestamp.
+        end (Optional[datetime]): Exclusive upper bound on the event timestamp.
+        cumulative (bool): Return running totals instead of per-bucket values.
+
+    Returns:
+        Select: Rows of (variant, bucket, count, conversions, revenue), ordered by variant and bucket.
+
+    Raises:
+        ValueError: If `bucket` is not supported.
+    """
+    if bucket not in TIMESERIES_BUCKETS:
+        raise ValueError(f"Unsupported bucket: {bucket}")
+    # Inlined rather than bound, so the SELECT and GROUP BY expressions are identical on every driver.
+    bucket_start = func.date_trunc(literal_column(f"'{bucket}'"), ExperimentData.timestamp)
+    measures = (
+        func.count(),
+        func.sum(case((ExperimentData.conversion, 1), else_=0)),
+        func.sum(func.coalesce(ExperimentData.revenue, 0.0)),
+    )
+    if cumulative:
+        measures = tuple(
+            func.sum(measure).over(partition_by=ExperimentData.variant, order_by=bucket_start)
+            for measure in measures
+        )
+
+    stmt = (
+        select(
+            ExperimentData.variant,
+            bucket_start.label("bucket"),
+            measures[0].label("count"),
+            measures[1].label("conversions"),
+            measures[2].label("revenue"),
+        )
+        .where(ExperimentData.experiment_id == experiment_id)
+        .group_by(ExperimentData.variant, bucket_start)
+        .order_by(ExperimentData.variant, bucket_start)
+    )
+    if start is not None:
+        stmt = stmt.where(ExperimentData.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(ExperimentData.timestamp < end)
+    return stmt
+
+
+def get_variant_timeseries(db: Session, experiment_id: int, bucket: str, start: Optional[datetime] = None,
+                           end: Optional[datetime] = None, cumulative: bool = False) -> dict:
+    """
+    Returns counts, conversions and revenue per variant and time bucket.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The ID of the experiment.
+        bucket (str): One of `TIMESERIES_BUCKETS`.
+        start (Optional[datetime]): Inclusive lower bound on the event timestamp.
+        end (Optional[datetime]): Exclusive upper bound on the event timestamp.
+        cumulative (bool): Return running totals since `start` instead of per-bucket values.
+
+    Returns:
+        dict: Lists of points in time order, keyed by variant. Buckets without events are omitted.
+    """
+    series = {}
+    rows = db.execute(timeseries_query(experiment_id, bucket, start, end, cumulative))
+    for variant, bucket_start, count, conversions, revenue in rows:
+        # Window sums come back as NUMERIC.
+        count, conversions = int(count), int(conversions)
+        series.setdefault(variant, []).append({
+            "bucket": bucket_start,
+            "count": count,
+            "conversions": conversions,
+            "revenue": float(revenue),
+            "conversion_rate": (conversions / count) * 100 if count > 0 else 0.0,
+        })
+    return series
+
+
+def user_stats_query(experiment_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """
+    Builds the exact per-variant user-level aggregation.
+
+    Events are first collapsed to one row per (variant, user), then summed per
+    variant, so heavy users count once towards conversion. This needs a
+    DISTINCT-style pass over every identified event; see `app.db.user_sketches`
+    for the approximate alternative.
+
+    Args:
+        experiment_id (int): The ID of the experiment.
+        start (Optional[datetime]): Only count events at or after this time.
+        end (Optional[datetime]): Only count events before this time.
+
+    Returns:
+        Select: Rows of (variant, users, converted_users, events, revenue_sum, revenue_sq_sum).
+    """
+    per_user = (
+        select(
+            ExperimentData.variant,
+            func.bool_or(ExperimentData.conversion).label("converted"),
+            func.count().label("events"),
+            func.sum(func.coalesce(ExperimentData.revenue, 0.0)).label("revenue"),
+        )
+        .where(ExperimentData.experiment_id == experiment_id, ExperimentData.user_id.is_not(None))
+        .group_by(ExperimentData.variant, ExperimentData.user_id)
+    )
+    if start is not None:
+        per_user = per_user.where(ExperimentData.timestamp >= start)
+    if end is not None:
+        per_user = per_user.where(ExperimentData.timestamp < end)
+    per_user = per_user.subquery()
+
+    return (
+        select(
+            per_user.c.variant,
+            func.count().label("users"),
+            func.sum(case((per_user.c.converted, 1), else_=0)).label("converted_users"),
+            func.sum(per_user.c.events).label("events"),
+            func.sum(per_user.c.revenue).label("revenue_sum"),
+            func.sum(per_user.c.revenue * per_user.c.revenue).label("revenue_sq_sum"),
+        )
+        .group_by(per_user.c.variant)
+        .order_by(per_user.c.variant)
+    )
+
+
+def get_user_stats(db: Session, experiment_id: int, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> dict:
+    """
+    Returns exact user-level statistics per variant. Events without a user_id are ignored.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The ID of the experiment.
+        start (Optional[datetime]): Only count events at or after this time.
+        end (Optional[datetime]): Only count events before this time.
+
+    Returns:
+        dict: Keyed by variant: users, converted_users, events, revenue_sum and revenue_sq_sum (per-user revenue).
+    """
+    return {
+        row.variant: {
+            "users": int(row.users),
+            "converted_users": int(row.converted_users),
+            "events": int(row.events),
+            "revenue_sum": float(row.revenue_sum),
+            "revenue_sq_sum": float(row.revenue_sq_sum),
+        }
+        for row in db.execute(user_stats_query(experiment_id, start, end))
+    }
+
+
+def user_stats_to_metrics(stats: dict) -> dict:
+    """
+    Converts one variant's user-level statistics into per-user metrics.
+    """
+    users = stats["users"]
+    return {
+        "unique_users": users,
+        "converted_users": stats["converted_users"],
+        "user_conversion_rate": (stats["converted_users"] / users) * 100 if users > 0 else 0.0,
+        "revenue_per_user": stats["revenue_sum"] / users if users > 0 else 0.0,
+        "events_per_user": stats["events"] / users if users > 0 else 0.0,
+    }
+
+
+def get_data_version(db: Session, experiment_id: int) -> str:
+    """
+    Returns a token that changes whenever events are added to the experiment.
+
+    Built from the rollups, which every insert path updates in the same
+    transaction as the raw rows, so it costs one indexed read.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The ID of the experiment.
+
+    Returns:
+        str: The data version, e.g. "1200:2025-01-01T12:00:00.000000".
+    """
+    total, last_update = db.execute(
+        select(func.coalesce(func.sum(VariantRollup.count), 0), func.max(VariantRollup.updated_at))
+        .where(VariantRollup.experiment_id == experiment_id)
+    ).one()
+    return f"{total}:{last_update.isoformat() if last_update else ''}"
+
+
+def stats_to_metrics(stats: dict) -> dict:
+    """
+    Converts one variant's sufficient statistics into the basic metrics response shape.
+    """
+    count = stats["count"]
+    return {
+        "total_revenue": float(stats["revenue_sum"]),
+        "total_conversion": int(stats["conversions"]),
+        "total_entries": int(count),
+        "total_engagement_minutes": float(stats["engagement_sum"]),
+        "conversion_rate": (stats["conversions"] / count) * 100 if count > 0 else 0.0,
+        "average_engagement_minutes": stats["engagement_sum"] / count if count > 0 else 0.0,
+    }
+
+
+def get_variant_metrics(db: Session, experiment_id: int) -> dict:
+    """
+    Returns the basic per-variant metrics for an experiment.
+
+    Reads one `variant_rollup` row per variant, so the cost does not depend on
+    how many events the experiment has.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The ID of the experiment.
+
+    Returns:
+        dict: Metrics keyed by variant name. Empty if the experiment has no data.
+    """
+    return {
+        variant: stats_to_metrics(stats)
+        for variant, stats in get_variant_stats(db, experiment_id).items()
+    }
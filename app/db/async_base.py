@@ -0,0 +1,34 @@
+# This file manages the asyncio database engine and session used by the async request path.
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.config import Settings, settings
+from app.db.base import configure_engine, engine_options
+
+def create_async_db_engine(settings: Settings):
+    """
+    Creates the asyncpg engine from the same settings as the sync engine.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        AsyncEngine: The configured engine, with pool metrics registered under "async".
+    """
+    # Same database as the sync engine, reached through asyncpg
+    url = settings.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return configure_engine("async", create_async_engine(url, **engine_options(settings, is_async=True)), settings)
+
+
+# Create the async database engine
+async_engine = create_async_db_engine(settings)
+
+# Attributes stay loaded after commit: lazy refreshes cannot run outside the event loop's greenlet.
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Dependency to get the async database session
+async def get_async_db():
+    """
+    Provides an async session for database interaction. Automatically closes the session after use.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,28 +1,106 @@
-# This file manages the database engine, session, and table creation.
+# This file manages the database engine and session; the schema is managed by Alembic.
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from app.db.models import Base  
+from app.config import Settings, settings
+from app.instrumentation.sql import instrument_engine
+from app.db.pool_metrics import (
+    TimedAsyncAdaptedQueuePool,
+    TimedNullPool,
+    TimedQueuePool,
+    register_engine,
+)
 
-# Database URL for PostgRES
-DATABASE_URL = "postgresql://user:password@db:5432/test_db"
+# Database URL for PostgRES (DATABASE_URL in the environment)
+DATABASE_URL = settings.database_url
 
 
-# Create the database engine
-engine = create_engine(
-    DATABASE_URL # Required for POSTGRES
-)
+def engine_options(settings: Settings, is_async: bool = False) -> dict:
+    """
+    Translates pool and connection settings into `create_engine` keyword arguments.
+
+    In PgBouncer mode the application does not pool at all (PgBouncer does),
+    no startup parameters are sent (PgBouncer rejects them) and asyncpg's
+    prepared statement caches are disabled, since consecutive transactions may
+    land on different server connections.
+
+    Args:
+        settings (Settings): The application settings.
+        is_async (bool): Build options for an asyncpg engine instead of psycopg2.
+
+    Returns:
+        dict: Keyword arguments for `create_engine` / `create_async_engine`.
+    """
+    options = {"pool_pre_ping": settings.db_pool_pre_ping}
+    connect_args = {}
+
+    if settings.db_pgbouncer:
+        options["poolclass"] = TimedNullPool
+        if is_async:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    else:
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+        if settings.db_statement_timeout_ms:
+            if is_async:
+                connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def _set_local_statement_timeout(timeout_ms: int):
+    # Session-level SETs would leak to other clients through PgBouncer's
+    # transaction pooling, so the timeout is set again at the start of every
+    # transaction; SET LOCAL ends with it, whichever server connection ran it.
+    def on_begin(connection):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+    return on_begin
 
-# Create a configured "SessionLocal" class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create database tables
-def init_db():
+def pool_capacity(settings: Settings) -> int:
+    return 0 if settings.db_pgbouncer else settings.db_pool_size + settings.db_max_overflow
+
+
+def configure_engine(name: str, engine, settings: Settings):
     """
-    Initializes the database by creating all tables defined in the models.
+    Registers pool metrics, SQL timing and PgBouncer-mode hooks on a freshly created engine.
+    """
+    register_engine(name, engine, pool_capacity(settings))
+    instrument_engine(engine)
+    if settings.db_pgbouncer and settings.db_statement_timeout_ms:
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "begin", _set_local_statement_timeout(settings.db_statement_timeout_ms))
+    return engine
+
+
+def create_db_engine(settings: Settings):
+    """
+    Creates the sync database engine from settings.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        Engine: The configured engine, with pool metrics registered under "sync".
     """
-    Base.metadata.create_all(bind=engine)
-    print("Tables created successfully.")
+    return configure_engine("sync", create_engine(settings.database_url, **engine_options(settings)), settings)
+
+
+# Create the database engine
+engine = create_db_engine(settings)
+
+# Create a configured "SessionLocal" class
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Dependency to get the database session
 def get_db():
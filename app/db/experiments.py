@@ -0,0 +1,81 @@
+# This file lists and batch-reads experiments with keyset pagination.
+
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.models import BaseExperiment
+
+# Values of the `deleted` filter: active only, soft-deleted only, or both.
+DELETED_FILTERS = ("active", "deleted", "all")
+
+
+def _deleted_condition(deleted: str):
+    if deleted == "active":
+        return BaseExperiment.deleted_at.is_(None)
+    if deleted == "deleted":
+        return BaseExperiment.deleted_at.is_not(None)
+    return None
+
+
+def experiments_query(experiment_type: Optional[str] = None, created_after: Optional[datetime] = None,
+                      created_before: Optional[datetime] = None, deleted: str = "active", after: Optional[int] = None):
+    """
+    Builds the filtered keyset query over experiments in id order.
+
+    The default (active only) form is served by the partial index on
+    `id WHERE deleted_at IS NULL`.
+
+    Args:
+        experiment_type (Optional[str]): Only experiments of this type.
+        created_after (Optional[datetime]): Only experiments created at or after this time.
+        created_before (Optional[datetime]): Only experiments created before this time.
+        deleted (str): One of `DELETED_FILTERS`.
+        after (Optional[int]): Only experiments with a larger id.
+
+    Returns:
+        Select: The query.
+    """
+    stmt = select(BaseExperiment).order_by(BaseExperiment.id)
+    condition = _deleted_condition(deleted)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    if experiment_type is not None:
+        stmt = stmt.where(BaseExperiment.experiment_type == experiment_type)
+    if created_after is not None:
+        stmt = stmt.where(BaseExperiment.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(BaseExperiment.created_at < created_before)
+    if after is not None:
+        stmt = stmt.where(BaseExperiment.id > after)
+    return stmt
+
+
+def list_experiments(db: Session, limit: int, **filters) -> Tuple[List[BaseExperiment], Optional[int]]:
+    """
+    Returns one page of experiments and the cursor for the next page.
+
+    Args:
+        db (Session): The database session.
+        limit (int): Page size.
+        **filters: Keyword arguments of `experiments_query`.
+
+    Returns:
+        tuple: (experiments, next cursor or None on the last page).
+    """
+    # One extra row tells whether another page exists without a COUNT.
+    experiments = db.execute(experiments_query(**filters).limit(limit + 1)).scalars().all()
+    next_after = experiments[limit - 1].id if len(experiments) > limit else None
+    return experiments[:limit], next_after
+
+
+def get_experiments(db: Session, experiment_ids: Sequence[int], deleted: str = "active") -> List[BaseExperiment]:
+    """
+    Reads several experiments in one query, in the order their ids were given; unknown ids are left out.
+    """
+    stmt = select(BaseExperiment).where(BaseExperiment.id.in_(set(experiment_ids)))
+    condition = _deleted_condition(deleted)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    by_id = {experiment.id: experiment for experiment in db.execute(stmt).scalars()}
+    return [by_id[experiment_id] for experiment_id in dict.fromkeys(experiment_ids) if experiment_id in by_id]
@@ -0,0 +1,91 @@
+# This file reads raw experiment events back out in id order without loading them all into memory.
+
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.models import ExperimentData
+
+# Rows fetched per server-side cursor round trip when exporting.
+EXPORT_BATCH_SIZE = 10_000
+
+EXPORT_COLUMNS = (
+    "id",
+    "experiment_id",
+    "variant",
+    "timestamp",
+    "conversion",
+    "revenue",
+    "engagement_minutes",
+    "additional_data",
+    "user_id",
+    "session_id",
+    "created_at",
+    "updated_at",
+)
+
+
+def events_query(experiment_id: int, after: Optional[int] = None):
+    """
+    Builds the keyset query for an experiment's events in id order.
+
+    Seeking past `after` uses the (experiment_id, id) index, so every page
+    costs the same however deep it is, unlike OFFSET.
+
+    Args:
+        experiment_id (int): The experiment to read.
+        after (Optional[int]): Only return events with a larger id.
+
+    Returns:
+        Select: The query, selecting `EXPORT_COLUMNS`.
+    """
+    stmt = (
+        select(*(getattr(ExperimentData, column) for column in EXPORT_COLUMNS))
+        .where(ExperimentData.experiment_id == experiment_id)
+        .order_by(ExperimentData.id)
+    )
+    if after is not None:
+        stmt = stmt.where(ExperimentData.id > after)
+    return stmt
+
+
+def get_events_page(db: Session, experiment_id: int, after: Optional[int], limit: int) -> Tuple[List[dict], Optional[int]]:
+    """
+    Returns one page of events and the cursor for the next page.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The experiment to read.
+        after (Optional[int]): Cursor returned by the previous page, or None for the first page.
+        limit (int): Page size.
+
+    Returns:
+        tuple: (events as dicts keyed by `EXPORT_COLUMNS`, next cursor or None on the last page).
+    """
+    # One extra row tells whether another page exists without a COUNT.
+    rows = db.execute(events_query(experiment_id, after).limit(limit + 1)).all()
+    events = [dict(zip(EXPORT_COLUMNS, row)) for row in rows[:limit]]
+    next_after = events[-1]["id"] if len(rows) > limit else None
+    return events, next_after
+
+
+def iter_event_batches(db: Session, experiment_id: int, after: Optional[int] = None,
+                       batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[tuple]]:
+    """
+    Streams an experiment's events through a server-side cursor in batches.
+
+    Only `batch_size` rows are held in memory at a time, so the export size is
+    bounded by the client, not by the server.
+
+    Args:
+        db (Session): The database session; it stays in one transaction until the iterator is exhausted.
+        experiment_id (int): The experiment to read.
+        after (Optional[int]): Resume after this event id.
+        batch_size (int): Rows fetched per round trip.
+
+    Yields:
+        List[tuple]: Rows with values in `EXPORT_COLUMNS` order.
+    """
+    # yield_per implies stream_results, i.e. a named cursor on psycopg2.
+    result = db.execute(events_query(experiment_id, after).execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
@@ -0,0 +1,128 @@
+# This file warms up connection pools and checks the database for the readiness probe.
+
+import asyncio
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import List, Optional
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Migration scripts shipped with the app; their heads are the schema this code expects.
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic")
+
+# Longest a readiness probe waits on the database before reporting it unreachable.
+READINESS_TIMEOUT_SECONDS = 2.0
+
+
+def warmup_connections(settings: Settings) -> int:
+    """
+    Returns how many connections a worker opens at startup.
+
+    Behind PgBouncer there is no app-side pool to keep them in, so none are opened.
+    """
+    if settings.db_pgbouncer:
+        return 0
+    return max(0, min(settings.db_pool_warmup, settings.db_pool_size))
+
+
+def warm_up_pool(engine, connections: int) -> int:
+    """
+    Opens pooled connections ahead of the first requests, so those do not pay for the handshakes.
+
+    Args:
+        engine (Engine): The sync engine.
+        connections (int): Connections to open; they are all held at once, so each is a new one.
+
+    Returns:
+        int: The number of connections opened.
+    """
+    held = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            held.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in held:
+            connection.close()
+    return len(held)
+
+
+async def warm_up_async_pool(engine, connections: int) -> int:
+    """
+    Same as `warm_up_pool` for the async engine, opening the connections concurrently.
+    """
+    async def open_connection():
+        connection = engine.connect()
+        await connection.start()
+        await connection.exec_driver_sql("SELECT 1")
+        return connection
+
+    results = await asyncio.gather(*(open_connection() for _ in range(connections)), return_exceptions=True)
+    opened = [result for result in results if not isinstance(result, BaseException)]
+    for connection in opened:
+        await connection.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(opened)
+
+
+@lru_cache(maxsize=1)
+def expected_revisions() -> Optional[List[str]]:
+    """
+    Returns the head revisions of the bundled migration scripts, or None when the scripts are not available.
+    """
+    try:
+        return sorted(ScriptDirectory(ALEMBIC_DIR).get_heads())
+    except Exception:
+        logger.warning("Migration scripts not found in %s; schema version is not checked", ALEMBIC_DIR)
+        return None
+
+
+def migration_state(connection) -> dict:
+    """
+    Compares the revision recorded in the database with the one the code expects.
+
+    Args:
+        connection (Connection): An open connection to the database.
+
+    Returns:
+        dict: The `current` and `expected` revisions and whether the schema is `up_to_date`.
+    """
+    current = sorted(MigrationContext.configure(connection).get_current_heads())
+    expected = expected_revisions()
+    return {
+        "current": current,
+        "expected": expected,
+        # Without the scripts, any migrated database is accepted.
+        "up_to_date": bool(current) if expected is None else current == expected,
+    }
+
+
+def check_database(engine) -> dict:
+    """
+    Checks that the database answers and that its schema is migrated to the expected revision.
+
+    Args:
+        engine (Engine): The sync engine.
+
+    Returns:
+        dict: `reachable`, the round-trip `latency_ms` and the `migrations` state, or the `error` when unreachable.
+    """
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            migrations = migration_state(connection)
+    except Exception as exc:
+        return {"reachable": False, "error": f"{type(exc).__name__}: {exc}"[:300]}
+    return {
+        "reachable": True,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        "migrations": migrations,
+    }
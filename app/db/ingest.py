@@ -0,0 +1,134 @@
+# This file writes raw experiment events in bulk without going through the ORM unit of work.
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import List
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.db.models import ExperimentData
+from app.db.rollups import apply_rollup_deltas, compute_rollup_deltas
+from app.db.sequential import update_sequential_state
+from app.db.user_sketches import apply_sketch_deltas, compute_sketch_deltas
+
+# Rows per INSERT/COPY round trip.
+INGEST_BATCH_SIZE = 5000
+
+EVENT_COLUMNS = (
+    "experiment_id",
+    "variant",
+    "timestamp",
+    "conversion",
+    "revenue",
+    "engagement_minutes",
+    "additional_data",
+    "user_id",
+    "session_id",
+    "created_at",
+    "updated_at",
+)
+
+
+def utc_now() -> datetime:
+    """
+    Returns the current time as naive UTC, the form `build_event_row` stores timestamps in.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def build_event_row(experiment_id: int, event, now: datetime) -> dict:
+    """
+    Converts a validated event into a plain column dict for `experiment_data`.
+
+    `timestamp` is a column without time zone, and COPY would drop an
+    offset without applying it, so offset timestamps are converted to
+    naive UTC here once. The COPY and INSERT paths, partition routing and
+    sketch day buckets then all see the same value.
+
+    Args:
+        experiment_id (int): The experiment the event belongs to.
+        event: A validated `ExperimentEventData` or `ExperimentVariantData`.
+        now (datetime): Ingestion time as naive UTC (`utc_now`), shared by the whole batch.
+
+    Returns:
+        dict: Column values keyed by column name.
+    """
+    timestamp = getattr(event, "timestamp", None) or now
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "experiment_id": experiment_id,
+        "variant": event.variant,
+        "timestamp": timestamp,
+        "conversion": event.conversion,
+        "revenue": event.revenue or 0.0,
+        "engagement_minutes": event.engagement_minutes or 0.0,
+        "additional_data": event.additional_data,
+        "user_id": event.user_id,
+        "session_id": event.session_id,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _copy_rows(db: Session, rows: List[dict]):
+    """
+    Streams rows into `experiment_data` with PostgreSQL COPY.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        additional_data = row["additional_data"]
+        writer.writerow((
+            row["experiment_id"],
+            row["variant"],
+            row["timestamp"].isoformat(),
+            "t" if row["conversion"] else "f",
+            repr(row["revenue"]),
+            repr(row["engagement_minutes"]),
+            None if additional_data is None else json.dumps(additional_data),
+            row["user_id"],
+            row["session_id"],
+            row["created_at"].isoformat(),
+            row["updated_at"].isoformat(),
+        ))
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {ExperimentData.__tablename__} ({', '.join(EVENT_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (variant))",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def insert_event_rows(db: Session, rows: List[dict]) -> int:
+    """
+    Inserts a batch of event rows in the current transaction.
+
+    Uses COPY on psycopg2 connections and a multi-row INSERT (executemany)
+    everywhere else. No ORM objects are created and nothing is refreshed.
+    The matching `variant_rollup` increments, user sketches and sequential
+    test state are applied in the same transaction.
+
+    Args:
+        db (Session): The database session.
+        rows (List[dict]): Rows built with `build_event_row`, all for the same experiment.
+
+    Returns:
+        int: The number of rows written.
+    """
+    if not rows:
+        return 0
+    if db.get_bind().dialect.driver == "psycopg2":
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(ExperimentData), rows)
+    apply_rollup_deltas(db, rows[0]["experiment_id"], compute_rollup_deltas(rows))
+    apply_sketch_deltas(db, rows[0]["experiment_id"], compute_sketch_deltas(rows))
+    update_sequential_state(db, rows[0]["experiment_id"])
+    return len(rows)
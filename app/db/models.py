@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, Boolean, Index, LargeBinary
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import relationship
@@ -16,6 +16,11 @@ class BaseExperiment(Base):
         created_at (datetime): Timestamp when the record was created.
         updated_at (datetime): Timestamp when the record was last updated.
         deleted_at (datetime, optional): Timestamp when the record was deleted.
+        idempotency_key (str, optional): Client-supplied Idempotency-Key of the creating request.
+        request_fingerprint (str, optional): SHA-256 of the creating request, to detect reused keys.
+        created_data_ids (list, optional): Ids of the variant rows created with a keyed experiment, for replays.
+        variant_weights (dict, optional): Relative traffic per variant for user assignment.
+        assignment_salt (str, optional): Per-experiment salt of the assignment hash.
         data (relationship): Relationship to the ExperimentData model.
     """
     __tablename__ = 'experiment'
@@ -23,22 +28,39 @@ class BaseExperiment(Base):
     name = Column(String(50))
     description = Column(String(255),nullable=True)
     goal_metric=Column(String(50))
-    desired_outcome=Column(String(50),nullable=True)
-    null_hypothesis=Column(String(50),nullable=True)
-    alternative_hypothesis=Column(String(50),nullable=True)
+    desired_outcome=Column(String(255),nullable=True)
+    null_hypothesis=Column(String(255),nullable=True)
+    alternative_hypothesis=Column(String(255),nullable=True)
     sample_size_group_a=Column(Integer,nullable=True)
     sample_size_group_b=Column(Integer,nullable=True)
     significance_level=Column(Float,default=0.05)
     power=Column(Float,default=0.80)
     bias_control_method=Column(String(50),nullable=True)
-    identified_confounders=Column(String(50),nullable=True)
+    identified_confounders=Column(String(255),nullable=True)
     success_metrics=Column(String(50),nullable=True)
     experiment_type = Column(String(50))
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     deleted_at = Column(DateTime, nullable=True)
+    idempotency_key = Column(String(100), nullable=True)
+    request_fingerprint = Column(String(64), nullable=True)
+    created_data_ids = Column(JSONB, nullable=True)
+    variant_weights = Column(JSONB, nullable=True)
+    assignment_salt = Column(String(32), nullable=True)
     data = relationship("ExperimentData", back_populates='experiment')
 
+    __table_args__ = (
+        # Serves the soft-delete filter of listings and lookups, in keyset (id) order.
+        Index("ix_experiment_active_id", "id", postgresql_where=deleted_at.is_(None)),
+        # Unique among keyed creations only; most experiments have no key.
+        Index(
+            "ix_experiment_idempotency_key",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=idempotency_key.isnot(None),
+        ),
+    )
+
 
 class ExperimentData(Base):
     """
@@ -70,5 +92,126 @@ class ExperimentData(Base):
     session_id=Column(String(50),nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
-    experimment = relationship("BaseExperiment", back_populates="data")
+    experiment = relationship("BaseExperiment", back_populates="data")
+
+    __table_args__ = (
+        # Serves the per-variant GROUP BY behind the metrics endpoints.
+        Index("ix_experiment_data_experiment_id_variant", "experiment_id", "variant"),
+        # Serves keyset pagination and export in id order.
+        Index("ix_experiment_data_experiment_id_id", "experiment_id", "id"),
+        # Serves time-range filters of the timeseries endpoint.
+        Index("ix_experiment_data_experiment_id_timestamp", "experiment_id", "timestamp"),
+        # Serves containment (@>) filters on segment attributes.
+        Index(
+            "ix_experiment_data_additional_data",
+            "additional_data",
+            postgresql_using="gin",
+            postgresql_ops={"additional_data": "jsonb_path_ops"},
+        ),
+    )
+
+
+
+class VariantRollup(Base):
+    """
+    VariantRollup holds running per-variant sums for an experiment, kept up to date on every insert.
+
+    The sums are sufficient statistics: counts, means and variances of
+    conversion, revenue and engagement can all be derived from one row
+    without scanning `experiment_data`.
+
+    Attributes:
+        experiment_id (int): Foreign key referencing the BaseExperiment model.
+        variant (str): Variant of the experiment.
+        count (int): Number of events.
+        conversions (int): Number of converted events.
+        revenue_sum (float): Sum of revenue.
+        revenue_sq_sum (float): Sum of squared revenue.
+        engagement_sum (float): Sum of engagement minutes.
+        engagement_sq_sum (float): Sum of squared engagement minutes.
+        updated_at (datetime): Timestamp when the rollup last changed.
+    """
+    __tablename__ = 'variant_rollup'
+    experiment_id = Column(Integer, ForeignKey('experiment.id'), primary_key=True)
+    variant = Column(String(50), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+    conversions = Column(BigInteger, nullable=False, default=0)
+    revenue_sum = Column(Float, nullable=False, default=0.0)
+    revenue_sq_sum = Column(Float, nullable=False, default=0.0)
+    engagement_sum = Column(Float, nullable=False, default=0.0)
+    engagement_sq_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class VariantUserSketch(Base):
+    """
+    VariantUserSketch holds per-variant, per-day HyperLogLog sketches of the users seen, kept up to date on every insert.
 
+    Sketches of different days merge losslessly (register-wise max), so
+    approximate distinct users over any range of days cost one read per
+    day instead of a DISTINCT over `experiment_data`. Only events with a
+    `user_id` are counted.
+
+    Attributes:
+        experiment_id (int): Foreign key referencing the BaseExperiment model.
+        variant (str): Variant of the experiment.
+        bucket (date): Day of the events.
+        users (bytes): Sketch of the users with events that day.
+        converters (bytes): Sketch of the users with a converted event that day.
+        events (int): Number of events with a user_id.
+        revenue_sum (float): Revenue of the events with a user_id.
+        updated_at (datetime): Timestamp when the sketch last changed.
+    """
+    __tablename__ = 'variant_user_sketch'
+    experiment_id = Column(Integer, ForeignKey('experiment.id'), primary_key=True)
+    variant = Column(String(50), primary_key=True)
+    bucket = Column(Date, primary_key=True)
+    users = Column(LargeBinary, nullable=False)
+    converters = Column(LargeBinary, nullable=False)
+    events = Column(BigInteger, nullable=False, default=0)
+    revenue_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class SequentialState(Base):
+    """
+    SequentialState holds the running always-valid (mSPRT) test of one variant against the control on one metric.
+
+    Updated from `variant_rollup` in the transaction of every ingestion
+    batch, so reading the current decision is a primary-key lookup. The
+    p-value is the running minimum and the interval the running intersection
+    over all batches, which is what keeps them valid under continuous peeking.
+
+    Attributes:
+        experiment_id (int): Foreign key referencing the BaseExperiment model.
+        variant (str): Variant compared with the control.
+        metric (str): conversion, revenue or engagement_minutes.
+        control (str): The control variant.
+        n (int): Events in the variant at the last update.
+        control_n (int): Events in the control at the last update.
+        difference (float, optional): Current difference in means (variant - control).
+        log_likelihood_ratio (float, optional): Current mixture log likelihood ratio.
+        p_value (float, optional): Running always-valid p-value.
+        ci_lower (float, optional): Running lower bound of the always-valid confidence interval.
+        ci_upper (float, optional): Running upper bound of the always-valid confidence interval.
+        alpha (float): Significance level the decision is taken at.
+        decision (str): continue, reject or accept.
+        decided_at (datetime, optional): When the current decision was reached.
+        updated_at (datetime): Timestamp of the last update.
+    """
+    __tablename__ = 'sequential_state'
+    experiment_id = Column(Integer, ForeignKey('experiment.id'), primary_key=True)
+    variant = Column(String(50), primary_key=True)
+    metric = Column(String(50), primary_key=True)
+    control = Column(String(50), nullable=False)
+    n = Column(BigInteger, nullable=False)
+    control_n = Column(BigInteger, nullable=False)
+    difference = Column(Float, nullable=True)
+    log_likelihood_ratio = Column(Float, nullable=True)
+    p_value = Column(Float, nullable=True)
+    ci_lower = Column(Float, nullable=True)
+    ci_upper = Column(Float, nullable=True)
+    alpha = Column(Float, nullable=False)
+    decision = Column(String(20), nullable=False)
+    decided_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1,297 @@
+# This file manages monthly range partitions of experiment_data on its timestamp column.
+#
+# Partitioning itself is switched on by Alembic revision 0006 (DB_PARTITION_EVENTS=true).
+# Usage:
+#     python -m app.db.partitions convert [--plain] [--months-ahead N]
+#     python -m app.db.partitions maintain [--months-ahead N]
+#     python -m app.db.partitions retention --retain-months N [--drop]
+
+import argparse
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.db.aggregations import STAT_FIELDS, aggregate_raw_variant_stats
+from app.db.rollups import apply_rollup_deltas
+from app.db.snapshots import drop_snapshots
+from app.db.user_sketches import delete_sketches
+
+PARENT_TABLE = "experiment_data"
+DEFAULT_PARTITION = "experiment_data_default"
+
+_PARTITION_NAME = re.compile(r"^experiment_data_p(\d{4})_(\d{2})$")
+
+
+def month_start(moment) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    """
+    Tells whether `experiment_data` is a partitioned table in the connected database.
+
+    Args:
+        conn: A `Connection` or `Session`.
+    """
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {"table": PARENT_TABLE}).scalar())
+
+
+def list_partitions(conn) -> List[Tuple[date, str]]:
+    """
+    Returns the attached monthly partitions as (first day of month, table name), oldest first.
+
+    The default partition is not included.
+    """
+    names = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {"table": PARENT_TABLE}).scalars()
+    months = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(months)
+
+
+def create_default_partition(conn):
+    """
+    Creates the catch-all partition for events outside every monthly range, so inserts never fail.
+    """
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+
+def create_partition(conn, month: date) -> bool:
+    """
+    Creates the partition for one calendar month, unless it already exists.
+
+    Events for that month that landed in the default partition are moved into
+    the new partition before it is attached, since PostgreSQL refuses to
+    attach a range the default partition still holds rows for.
+
+    Args:
+        conn: A `Connection` or `Session`; the caller commits.
+        month (date): Any day in the month.
+
+    Returns:
+        bool: True if the partition was created.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+
+    bounds = {"start": datetime.combine(month, datetime.min.time()),
+              "end": datetime.combine(add_months(month, 1), datetime.min.time())}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is not None:
+        conn.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), bounds)
+    # Indexes and the primary key are created on attach from the parent's definitions.
+    conn.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    return True
+
+
+def ensure_partitions(conn, months_ahead: int, first_month: Optional[date] = None, now: Optional[datetime] = None) -> List[str]:
+    """
+    Creates any missing monthly partitions from `first_month` through `months_ahead` months after the current one.
+
+    Args:
+        conn: A `Connection` or `Session`; the caller commits.
+        months_ahead (int): Future months to keep ready.
+        first_month (Optional[date]): Oldest month to cover; defaults to the current month.
+        now (Optional[datetime]): The current time, for tests.
+
+    Returns:
+        List[str]: Names of the partitions created.
+    """
+    current = month_start(now or datetime.now())
+    month = month_start(first_month) if first_month is not None else current
+    last = add_months(current, months_ahead)
+    created = []
+    while month <= last:
+        if create_partition(conn, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def convert_table(conn, partitioned: bool, months_ahead: int) -> int:
+    """
+    Rebuilds `experiment_data` in place as a partitioned table, or back as a plain one, keeping every row.
+
+    The table is moved aside and recreated with the same columns, id
+    sequence, foreign key and secondary indexes (whatever the migrations
+    have added by now), then the rows are copied across with their ids, so
+    rollups, sketches and snapshots stay valid. The whole rebuild runs in
+    the caller's transaction and locks the table until it commits; stop the
+    API workers first.
+
+    Args:
+        conn: A `Connection` or `Session`; the caller commits.
+        partitioned (bool): Partition the table by month, or turn it back into a plain table.
+        months_ahead (int): Future monthly partitions to create when partitioning.
+
+    Returns:
+        int: The number of rows copied, or -1 if the table already had the requested layout.
+    """
+    if is_partitioned(conn) == partitioned:
+        return -1
+    old_name = f"{PARENT_TABLE}_{'unpartitioned' if partitioned else 'partitioned'}"
+    indexes = conn.execute(text(
+        "SELECT idx.relname, pg_get_indexdef(idx.oid) FROM pg_index "
+        "JOIN pg_class idx ON idx.oid = pg_index.indexrelid "
+        "WHERE pg_index.indrelid = to_regclass(:table) AND NOT pg_index.indisprimary"
+    ), {"table": PARENT_TABLE}).all()
+    primary_key = conn.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table) AND contype = 'p'"
+    ), {"table": PARENT_TABLE}).scalar()
+    foreign_keys = conn.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+    ), {"table": PARENT_TABLE}).scalars().all()
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": PARENT_TABLE}).scalar()
+
+    for name, _ in indexes:
+        conn.execute(text(f"DROP INDEX {name}"))
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {old_name}"))
+    conn.execute(text(f"ALTER TABLE {old_name} RENAME CONSTRAINT {primary_key} TO {old_name}_pkey"))
+    for name in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {old_name} DROP CONSTRAINT {name}"))
+
+    conn.execute(text(
+        f"CREATE TABLE {PARENT_TABLE} (LIKE {old_name} INCLUDING DEFAULTS)"
+        + (" PARTITION BY RANGE (timestamp)" if partitioned else "")
+    ))
+    # A partitioned table's primary key must include the partition key.
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ADD PRIMARY KEY ({'id, timestamp' if partitioned else 'id'})"))
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ADD FOREIGN KEY (experiment_id) REFERENCES experiment (id)"))
+    for _, definition in indexes:
+        conn.execute(text(definition))
+    if sequence is not None:
+        # Re-owned before the old table is dropped, which would drop the sequence with it.
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT_TABLE}.id"))
+
+    if partitioned:
+        first = conn.execute(text(f"SELECT min(timestamp) FROM {old_name}")).scalar()
+        create_default_partition(conn)
+        ensure_partitions(conn, months_ahead, first_month=first)
+
+    copied = conn.execute(text(f"INSERT INTO {PARENT_TABLE} SELECT * FROM {old_name}")).rowcount
+    conn.execute(text(f"DROP TABLE {old_name}"))
+    return copied
+
+
+def apply_retention(db: Session, retain_months: int, drop: bool = False, now: Optional[datetime] = None) -> List[str]:
+    """
+    Removes monthly partitions that ended more than `retain_months` months before the current month.
+
+    Partitions are detached by default, leaving a standalone table that can
+    be archived (e.g. with pg_dump) and dropped later; with `drop` they are
+    dropped outright. The removed events are subtracted from `variant_rollup`,
+    and the user sketches of their days deleted, in the same transaction, so
+    the metrics keep matching the raw data. The affected experiments'
+    columnar snapshots are deleted after the commit.
+
+    Args:
+        db (Session): The database session.
+        retain_months (int): Whole months to keep before the current one.
+        drop (bool): Drop the partitions instead of detaching them.
+        now (Optional[datetime]): The current time, for tests.
+
+    Returns:
+        List[str]: Names of the partitions removed.
+    """
+    cutoff = add_months(month_start(now or datetime.now()), -retain_months)
+    removed = []
+    affected = set()
+    for month, name in list_partitions(db):
+        end = add_months(month, 1)
+        if end > cutoff:
+            break
+        stats = aggregate_raw_variant_stats(
+            db,
+            start=datetime.combine(month, datetime.min.time()),
+            end=datetime.combine(end, datetime.min.time()),
+        )
+        by_experiment = {}
+        for (experiment_id, variant), values in stats.items():
+            by_experiment.setdefault(experiment_id, {})[variant] = {field: -values[field] for field in STAT_FIELDS}
+        for experiment_id in sorted(by_experiment):
+            apply_rollup_deltas(db, experiment_id, by_experiment[experiment_id])
+        affected.update(by_experiment)
+        delete_sketches(db, month, end)
+
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+        else:
+            db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        removed.append(name)
+    db.commit()
+    for experiment_id in affected:
+        drop_snapshots(experiment_id)
+    return removed
+
+
+def main(argv=None):
+    from app.config import settings
+    from app.db.base import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Manage monthly partitions of experiment_data.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    convert = subcommands.add_parser("convert", help="Rebuild experiment_data as a partitioned table, keeping its rows.")
+    convert.add_argument("--plain", action="store_true", help="Turn a partitioned experiment_data back into a plain table.")
+    convert.add_argument("--months-ahead", type=int, default=settings.db_partition_months_ahead)
+    maintain = subcommands.add_parser("maintain", help="Create missing future partitions.")
+    maintain.add_argument("--months-ahead", type=int, default=settings.db_partition_months_ahead)
+    retention = subcommands.add_parser("retention", help="Detach (or drop) partitions older than the retention window.")
+    retention.add_argument("--retain-months", type=int, required=True)
+    retention.add_argument("--drop", action="store_true", help="Drop old partitions instead of detaching them.")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "convert":
+            copied = convert_table(db, partitioned=not args.plain, months_ahead=args.months_ahead)
+            db.commit()
+            layout = "a plain table" if args.plain else "partitioned"
+            if copied < 0:
+                print(f"{PARENT_TABLE} is already {layout}; nothing to do.")
+            else:
+                print(f"Rebuilt {PARENT_TABLE} as {layout}, {copied} row(s) copied.")
+            return 0
+        if not is_partitioned(db):
+            print(f"{PARENT_TABLE} is not partitioned; run `python -m app.db.partitions convert` first.")
+            return 1
+        if args.command == "maintain":
+            names = ensure_partitions(db, args.months_ahead)
+            db.commit()
+            print(f"Created {len(names)} partition(s): {', '.join(names) or '-'}")
+        else:
+            names = apply_retention(db, args.retain_months, drop=args.drop)
+            print(f"{'Dropped' if args.drop else 'Detached'} {len(names)} partition(s): {', '.join(names) or '-'}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+# This file measures connection pool checkout latency and saturation.
+
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+# Upper bounds (seconds) of the checkout latency histogram buckets.
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Instrumented engines by name ("sync", "async").
+_registry = {}
+
+
+class PoolMetrics:
+    """
+    Thread-safe counters for one engine's connection pool.
+
+    Attributes:
+        name (str): Engine name used in reports.
+        capacity (int): pool_size + max_overflow, the most connections the pool will open.
+    """
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_sum = 0.0
+        self.wait_seconds_max = 0.0
+        self.bucket_counts = [0] * len(CHECKOUT_BUCKETS)
+
+    def observe_checkout(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_sum += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            for index, bound in enumerate(CHECKOUT_BUCKETS):
+                if seconds <= bound:
+                    self.bucket_counts[index] += 1
+                    break
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        """
+        Returns the counters together with the pool's current occupancy.
+        """
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else None
+        with self._lock:
+            return {
+                "engine": self.name,
+                "pool_class": type(pool).__name__,
+                "capacity": self.capacity,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": checked_out,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "saturation": round(checked_out / self.capacity, 4) if checked_out is not None and self.capacity else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "checkout_wait_seconds_sum": self.wait_seconds_sum,
+                "checkout_wait_seconds_max": self.wait_seconds_max,
+                "checkout_wait_seconds_avg": self.wait_seconds_sum / self.checkouts if self.checkouts else 0.0,
+                # Cumulative counts per upper bound, Prometheus style.
+                "checkout_wait_buckets": {
+                    str(bound): sum(self.bucket_counts[:index + 1])
+                    for index, bound in enumerate(CHECKOUT_BUCKETS)
+                },
+            }
+
+
+class _TimedPoolMixin:
+    """
+    Times how long each checkout waits for a connection (including connecting, for new ones).
+    """
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_timeout()
+            raise
+        self.metrics.observe_checkout(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same metrics.
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    pass
+
+
+def register_engine(name: str, engine, capacity: int):
+    """
+    Attaches a `PoolMetrics` to an engine's instrumented pool and makes it visible to `pool_stats`.
+
+    Args:
+        name (str): Engine name used in reports.
+        engine: An `Engine` or `AsyncEngine` created with one of the Timed*Pool classes.
+        capacity (int): pool_size + max_overflow.
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    engine.pool.metrics = PoolMetrics(name, capacity)
+    _registry[name] = engine
+
+
+def pool_stats() -> dict:
+    """
+    Returns a snapshot of every registered pool, keyed by engine name.
+    """
+    return {name: engine.pool.metrics.snapshot(engine.pool) for name, engine in _registry.items()}
@@ -0,0 +1,176 @@
+# This file maintains the variant_rollup table and can rebuild it from raw data.
+#
+# Usage:
+#     python -m app.db.rollups reconcile [--experiment-id ID] [--fix]
+
+import argparse
+import math
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.db.aggregations import STAT_FIELDS, aggregate_raw_variant_stats
+from app.db.models import VariantRollup
+
+# Relative tolerance when comparing float sums during reconciliation.
+DRIFT_TOLERANCE = 1e-9
+
+
+def compute_rollup_deltas(rows: Iterable[dict]) -> dict:
+    """
+    Sums a batch of event rows into per-variant rollup increments.
+
+    Args:
+        rows (Iterable[dict]): Rows as built by `app.db.ingest.build_event_row`.
+
+    Returns:
+        dict: Increments keyed by variant name.
+    """
+    deltas = {}
+    for row in rows:
+        delta = deltas.get(row["variant"])
+        if delta is None:
+            delta = deltas[row["variant"]] = dict.fromkeys(STAT_FIELDS, 0)
+        revenue = row["revenue"] or 0.0
+        engagement = row["engagement_minutes"] or 0.0
+        delta["count"] += 1
+        delta["conversions"] += 1 if row["conversion"] else 0
+        delta["revenue_sum"] += revenue
+        delta["revenue_sq_sum"] += revenue * revenue
+        delta["engagement_sum"] += engagement
+        delta["engagement_sq_sum"] += engagement * engagement
+    return deltas
+
+
+def rollup_upsert_statement(experiment_id: int, deltas: dict):
+    """
+    Builds the INSERT .. ON CONFLICT DO UPDATE that adds per-variant increments to `variant_rollup`.
+
+    Variants are written in sorted order so concurrent batches lock rollup
+    rows in the same order.
+
+    Args:
+        experiment_id (int): The experiment the increments belong to.
+        deltas (dict): Increments keyed by variant, from `compute_rollup_deltas`. Must not be empty.
+
+    Returns:
+        Insert: The upsert statement.
+    """
+    now = datetime.now()
+    values = [
+        {"experiment_id": experiment_id, "variant": variant, **deltas[variant], "updated_at": now}
+        for variant in sorted(deltas)
+    ]
+    stmt = pg_insert(VariantRollup).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=[VariantRollup.experiment_id, VariantRollup.variant],
+        set_={
+            **{field: getattr(VariantRollup, field) + getattr(stmt.excluded, field) for field in STAT_FIELDS},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def apply_rollup_deltas(db: Session, experiment_id: int, deltas: dict):
+    """
+    Adds per-variant increments to `variant_rollup` with a single upsert.
+
+    Runs in the caller's transaction, so the rollup changes commit or roll
+    back together with the raw rows they describe.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The experiment the increments belong to.
+        deltas (dict): Increments keyed by variant, from `compute_rollup_deltas`.
+    """
+    if deltas:
+        db.execute(rollup_upsert_statement(experiment_id, deltas))
+
+
+def _drifted(expected: float, actual: float) -> bool:
+    return not math.isclose(expected, actual, rel_tol=DRIFT_TOLERANCE, abs_tol=DRIFT_TOLERANCE)
+
+
+def reconcile_rollups(db: Session, experiment_id: Optional[int] = None, fix: bool = False) -> list:
+    """
+    Recomputes rollups from `experiment_data` and reports where they disagree.
+
+    The rollup table is locked for the duration so that no ingestion batch can
+    commit between reading the raw data and rewriting the rollups; writers wait
+    and then apply their increments on top of the rebuilt values.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (Optional[int]): Restrict to one experiment; all experiments if None.
+        fix (bool): Replace the stored rollups with the recomputed values.
+
+    Returns:
+        list: One entry per drifted (experiment_id, variant) with the stored and recomputed statistics.
+    """
+    db.execute(text(f"LOCK TABLE {VariantRollup.__tablename__} IN EXCLUSIVE MODE"))
+    expected = aggregate_raw_variant_stats(db, experiment_id)
+
+    stmt = select(VariantRollup)
+    if experiment_id is not None:
+        stmt = stmt.where(VariantRollup.experiment_id == experiment_id)
+    stored = {
+        (row.experiment_id, row.variant): {field: getattr(row, field) for field in STAT_FIELDS}
+        for row in db.execute(stmt).scalars()
+    }
+
+    empty = dict.fromkeys(STAT_FIELDS, 0)
+    drift = []
+    for key in sorted(expected.keys() | stored.keys()):
+        want = expected.get(key, empty)
+        have = stored.get(key, empty)
+        if any(_drifted(want[field], have[field]) for field in STAT_FIELDS):
+            drift.append({
+                "experiment_id": key[0],
+                "variant": key[1],
+                "stored": have,
+                "recomputed": want,
+            })
+
+    if fix:
+        delete_stmt = delete(VariantRollup)
+        if experiment_id is not None:
+            delete_stmt = delete_stmt.where(VariantRollup.experiment_id == experiment_id)
+        db.execute(delete_stmt)
+        now = datetime.now()
+        if expected:
+            db.execute(insert(VariantRollup), [
+                {"experiment_id": key[0], "variant": key[1], **stats, "updated_at": now}
+                for key, stats in expected.items()
+            ])
+        db.commit()
+    else:
+        db.rollback()
+    return drift
+
+
+def main(argv=None):
+    from app.db.base import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Reconcile variant_rollup against experiment_data.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    reconcile = subcommands.add_parser("reconcile", help="Report (and optionally fix) rollup drift.")
+    reconcile.add_argument("--experiment-id", type=int, default=None)
+    reconcile.add_argument("--fix", action="store_true", help="Rebuild the rollups from raw data.")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        drift = reconcile_rollups(db, experiment_id=args.experiment_id, fix=args.fix)
+    finally:
+        db.close()
+
+    for entry in drift:
+        print(f"experiment {entry['experiment_id']} variant {entry['variant']!r}: "
+              f"stored {entry['stored']} != recomputed {entry['recomputed']}")
+    print(f"{len(drift)} drifted rollup(s){' rebuilt' if args.fix else ''}.")
+    return 1 if drift and not args.fix else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
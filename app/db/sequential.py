@@ -0,0 +1,126 @@
+# This file keeps the per-variant sequential test state in step with variant_rollup.
+
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.analysis.sequential import ACCEPT, CONTINUE, REJECT, sequential_observations
+from app.db.aggregations import get_variant_stats
+from app.db.models import BaseExperiment, SequentialState
+
+# Columns of an observation written to sequential_state as they are.
+OBSERVATION_FIELDS = ("n", "control_n", "difference", "log_likelihood_ratio", "p_value", "ci_lower", "ci_upper")
+
+
+def experiment_parameters(experiment: BaseExperiment) -> tuple:
+    """
+    Returns the (alpha, power) an experiment is analysed at, with the model defaults for missing values.
+    """
+    alpha = experiment.significance_level if experiment.significance_level is not None else 0.05
+    power = experiment.power if experiment.power is not None else 0.80
+    return alpha, power
+
+
+def sequential_upsert_statement(values: List[dict]):
+    """
+    Builds the INSERT .. ON CONFLICT DO UPDATE that folds new observations into `sequential_state`.
+
+    The folding happens in the statement itself: the p-value keeps its
+    running minimum and the interval its running intersection, so batches
+    committing concurrently cannot overwrite each other's evidence. Once the
+    running p-value reaches alpha the decision stays `reject`.
+
+    Args:
+        values (List[dict]): One row per (variant, metric), in primary key order. Must not be empty.
+
+    Returns:
+        Insert: The upsert statement.
+    """
+    stmt = pg_insert(SequentialState).values(values)
+    state, excluded = SequentialState.__table__.c, stmt.excluded
+    running_p_value = func.least(state.p_value, excluded.p_value)
+    decision = case(
+        (running_p_value <= excluded.alpha, REJECT),
+        (excluded.decision == ACCEPT, ACCEPT),
+        else_=CONTINUE,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[SequentialState.experiment_id, SequentialState.variant, SequentialState.metric],
+        set_={
+            "control": excluded.control,
+            "n": excluded.n,
+            "control_n": excluded.control_n,
+            "difference": excluded.difference,
+            "log_likelihood_ratio": excluded.log_likelihood_ratio,
+            "p_value": running_p_value,
+            "ci_lower": func.greatest(state.ci_lower, excluded.ci_lower),
+            "ci_upper": func.least(state.ci_upper, excluded.ci_upper),
+            "alpha": excluded.alpha,
+            "decision": decision,
+            "decided_at": case((decision != state.decision, excluded.updated_at), else_=state.decided_at),
+            "updated_at": excluded.updated_at,
+        },
+    )
+
+
+def update_sequential_state(db: Session, experiment_id: int, experiment: Optional[BaseExperiment] = None) -> int:
+    """
+    Recomputes the sequential test of every variant from the rollups and folds it into the stored state.
+
+    Called in the transaction of every ingestion batch, after the rollup
+    increments, so the state commits together with the events. The cost is
+    one rollup read and one upsert, whatever the number of events.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The experiment to update.
+        experiment (Optional[BaseExperiment]): The experiment, if the caller already has it.
+
+    Returns:
+        int: The number of comparisons written; 0 until the experiment has two variants.
+    """
+    variant_stats = get_variant_stats(db, experiment_id)
+    if len(variant_stats) < 2:
+        return 0
+    if experiment is None:
+        experiment = db.get(BaseExperiment, experiment_id)
+    alpha, power = experiment_parameters(experiment)
+    result = sequential_observations(
+        variant_stats, alpha, power,
+        planned_control=experiment.sample_size_group_a, planned_variant=experiment.sample_size_group_b,
+    )
+    control = result["control"]
+
+    # A new variant sorting before the old control changes every comparison; start those over.
+    db.execute(delete(SequentialState).where(
+        SequentialState.experiment_id == experiment_id, SequentialState.control != control,
+    ))
+    now = datetime.now()
+    values = [
+        {
+            "experiment_id": experiment_id,
+            "variant": variant,
+            "metric": metric,
+            "control": control,
+            **{field: observation[field] for field in OBSERVATION_FIELDS},
+            "alpha": alpha,
+            "decision": observation["decision"],
+            "decided_at": now if observation["decision"] != CONTINUE else None,
+            "updated_at": now,
+        }
+        for (variant, metric), observation in sorted(result["observations"].items())
+    ]
+    db.execute(sequential_upsert_statement(values))
+    return len(values)
+
+
+def get_sequential_state(db: Session, experiment_id: int) -> List[SequentialState]:
+    """
+    Reads the stored sequential test state of an experiment, one row per variant and metric.
+    """
+    return db.execute(
+        select(SequentialState)
+        .where(SequentialState.experiment_id == experiment_id)
+        .order_by(SequentialState.variant, SequentialState.metric)
+    ).scalars().all()
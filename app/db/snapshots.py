@@ -0,0 +1,377 @@
+# This file materializes experiment events into memory-mapped columnar snapshots on disk.
+#
+# Usage:
+#     python -m app.db.snapshots build --experiment-id ID
+#     python -m app.db.snapshots drop [--experiment-id ID]
+
+import argparse
+import array
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.analysis.bootstrap import LOAD_BATCH_SIZE, METRICS, SampleSet, load_samples
+from app.config import settings
+from app.db.aggregations import get_data_version
+from app.db.models import ExperimentData
+
+# Bumped whenever the file layout changes; snapshots of another format are rebuilt.
+SNAPSHOT_FORMAT = 1
+
+META_FILE = "meta.json"
+
+# Column files, all in (variant, id) order. `metrics` has one row per bootstrap metric.
+COLUMN_FILES = {
+    "id": "id.npy",
+    "variant": "variant.npy",
+    "conversion": "conversion.npy",
+    "metrics": "metrics.npy",
+}
+
+_build_locks: Dict[int, threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+
+
+@dataclass
+class Snapshot:
+    """
+    A read-only, memory-mapped columnar copy of an experiment's events at one data version.
+
+    Rows are sorted by variant and then id, so each variant is one contiguous
+    slice. Variants are dictionary-encoded: `columns["variant"]` holds indices
+    into `variants`.
+
+    Attributes:
+        experiment_id (int): The experiment.
+        data_version (str): The `get_data_version` token the snapshot was built at.
+        variants (List[str]): Variant dictionary, sorted by code point like `sort_variants`.
+        offsets (ndarray): Start of each variant's rows, plus the total; shape (k + 1,).
+        max_id (int): Largest event id in the snapshot, 0 if empty.
+        columns (Dict[str, ndarray]): Memory-mapped columns keyed as in `COLUMN_FILES`.
+    """
+    experiment_id: int
+    data_version: str
+    variants: List[str]
+    offsets: np.ndarray
+    max_id: int
+    columns: Dict[str, np.ndarray]
+
+    @property
+    def rows(self) -> int:
+        return int(self.offsets[-1])
+
+    def samples(self) -> SampleSet:
+        # The metrics file is already laid out as SampleSet.values, so this copies nothing.
+        return SampleSet(variants=self.variants, offsets=self.offsets, values=self.columns["metrics"])
+
+
+def snapshots_enabled() -> bool:
+    return bool(settings.snapshot_dir)
+
+
+def _experiment_dir(experiment_id: int) -> str:
+    return os.path.join(settings.snapshot_dir, str(experiment_id))
+
+
+def _version_dir(experiment_id: int, data_version: str) -> str:
+    token = hashlib.sha1(f"{SNAPSHOT_FORMAT}:{data_version}".encode()).hexdigest()[:16]
+    return os.path.join(_experiment_dir(experiment_id), token)
+
+
+def open_snapshot(path: str) -> Optional[Snapshot]:
+    """
+    Memory-maps a snapshot directory; returns None if it is missing, incomplete or of another format.
+    """
+    try:
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            return None
+        columns = {name: np.load(os.path.join(path, file), mmap_mode="r") for name, file in COLUMN_FILES.items()}
+    except (OSError, ValueError):
+        return None
+    return Snapshot(
+        experiment_id=meta["experiment_id"],
+        data_version=meta["data_version"],
+        variants=meta["variants"],
+        offsets=np.asarray(meta["offsets"], dtype=np.int64),
+        max_id=meta["max_id"],
+        columns=columns,
+    )
+
+
+def _latest_snapshot(experiment_id: int) -> Optional[Snapshot]:
+    try:
+        entries = os.scandir(_experiment_dir(experiment_id))
+    except OSError:
+        return None
+    with entries:
+        candidates = sorted(
+            (entry for entry in entries if entry.is_dir() and not entry.name.startswith(".")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+    for entry in candidates:
+        snapshot = open_snapshot(entry.path)
+        if snapshot is not None:
+            return snapshot
+    return None
+
+
+def _fetch_rows(db: Session, experiment_id: int, after_id: int) -> dict:
+    """
+    Reads the events of an experiment with an id above `after_id`, grouped by variant.
+
+    Returns:
+        dict: Per variant, array.array columns "id", "conversion" and one per metric.
+    """
+    stmt = (
+        select(
+            ExperimentData.variant,
+            ExperimentData.id,
+            func.coalesce(ExperimentData.conversion, False),
+            *(func.coalesce(getattr(ExperimentData, metric), 0.0) for metric in METRICS),
+        )
+        .where(ExperimentData.experiment_id == experiment_id, ExperimentData.id > after_id)
+        .order_by(ExperimentData.variant, ExperimentData.id)
+        .execution_options(yield_per=LOAD_BATCH_SIZE)
+    )
+    groups = {}
+    current = None
+    for variant, event_id, conversion, *values in db.execute(stmt):
+        if current is None or current[0] != variant:
+            current = (variant, {
+                "id": array.array("q"),
+                "conversion": array.array("b"),
+                **{metric: array.array("d") for metric in METRICS},
+            })
+            groups[variant] = current[1]
+        columns = current[1]
+        columns["id"].append(event_id)
+        columns["conversion"].append(1 if conversion else 0)
+        for metric, value in zip(METRICS, values):
+            columns[metric].append(value)
+    return groups
+
+
+def _write_snapshot(experiment_id: int, data_version: str, previous: Optional[Snapshot], delta: dict) -> str:
+    """
+    Writes the rows of `previous` merged with `delta` into a new snapshot directory, atomically.
+
+    Each variant's previous slice is followed by its new rows, which keeps the
+    (variant, id) order because every new id is above the previous maximum.
+    """
+    # Python order, not the database collation, so samples match `load_samples` (see `sort_variants`).
+    variants = sorted(set(previous.variants if previous else []) | set(delta))
+    sizes = []
+    for variant in variants:
+        old = 0
+        if previous is not None and variant in previous.variants:
+            index = previous.variants.index(variant)
+            old = int(previous.offsets[index + 1] - previous.offsets[index])
+        sizes.append(old + len(delta.get(variant, {}).get("id", ())))
+    offsets = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)]).astype(np.int64)
+    total = int(offsets[-1])
+
+    root = _experiment_dir(experiment_id)
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".build-", dir=root)
+    try:
+        open_memmap = np.lib.format.open_memmap
+        out = {
+            "id": open_memmap(os.path.join(staging, COLUMN_FILES["id"]), mode="w+", dtype=np.int64, shape=(total,)),
+            "variant": open_memmap(os.path.join(staging, COLUMN_FILES["variant"]), mode="w+", dtype=np.int32, shape=(total,)),
+            "conversion": open_memmap(os.path.join(staging, COLUMN_FILES["conversion"]), mode="w+", dtype=np.bool_, shape=(total,)),
+            "metrics": open_memmap(os.path.join(staging, COLUMN_FILES["metrics"]), mode="w+", dtype=np.float64,
+                                   shape=(len(METRICS), total)),
+        }
+        for code, variant in enumerate(variants):
+            position = int(offsets[code])
+            out["variant"][offsets[code]:offsets[code + 1]] = code
+            if previous is not None and variant in previous.variants:
+                index = previous.variants.index(variant)
+                start, end = int(previous.offsets[index]), int(previous.offsets[index + 1])
+                count = end - start
+                out["id"][position:position + count] = previous.columns["id"][start:end]
+                out["conversion"][position:position + count] = previous.columns["conversion"][start:end]
+                out["metrics"][:, position:position + count] = previous.columns["metrics"][:, start:end]
+                position += count
+            new = delta.get(variant)
+            if new is not None:
+                count = len(new["id"])
+                out["id"][position:position + count] = np.frombuffer(new["id"], dtype=np.int64)
+                out["conversion"][position:position + count] = np.frombuffer(new["conversion"], dtype=np.int8)
+                for row, metric in enumerate(METRICS):
+                    out["metrics"][row, position:position + count] = np.frombuffer(new[metric], dtype=np.float64)
+        for column in out.values():
+            column.flush()
+        max_id = int(out["id"].max()) if total else 0
+        del out
+
+        with open(os.path.join(staging, META_FILE), "w") as meta_file:
+            json.dump({
+                "format": SNAPSHOT_FORMAT,
+                "experiment_id": experiment_id,
+                "data_version": data_version,
+                "variants": variants,
+                "offsets": offsets.tolist(),
+                "max_id": max_id,
+                "created_at": datetime.now().isoformat(),
+            }, meta_file)
+
+        target = _version_dir(experiment_id, data_version)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another worker published this version first; theirs is identical.
+            shutil.rmtree(staging, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return target
+
+
+def _remove_other_versions(experiment_id: int, keep: str):
+    try:
+        entries = list(os.scandir(_experiment_dir(experiment_id)))
+    except OSError:
+        return
+    for entry in entries:
+        # Open memory maps keep working after their files are unlinked.
+        if entry.path != keep and not entry.name.startswith("."):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _empty_snapshot(experiment_id: int, data_version: str) -> Snapshot:
+    return Snapshot(
+        experiment_id=experiment_id,
+        data_version=data_version,
+        variants=[],
+        offsets=np.zeros(1, dtype=np.int64),
+        max_id=0,
+        columns={
+            "id": np.empty(0, dtype=np.int64),
+            "variant": np.empty(0, dtype=np.int32),
+            "conversion": np.empty(0, dtype=np.bool_),
+            "metrics": np.empty((len(METRICS), 0)),
+        },
+    )
+
+
+def _build_lock(experiment_id: int) -> threading.Lock:
+    with _build_locks_guard:
+        return _build_locks.setdefault(experiment_id, threading.Lock())
+
+
+def get_snapshot(db: Session, experiment_id: int) -> Snapshot:
+    """
+    Returns a snapshot of the experiment's events at its current data version, building or extending it if needed.
+
+    The current version is one indexed read of the rollups. If a snapshot of
+    that version exists it is memory-mapped and `experiment_data` is not
+    touched. Otherwise only the events added since the latest snapshot are
+    read and appended to it. If the appended snapshot does not have as many
+    rows as the rollups count, for example after retention removed events or
+    a batch committed out of id order, it is rebuilt from scratch.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The experiment.
+
+    Returns:
+        Snapshot: The memory-mapped snapshot.
+    """
+    data_version = get_data_version(db, experiment_id)
+    target = _version_dir(experiment_id, data_version)
+    snapshot = open_snapshot(target)
+    if snapshot is not None:
+        return snapshot
+
+    with _build_lock(experiment_id):
+        snapshot = open_snapshot(target)
+        if snapshot is not None:
+            return snapshot
+        expected_rows = int(data_version.split(":", 1)[0])
+        if expected_rows == 0:
+            return _empty_snapshot(experiment_id, data_version)
+        previous = _latest_snapshot(experiment_id)
+        if previous is not None and previous.rows <= expected_rows:
+            path = _write_snapshot(experiment_id, data_version, previous, _fetch_rows(db, experiment_id, previous.max_id))
+            snapshot = open_snapshot(path)
+            if snapshot is None or snapshot.rows != expected_rows:
+                snapshot = None
+        if snapshot is None:
+            # Published under the same version directory, replacing a failed append.
+            shutil.rmtree(target, ignore_errors=True)
+            path = _write_snapshot(experiment_id, data_version, None, _fetch_rows(db, experiment_id, 0))
+            snapshot = open_snapshot(path)
+        _remove_other_versions(experiment_id, path)
+        return snapshot
+
+
+def get_samples(db: Session, experiment_id: int) -> SampleSet:
+    """
+    Returns the experiment's bootstrap samples, from its snapshot when snapshots are enabled.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The experiment.
+
+    Returns:
+        SampleSet: The values grouped by variant, in the same order as `load_samples`.
+    """
+    if not snapshots_enabled():
+        return load_samples(db, experiment_id)
+    return get_snapshot(db, experiment_id).samples()
+
+
+def drop_snapshots(experiment_id: Optional[int] = None):
+    """
+    Deletes the snapshots of one experiment, or of all experiments.
+
+    Needed after events are removed (retention); added events are picked up
+    by the version check on the next read.
+    """
+    if not snapshots_enabled():
+        return
+    path = _experiment_dir(experiment_id) if experiment_id is not None else settings.snapshot_dir
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def main(argv=None):
+    from app.db.base import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Build or drop columnar experiment snapshots.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Build or refresh an experiment's snapshot.")
+    build.add_argument("--experiment-id", type=int, required=True)
+    drop = subcommands.add_parser("drop", help="Delete snapshots.")
+    drop.add_argument("--experiment-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if not snapshots_enabled():
+        print("SNAPSHOT_DIR is empty; snapshots are disabled.")
+        return 1
+    if args.command == "drop":
+        drop_snapshots(args.experiment_id)
+        return 0
+    db = SessionLocal()
+    try:
+        snapshot = get_snapshot(db, args.experiment_id)
+    finally:
+        db.close()
+    print(f"experiment {snapshot.experiment_id}: {snapshot.rows} rows, "
+          f"{len(snapshot.variants)} variant(s), version {snapshot.data_version}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,245 @@
+# This file maintains the per-day HyperLogLog user sketches stored next to variant_rollup.
+#
+# Usage:
+#     python -m app.db.user_sketches rebuild [--experiment-id ID]
+
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import bindparam, delete, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.analysis.hll import build_sketch, empty_sketch, estimate, from_bytes, hash_values, merge, to_bytes
+from app.db.models import ExperimentData, VariantUserSketch
+
+# Raw rows read per round trip when rebuilding.
+REBUILD_BATCH_SIZE = 50_000
+
+
+def compute_sketch_deltas(rows: Iterable[dict]) -> dict:
+    """
+    Sketches the users of a batch of event rows per variant and day.
+
+    Rows without a `user_id` are skipped.
+
+    Args:
+        rows (Iterable[dict]): Rows as built by `app.db.ingest.build_event_row`.
+
+    Returns:
+        dict: Keyed by (variant, day): the users and converters sketches, the event count and the revenue.
+    """
+    groups = {}
+    for row in rows:
+        if row.get("user_id") is None:
+            continue
+        group = groups.get((row["variant"], row["timestamp"].date()))
+        if group is None:
+            group = groups[(row["variant"], row["timestamp"].date())] = ([], [], [0, 0.0])
+        group[0].append(row["user_id"])
+        if row["conversion"]:
+            group[1].append(row["user_id"])
+        group[2][0] += 1
+        group[2][1] += row["revenue"] or 0.0
+    return {
+        key: {
+            "users": build_sketch(hash_values(users)),
+            "converters": build_sketch(hash_values(converters)),
+            "events": totals[0],
+            "revenue_sum": totals[1],
+        }
+        for key, (users, converters, totals) in groups.items()
+    }
+
+
+def apply_sketch_deltas(db: Session, experiment_id: int, deltas: dict):
+    """
+    Merges per-day sketches into `variant_user_sketch`.
+
+    Missing rows are created first, then the affected rows are locked in key
+    order, merged in Python (register-wise max) and written back, all in the
+    caller's transaction.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The experiment the sketches belong to.
+        deltas (dict): Sketches keyed by (variant, day), from `compute_sketch_deltas`.
+    """
+    if not deltas:
+        return
+    keys = sorted(deltas)
+    now = datetime.now()
+    empty = to_bytes(empty_sketch())
+    db.execute(pg_insert(VariantUserSketch).values([
+        {"experiment_id": experiment_id, "variant": variant, "bucket": bucket, "users": empty,
+         "converters": empty, "events": 0, "revenue_sum": 0.0, "updated_at": now}
+        for variant, bucket in keys
+    ]).on_conflict_do_nothing())
+
+    stored = db.execute(
+        select(VariantUserSketch.variant, VariantUserSketch.bucket, VariantUserSketch.users, VariantUserSketch.converters)
+        .where(
+            VariantUserSketch.experiment_id == experiment_id,
+            tuple_(VariantUserSketch.variant, VariantUserSketch.bucket).in_(keys),
+        )
+        .order_by(VariantUserSketch.variant, VariantUserSketch.bucket)
+        .with_for_update()
+    ).all()
+
+    stmt = (
+        update(VariantUserSketch)
+        .where(
+            VariantUserSketch.experiment_id == bindparam("key_experiment_id"),
+            VariantUserSketch.variant == bindparam("key_variant"),
+            VariantUserSketch.bucket == bindparam("key_bucket"),
+        )
+        .values(
+            users=bindparam("new_users"),
+            converters=bindparam("new_converters"),
+            events=VariantUserSketch.events + bindparam("add_events"),
+            revenue_sum=VariantUserSketch.revenue_sum + bindparam("add_revenue"),
+            updated_at=bindparam("new_updated_at"),
+        )
+    )
+    db.connection().execute(stmt, [
+        {
+            "key_experiment_id": experiment_id,
+            "key_variant": variant,
+            "key_bucket": bucket,
+            "new_users": to_bytes(merge(from_bytes(users), deltas[(variant, bucket)]["users"])),
+            "new_converters": to_bytes(merge(from_bytes(converters), deltas[(variant, bucket)]["converters"])),
+            "add_events": deltas[(variant, bucket)]["events"],
+            "add_revenue": deltas[(variant, bucket)]["revenue_sum"],
+            "new_updated_at": now,
+        }
+        for variant, bucket, users, converters in stored
+    ])
+
+
+def _day_range(start: Optional[datetime], end: Optional[datetime]):
+    # Sketches are per day, so the range widens to whole days.
+    first = start.date() if start is not None else None
+    last = None
+    if end is not None:
+        last = end.date() if end.time() != datetime.min.time() else end.date() - timedelta(days=1)
+    return first, last
+
+
+def get_approximate_user_stats(db: Session, experiment_id: int, start: Optional[datetime] = None,
+                               end: Optional[datetime] = None) -> dict:
+    """
+    Estimates distinct and converted users per variant by merging the daily sketches in range.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (int): The ID of the experiment.
+        start (Optional[datetime]): Only include days from this one on.
+        end (Optional[datetime]): Only include days before this time; a partial day is included whole.
+
+    Returns:
+        dict: Keyed by variant: estimated users and converted_users, exact events and revenue_sum.
+    """
+    first, last = _day_range(start, end)
+    stmt = (
+        select(VariantUserSketch)
+        .where(VariantUserSketch.experiment_id == experiment_id)
+        .order_by(VariantUserSketch.variant)
+    )
+    if first is not None:
+        stmt = stmt.where(VariantUserSketch.bucket >= first)
+    if last is not None:
+        stmt = stmt.where(VariantUserSketch.bucket <= last)
+
+    merged = {}
+    for row in db.execute(stmt).scalars():
+        entry = merged.setdefault(row.variant, {"users": empty_sketch(), "converters": empty_sketch(), "events": 0, "revenue_sum": 0.0})
+        entry["users"] = merge(entry["users"], from_bytes(row.users))
+        entry["converters"] = merge(entry["converters"], from_bytes(row.converters))
+        entry["events"] += row.events
+        entry["revenue_sum"] += row.revenue_sum
+    return {
+        variant: {
+            "users": round(estimate(entry["users"])),
+            "converted_users": round(estimate(entry["converters"])),
+            "events": int(entry["events"]),
+            "revenue_sum": float(entry["revenue_sum"]),
+        }
+        for variant, entry in merged.items()
+        if entry["events"]
+    }
+
+
+def delete_sketches(db: Session, first: date, end: date):
+    """
+    Deletes the sketches of the days in [first, end), e.g. when their raw events are removed by retention.
+    """
+    db.execute(delete(VariantUserSketch).where(VariantUserSketch.bucket >= first, VariantUserSketch.bucket < end))
+
+
+def rebuild_user_sketches(db: Session, experiment_id: Optional[int] = None) -> int:
+    """
+    Recomputes the sketches from the events in `experiment_data` and commits.
+
+    The sketch table is locked for the duration so that concurrent ingestion
+    batches wait and then merge their users on top of the rebuilt sketches.
+
+    Args:
+        db (Session): The database session.
+        experiment_id (Optional[int]): Restrict to one experiment; all experiments if None.
+
+    Returns:
+        int: The number of events sketched.
+    """
+    db.execute(text(f"LOCK TABLE {VariantUserSketch.__tablename__} IN EXCLUSIVE MODE"))
+    delete_stmt = delete(VariantUserSketch)
+    if experiment_id is not None:
+        delete_stmt = delete_stmt.where(VariantUserSketch.experiment_id == experiment_id)
+    db.execute(delete_stmt)
+
+    stmt = (
+        select(
+            ExperimentData.experiment_id,
+            ExperimentData.variant,
+            ExperimentData.timestamp,
+            ExperimentData.user_id,
+            ExperimentData.conversion,
+            ExperimentData.revenue,
+        )
+        .where(ExperimentData.user_id.is_not(None), ExperimentData.experiment_id.is_not(None))
+        .order_by(ExperimentData.experiment_id)
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    if experiment_id is not None:
+        stmt = stmt.where(ExperimentData.experiment_id == experiment_id)
+
+    total = 0
+    for partition in db.execute(stmt).mappings().partitions():
+        by_experiment = {}
+        for row in partition:
+            by_experiment.setdefault(row["experiment_id"], []).append(row)
+        for key in sorted(by_experiment):
+            apply_sketch_deltas(db, key, compute_sketch_deltas(by_experiment[key]))
+        total += len(partition)
+    db.commit()
+    return total
+
+
+def main(argv=None):
+    from app.db.base import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain variant_user_sketch.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="Recompute the sketches from raw data.")
+    rebuild.add_argument("--experiment-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        total = rebuild_user_sketches(db, experiment_id=args.experiment_id)
+    finally:
+        db.close()
+    print(f"Sketched {total} event(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,45 @@
+# This file assembles the Prometheus exposition served at /metrics.
+
+from app.api.cache import response_cache
+from app.db.pool_metrics import pool_stats
+from app.instrumentation.metrics import format_labels, registry, render_gauges
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _render_pool_wait(pools: dict) -> str:
+    # The pools keep their own cumulative buckets; expose them as one histogram family.
+    lines = [
+        "# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    for name, pool in sorted(pools.items()):
+        buckets = list(pool["checkout_wait_buckets"].items()) + [("+Inf", pool["checkouts"])]
+        for bound, count in buckets:
+            bucket_labels = format_labels(("engine",), (name,), 'le="' + bound + '"')
+            lines.append(f"db_pool_checkout_wait_seconds_bucket{bucket_labels} {count}")
+        labels = format_labels(("engine",), (name,))
+        lines.append(f"db_pool_checkout_wait_seconds_sum{labels} {pool['checkout_wait_seconds_sum']!r}")
+        lines.append(f"db_pool_checkout_wait_seconds_count{labels} {pool['checkouts']}")
+    return "\n".join(lines) + "\n"
+
+
+def render_metrics() -> str:
+    """
+    Renders request, SQL, connection pool and response cache metrics in the Prometheus text format.
+    """
+    pools = pool_stats()
+    cache = response_cache.stats()
+    parts = [
+        registry.render(),
+        render_gauges("db_pool_checked_out", "Connections currently checked out of the pool.", ("engine",),
+                      {(name,): pool["checked_out"] for name, pool in pools.items()}),
+        render_gauges("db_pool_capacity", "Most connections the pool will open.", ("engine",),
+                      {(name,): pool["capacity"] for name, pool in pools.items()}),
+        render_gauges("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.", ("engine",),
+                      {(name,): pool["timeouts"] for name, pool in pools.items()}, kind="counter"),
+        _render_pool_wait(pools),
+        render_gauges("response_cache_requests_total", "Response cache lookups, by result.", ("result",),
+                      {("hit",): cache["hits"], ("miss",): cache["misses"]}, kind="counter"),
+    ]
+    return "".join(parts)
@@ -0,0 +1,226 @@
+# This file configures structured, queue-backed logging with per-request correlation ids.
+
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.config import settings
+from app.instrumentation.metrics import registry
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Incoming ids are reused only if they look like ids, so clients cannot inject into the logs.
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+# Attributes every LogRecord has; anything else was passed with `extra=` and is emitted as a field.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+log_records_dropped = registry.counter(
+    "log_records_dropped_total", "Log records discarded because the logging queue was full.",
+)
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Stamps records with the correlation id of the request they were logged in.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without formatting them.
+
+    The stock `QueueHandler.prepare` formats the message in the logging
+    thread; here the record is queued as-is and formatted by the listener, so
+    arguments must not be mutated after they are logged. When the queue is
+    full the record is dropped and counted rather than blocking the caller.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, including `extra=` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+def parse_levels(spec: str) -> dict:
+    """
+    Parses per-logger levels written as `logger=LEVEL,logger=LEVEL`, e.g. `sqlalchemy.engine=INFO,app.api=DEBUG`.
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, separator, level = item.partition("=")
+        if not separator:
+            raise ValueError(f"Logger level must be name=LEVEL, got {item!r}")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = "INFO", levels: str = "", format: str = "json", queue_size: int = 10_000,
+                      stream=None) -> QueueListener:
+    """
+    Routes all logging through a bounded queue drained by a background listener thread.
+
+    Calling it again replaces the previous configuration.
+
+    Args:
+        level (str): Root log level.
+        levels (str): Per-logger overrides, see `parse_levels`.
+        format (str): "json" for one JSON object per line, "text" for plain lines.
+        queue_size (int): Records buffered before new ones are dropped.
+        stream: Where the listener writes; defaults to stderr.
+
+    Returns:
+        QueueListener: The running listener.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if format == "json" else logging.Formatter(TEXT_FORMAT))
+    records = queue.Queue(maxsize=queue_size)
+    handler = NonBlockingQueueHandler(records)
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, logger_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """
+    Flushes queued records and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+class _Payload:
+    # Serialized only when the listener formats the record, off the request path.
+    def __init__(self, payload: Any, max_bytes: int):
+        self.payload = payload
+        self.max_bytes = max_bytes
+
+    def __str__(self) -> str:
+        data = self.payload.model_dump(mode="json") if hasattr(self.payload, "model_dump") else self.payload
+        text = json.dumps(data, default=str)
+        if len(text) > self.max_bytes:
+            return f"{text[:self.max_bytes]}... ({len(text)} bytes, truncated)"
+        return text
+
+
+def log_payload(logger: logging.Logger, label: str, payload: Any, sample_rate: Optional[float] = None,
+                max_bytes: Optional[int] = None) -> bool:
+    """
+    Logs a request payload at DEBUG level for a random sample of calls.
+
+    Nothing is serialized in the caller: the sampling decision is a single
+    random draw, and the payload is dumped and truncated to `max_bytes` by
+    the logging listener thread.
+
+    Args:
+        logger (logging.Logger): The logger to use.
+        label (str): What the payload is, e.g. "experiment.create".
+        payload (Any): A Pydantic model or JSON-serializable value.
+        sample_rate (Optional[float]): Fraction of calls logged, 0 to 1; defaults to LOG_PAYLOAD_SAMPLE_RATE.
+        max_bytes (Optional[int]): Longest serialized payload logged; defaults to LOG_PAYLOAD_MAX_BYTES.
+
+    Returns:
+        bool: True if the payload was logged.
+    """
+    if sample_rate is None:
+        sample_rate = settings.log_payload_sample_rate
+    if sample_rate <= 0 or random.random() >= sample_rate or not logger.isEnabledFor(logging.DEBUG):
+        return False
+    payload = _Payload(payload, settings.log_payload_max_bytes if max_bytes is None else max_bytes)
+    logger.debug("Payload %s: %s", label, payload, extra={"payload_label": label})
+    return True
+
+
+class CorrelationIdMiddleware:
+    """
+    Gives every HTTP request a correlation id, available to logging through `request_id`.
+
+    The id is taken from the X-Request-ID header when it looks like one and
+    generated otherwise, and it is echoed back in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        current = incoming if incoming and _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        token = request_id.set(current)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = current
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
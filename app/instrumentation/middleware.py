@@ -0,0 +1,89 @@
+# This file provides the ASGI middleware that records request latency, per-request SQL activity and profiles.
+
+import logging
+import time
+from starlette.datastructures import Headers, MutableHeaders
+from app.instrumentation.metrics import (
+    db_queries_per_request,
+    db_time_per_request,
+    http_request_duration,
+    n_plus_one_detected,
+)
+from app.instrumentation.profiler import PROFILE_HEADER, finish_profiler, profiling_requested, start_profiler
+from app.instrumentation.sql import RequestStats, current_request
+
+logger = logging.getLogger(__name__)
+
+
+def route_template(scope) -> str:
+    # Labelling by template rather than raw path keeps one series per endpoint.
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+class InstrumentationMiddleware:
+    """
+    Times every HTTP request and attributes its SQL statements to it.
+
+    Latency is recorded per method, route template and status once the
+    response body has been sent. Each response carries a Server-Timing header
+    with the SQL time and query count up to the start of the response. A
+    request that repeats one SELECT `n_plus_one_threshold` times or more is
+    counted and logged as a likely N+1 pattern.
+
+    Args:
+        app: The ASGI application to wrap.
+        n_plus_one_threshold (int): Repetitions of a SELECT within one request that get flagged; 0 disables.
+        profiling_token (str): Secret the X-Profile header must carry to profile a request; empty disables.
+        profiling_interval (float): Seconds between profiler samples.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = 10, profiling_token: str = "", profiling_interval: float = 0.005):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.profiling_token = profiling_token
+        self.profiling_interval = profiling_interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        profiler = None
+        if profiling_requested(Headers(scope=scope).get(PROFILE_HEADER), self.profiling_token):
+            profiler = start_profiler(self.profiling_interval)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f'db;dur={stats.seconds * 1000:.3f};desc="{stats.queries} queries"')
+                if profiler is not None:
+                    headers.append("X-Profile-Id", profiler.profile_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            route = route_template(scope)
+            if profiler is not None:
+                finish_profiler(profiler, route)
+            self._record(scope["method"], route, status, elapsed, stats)
+
+    def _record(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats):
+        http_request_duration.observe(elapsed, method, route, str(status))
+        db_queries_per_request.observe(stats.queries, route)
+        db_time_per_request.observe(stats.seconds, route)
+        if not self.n_plus_one_threshold:
+            return
+        repeated = stats.repeated_selects(self.n_plus_one_threshold)
+        if repeated:
+            n_plus_one_detected.inc(route)
+            statement, count = repeated[0]
+            logger.warning("Possible N+1 query in %s %s: statement executed %d times: %s", method, route, count, statement)
@@ -0,0 +1,141 @@
+# This file implements the on-demand sampling profiler enabled per request by header.
+
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Optional
+
+# Header that asks for a request to be profiled; its value must equal PROFILING_TOKEN.
+PROFILE_HEADER = "x-profile"
+
+# Profiles kept for download before the oldest are forgotten.
+MAX_PROFILES = 20
+
+# Hard stop for a profile, whatever the request does.
+MAX_PROFILE_SECONDS = 30.0
+
+# A thread whose innermost frame is in one of these files is waiting, not working.
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+# Only one request is profiled at a time, so the overhead stays bounded.
+_active = threading.Lock()
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def profiling_requested(header_value: Optional[str], token: str) -> bool:
+    """
+    Tells whether a request's X-Profile header unlocks profiling. Profiling is off while no token is configured.
+    """
+    if not token or not header_value:
+        return False
+    return hmac.compare_digest(header_value.encode(), token.encode())
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every busy thread of the process at a fixed interval.
+
+    Stacks are sampled with `sys._current_frames()` from a background thread,
+    so the profiled code runs unmodified; threads waiting on a lock, queue or
+    socket are skipped. Requests served concurrently by the same worker show
+    up in the profile too, labelled by thread.
+
+    Attributes:
+        profile_id (str): Identifier under which the result is stored.
+        interval (float): Seconds between samples.
+        samples (Counter): Folded stack -> number of samples.
+    """
+
+    def __init__(self, interval: float):
+        self.profile_id = uuid.uuid4().hex
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._started = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        own = threading.get_ident()
+        deadline = self._started + MAX_PROFILE_SECONDS
+        while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                self.samples[f"{names.get(ident, ident)};{_fold(frame)}"] += 1
+
+    def stop(self, route: str) -> dict:
+        """
+        Stops sampling and stores the profile.
+
+        Returns:
+            dict: The profile summary (id, route, duration, sample count).
+        """
+        self._stop.set()
+        self._thread.join()
+        profile = {
+            "id": self.profile_id,
+            "route": route,
+            "duration_seconds": round(time.perf_counter() - self._started, 6),
+            "interval_seconds": self.interval,
+            "sample_count": sum(self.samples.values()),
+            "samples": self.samples,
+        }
+        with _profiles_lock:
+            _profiles[self.profile_id] = profile
+            while len(_profiles) > MAX_PROFILES:
+                _profiles.popitem(last=False)
+        return profile
+
+
+def start_profiler(interval: float) -> Optional[SamplingProfiler]:
+    """
+    Starts a profiler unless another request is being profiled.
+
+    Returns:
+        Optional[SamplingProfiler]: The running profiler, or None if one is already active.
+    """
+    if not _active.acquire(blocking=False):
+        return None
+    try:
+        return SamplingProfiler(interval).start()
+    except Exception:
+        _active.release()
+        raise
+
+
+def finish_profiler(profiler: SamplingProfiler, route: str) -> dict:
+    try:
+        return profiler.stop(route)
+    finally:
+        _active.release()
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def folded_stacks(profile: dict) -> str:
+    """
+    Renders a profile in the folded-stack format read by flamegraph.pl, speedscope and similar tools.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in profile["samples"].most_common())
@@ -0,0 +1,83 @@
+# This file times SQL statements through SQLAlchemy engine events and attributes them to the current request.
+
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from app.instrumentation.metrics import db_query_duration
+
+# Characters of a statement kept when reporting it.
+MAX_STATEMENT_CHARS = 300
+
+
+class RequestStats:
+    """
+    SQL activity of one request.
+
+    The object is shared by everything running in the request's context,
+    including sync handlers on the threadpool, so counters are plain
+    attributes updated in place.
+
+    Attributes:
+        queries (int): Statements executed (an executemany counts once).
+        seconds (float): Time spent executing them.
+        selects (Counter): How often each distinct SELECT text was executed.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.selects = StatementCounter()
+
+    def repeated_selects(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Returns the SELECTs executed at least `threshold` times, most repeated first: the N+1 candidates.
+        """
+        return [(statement, count) for statement, count in self.selects.most_common() if count >= threshold]
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip("( \n").split(None, 1)
+    return words[0].upper() if words else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    operation = _operation(statement)
+    db_query_duration.observe(elapsed, operation)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+        if operation in ("SELECT", "WITH"):
+            # Statements are parameterized, so the N queries of an N+1 share one text.
+            stats.selects[statement[:MAX_STATEMENT_CHARS]] += 1
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine):
+    """
+    Hooks statement timing into an engine.
+
+    Args:
+        engine: An `Engine` or `AsyncEngine`; async engines are hooked through their sync engine.
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
@@ -1,11 +1,79 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.base import init_db
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.analysis.bootstrap import shutdown_executor
+from app.analysis.jobs import job_manager
+from app.api.assignment import assignment_service
+from app.config import settings
+from app.db.base import engine
+from app.db.health import (
+    READINESS_TIMEOUT_SECONDS,
+    check_database,
+    warm_up_async_pool,
+    warm_up_pool,
+    warmup_connections,
+)
+from app.db.pool_metrics import pool_stats
+from app.instrumentation.exposition import PROMETHEUS_CONTENT_TYPE, render_metrics
+from app.instrumentation.logs import CorrelationIdMiddleware, configure_logging, stop_logging
+from app.instrumentation.middleware import InstrumentationMiddleware
+from app.instrumentation.profiler import PROFILE_HEADER, folded_stacks, get_profile, profiling_requested
 from app.api.routes import app as routes_app
 
-init_db()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the worker's background services and warms its connection pool; stops them on shutdown.
+
+    Nothing here touches the schema: tables are created and changed by
+    `alembic upgrade head`, run once per deployment, so workers start without
+    DDL and never race each other for locks. A failed warmup is logged and
+    left for the readiness probe to report, rather than crashing the worker.
+    """
+    configure_logging(settings.log_level, settings.log_levels, settings.log_format, settings.log_queue_size)
+    started = time.perf_counter()
+    connections = warmup_connections(settings)
+    warmup = {"connections": connections, "opened": 0, "error": None}
+    try:
+        warmup["opened"] = await run_in_threadpool(warm_up_pool, engine, connections)
+        if settings.db_mode == "async":
+            from app.db.async_base import async_engine
+            await warm_up_async_pool(async_engine, connections)
+    except Exception as exc:
+        logger.warning("Connection pool warmup failed: %s", exc)
+        warmup["error"] = f"{type(exc).__name__}: {exc}"[:300]
+    assignment_service.start()
+    app.state.warmup = warmup
+    app.state.startup_seconds = round(time.perf_counter() - started, 3)
+    app.state.started_at = time.monotonic()
+    logger.info("Worker started in %.3fs", app.state.startup_seconds)
+    try:
+        yield
+    finally:
+        assignment_service.stop()
+        job_manager.shutdown()
+        await run_in_threadpool(shutdown_executor)
+        engine.dispose()
+        if settings.db_mode == "async":
+            from app.db.async_base import async_engine
+            await async_engine.dispose()
+        stop_logging()
+
 
-app=FastAPI(title="Streaming Services API")
+app=FastAPI(title="Streaming Services API", lifespan=lifespan)
+# DB_MODE selects the request path used by the experiment CRUD and metrics endpoints
+if settings.db_mode == "async":
+    from app.api.async_routes import app as async_routes_app
+    # Registered first, so these handlers take precedence over their sync equivalents.
+    app.include_router(async_routes_app)
 app.include_router(routes_app)
 
 app.add_middleware(
@@ -15,6 +83,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added after CORS, so it wraps it and its timings include it.
+app.add_middleware(
+    InstrumentationMiddleware,
+    n_plus_one_threshold=settings.n_plus_one_threshold,
+    profiling_token=settings.profiling_token,
+    profiling_interval=settings.profiling_interval_ms / 1000,
+)
+# Outermost of all, so everything logged while serving a request carries its id.
+app.add_middleware(CorrelationIdMiddleware)
 
 @app.get("/")
 async def root():
@@ -24,4 +101,94 @@ async def root():
     Returns:
         dict: A dictionary containing a greeting message.
     """
-    return {"message": "Hello World"}
\ No newline at end of file
+    return {"message": "Hello World"}
+
+@app.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: answers as long as the worker's event loop does, without touching the database.
+
+    Returns:
+        dict: The status and the worker's uptime.
+    """
+    started_at = getattr(app.state, "started_at", None)
+    return {"status": "alive", "uptime_seconds": round(time.monotonic() - started_at, 3) if started_at is not None else None}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: the worker has started, the database answers, its schema is at the expected revision
+    and the assignment snapshot is loaded.
+
+    Returns:
+        JSONResponse: The individual checks, with status 200 when all pass and 503 otherwise.
+    """
+    try:
+        database = await asyncio.wait_for(run_in_threadpool(check_database, engine), READINESS_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        database = {"reachable": False, "error": f"No answer within {READINESS_TIMEOUT_SECONDS}s"}
+    started = getattr(app.state, "started_at", None) is not None
+    assignment = assignment_service.stats()
+    ready = (
+        started
+        and database["reachable"]
+        and database["migrations"]["up_to_date"]
+        and assignment["ready"]
+    )
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "status": "ready" if ready else "not_ready",
+        "started": started,
+        "startup_seconds": getattr(app.state, "startup_seconds", None),
+        "warmup": getattr(app.state, "warmup", None),
+        "database": database,
+        "assignment": assignment,
+        "pool": pool_stats(),
+    })
+
+@app.get("/db/pool")
+async def get_pool_stats():
+    """
+    Reports connection pool occupancy, saturation and checkout latency for each database engine.
+
+    Returns:
+        dict: Pool statistics keyed by engine name ("sync", and "async" when enabled).
+    """
+    return pool_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Exposes request latency, SQL timing, N+1 detections, pool and response cache metrics for Prometheus.
+
+    Returns:
+        PlainTextResponse: The metrics in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/debug/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_request_profile(profile_id: str, request: Request):
+    """
+    Downloads a request profile as folded stacks, ready for flamegraph.pl or speedscope.
+
+    A request is profiled when it carries `X-Profile: <PROFILING_TOKEN>`; its
+    response then names the profile in `X-Profile-Id`. Fetching the profile
+    requires the same header.
+
+    Args:
+        profile_id (str): The id from the profiled response's X-Profile-Id header.
+        request (Request): The incoming request, for the X-Profile header.
+
+    Returns:
+        PlainTextResponse: One `thread;frame;...;frame count` line per sampled stack.
+
+    Raises:
+        HTTPException: 404 if profiling is off, the token is wrong or the profile is unknown.
+    """
+    profile = get_profile(profile_id)
+    if profile is None or not profiling_requested(request.headers.get(PROFILE_HEADER), settings.profiling_token):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded_stacks(profile), headers={
+        "X-Profile-Route": profile["route"],
+        "X-Profile-Duration": str(profile["duration_seconds"]),
+        "X-Profile-Samples": str(profile["sample_count"]),
+    })
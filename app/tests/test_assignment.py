@@ -0,0 +1,29 @@
+from collections import Counter
+from app.api.assignment import AssignmentConfig
+
+
+def test_assignment_is_deterministic_and_follows_weights():
+    config = AssignmentConfig(1, "salt", {"A": 3.0, "B": 1.0, "C": 0.0})
+    users = [f"user-{index}" for index in range(20_000)]
+    assignments = config.assign_many(users)
+    assert assignments == AssignmentConfig(1, "salt", {"C": 0.0, "B": 1.0, "A": 3.0}).assign_many(users)
+    counts = Counter(assignments.values())
+    assert set(counts) == {"A", "B"}
+    assert abs(counts["A"] / len(users) - 0.75) < 0.02
+
+
+def test_salts_assign_independently():
+    users = [f"user-{index}" for index in range(5_000)]
+    first = AssignmentConfig(1, "first", {"A": 1.0, "B": 1.0}).assign_many(users)
+    second = AssignmentConfig(2, "second", {"A": 1.0, "B": 1.0}).assign_many(users)
+    agreement = sum(first[user] == second[user] for user in users) / len(users)
+    assert abs(agreement - 0.5) < 0.05
+
+
+def test_changing_weights_only_moves_users_across_one_boundary():
+    users = [f"user-{index}" for index in range(10_000)]
+    before = AssignmentConfig(1, "salt", {"A": 50.0, "B": 50.0}).assign_many(users)
+    after = AssignmentConfig(1, "salt", {"A": 60.0, "B": 40.0}).assign_many(users)
+    moved = [user for user in users if before[user] != after[user]]
+    assert all(before[user] == "B" and after[user] == "A" for user in moved)
+    assert abs(len(moved) / len(users) - 0.10) < 0.02
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "benchmarks"))
+
+from suite import MIN_COMPARED_MS, compare, process_tree, read_tree_rss_mb
+
+
+def run(**phases):
+    return {"results": phases}
+
+
+def regressed(rows):
+    return {(row["phase"], row["metric"]) for row in rows if row["regressed"]}
+
+
+def test_throughput_regresses_when_it_drops():
+    baseline = run(ingest={"requests_per_sec": 100.0, "events_per_sec": 1000.0, "errors": 0})
+    current = run(ingest={"requests_per_sec": 120.0, "events_per_sec": 850.0, "errors": 0})
+    assert regressed(compare(baseline, current, threshold=0.10)) == {("ingest", "events_per_sec")}
+
+
+def test_latency_and_rss_regress_when_they_rise():
+    baseline = run(metrics_basic={"p50_ms": 20.0, "p99_ms": 50.0, "peak_rss_mb": 300.0, "errors": 0})
+    current = run(metrics_basic={"p50_ms": 15.0, "p99_ms": 60.0, "peak_rss_mb": 340.0, "errors": 0})
+    assert regressed(compare(baseline, current, threshold=0.10)) == {
+        ("metrics_basic", "p99_ms"), ("metrics_basic", "peak_rss_mb"),
+    }
+
+
+def test_changes_within_the_threshold_pass():
+    baseline = run(export={"requests_per_sec": 100.0, "p99_ms": 50.0, "errors": 0})
+    current = run(export={"requests_per_sec": 95.0, "p99_ms": 54.0, "errors": 0})
+    assert regressed(compare(baseline, current, threshold=0.10)) == set()
+
+
+def test_latencies_under_the_noise_floor_are_not_compared():
+    baseline = run(create={"p50_ms": MIN_COMPARED_MS / 4, "p99_ms": MIN_COMPARED_MS / 2, "errors": 0})
+    current = run(create={"p50_ms": MIN_COMPARED_MS / 2, "p99_ms": MIN_COMPARED_MS, "errors": 0})
+    assert compare(baseline, current, threshold=0.10) == []
+
+
+def test_new_errors_are_a_regression():
+    baseline = run(analysis_job={"requests_per_sec": 3.0, "errors": 0})
+    current = run(analysis_job={"requests_per_sec": 3.0, "errors": 2})
+    assert regressed(compare(baseline, current, threshold=0.10)) == {("analysis_job", "errors")}
+
+
+def test_phases_missing_from_either_run_are_skipped():
+    baseline = run(ingest={"requests_per_sec": 100.0, "errors": 0})
+    assert compare(baseline, run(), threshold=0.10) == []
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"), reason="needs /proc")
+def test_rss_covers_child_processes():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        assert child.pid in process_tree(os.getpid())
+        assert read_tree_rss_mb(os.getpid()) > read_tree_rss_mb(child.pid) > 0
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,90 @@
+import dataclasses
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import pytest
+from app.analysis import bootstrap
+from app.analysis.bootstrap import SampleSet, analyze_bootstrap, bootstrap_means
+
+
+def make_samples():
+    rng = np.random.default_rng(0)
+    sizes = [40, 55, 31]
+    values = np.vstack([rng.lognormal(2.0, 1.0, sum(sizes)), rng.gamma(2.0, 3.0, sum(sizes))])
+    return SampleSet(variants=["A", "B", "C"], offsets=np.concatenate([[0], np.cumsum(sizes)]), values=values)
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    def use(count):
+        bootstrap.shutdown_executor()
+        monkeypatch.setattr(bootstrap, "settings", dataclasses.replace(bootstrap.settings, bootstrap_workers=count))
+
+    yield use
+    bootstrap.shutdown_executor()
+
+
+@pytest.fixture
+def created_blocks(monkeypatch):
+    names = []
+
+    class RecordingSharedMemory(SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            names.append(self.name)
+
+    monkeypatch.setattr(bootstrap, "SharedMemory", RecordingSharedMemory)
+    return names
+
+
+def assert_unlinked(names):
+    assert names
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+
+
+def test_same_seed_gives_the_same_intervals_whatever_the_worker_count(workers):
+    samples = make_samples()
+    results = []
+    for count in (1, 3):
+        workers(count)
+        # Spans several chunks, so the chunks land on different workers.
+        results.append(analyze_bootstrap(samples, n_resamples=bootstrap.RESAMPLES_PER_CHUNK * 2 + 10, seed=42))
+
+    assert results[0] == results[1]
+    assert analyze_bootstrap(samples, n_resamples=100, seed=43) != analyze_bootstrap(samples, n_resamples=100, seed=42)
+
+
+def test_resample_chunk_matches_a_plain_numpy_bootstrap():
+    samples = make_samples()
+    shm = SharedMemory(create=True, size=samples.values.nbytes)
+    try:
+        shared = np.ndarray(samples.values.shape, dtype=np.float64, buffer=shm.buf)
+        shared[:] = samples.values
+        del shared
+        means = bootstrap._resample_chunk(shm.name, samples.values.shape, samples.offsets, 50, 7)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    rng = np.random.default_rng(7)
+    for variant in range(len(samples.variants)):
+        segment = samples.values[:, samples.offsets[variant]:samples.offsets[variant + 1]]
+        indices = rng.integers(0, segment.shape[1], size=(50, segment.shape[1]))
+        np.testing.assert_allclose(means[variant], segment[:, indices].mean(axis=-1))
+
+
+def test_shared_memory_is_unlinked_after_success(workers, created_blocks):
+    workers(1)
+    assert bootstrap_means(make_samples(), n_resamples=20, seed=1).shape == (3, 2, 20)
+    assert_unlinked(created_blocks)
+
+
+def test_shared_memory_is_unlinked_when_a_worker_fails(workers, created_blocks):
+    workers(1)
+    # Offsets past the end of the values make the worker's matrix product fail.
+    samples = SampleSet(variants=["A"], offsets=np.array([0, 5]), values=np.ones((2, 3)))
+
+    with pytest.raises(ValueError):
+        bootstrap_means(samples, n_resamples=20, seed=1)
+    assert_unlinked(created_blocks)
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import pytest
+from starlette.requests import Request
+from app.api.cache import CacheBackend, MemoryCacheBackend, ResponseCache
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_memory_backend_expires_and_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", "A", ttl=60)
+    backend.set("b", "B", ttl=60)
+    assert backend.get("a") == "A"
+    backend.set("c", "C", ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == "A"
+    backend.set("d", "D", ttl=-1)
+    assert backend.get("d") is None
+
+
+def test_response_cache_etag_and_invalidation():
+    cache = ResponseCache(MemoryCacheBackend(max_entries=10), ttl=60)
+    cached, generation = cache.lookup(make_request(), "experiment", 1)
+    assert cached is None
+    response = cache.store(make_request(), "experiment", 1, {"id": 1}, generation)
+    etag = response.headers["etag"]
+
+    cached, _ = cache.lookup(make_request(), "experiment", 1)
+    assert cached.status_code == 200 and cached.body == response.body
+    cached, _ = cache.lookup(make_request(f"W/{etag}"), "experiment", 1)
+    assert cached.status_code == 304 and cached.headers["etag"] == etag
+
+    cache.invalidate(1)
+    cached, _ = cache.lookup(make_request(etag), "experiment", 1)
+    assert cached is None
+
+
+def test_response_cache_skips_results_read_before_a_write():
+    cache = ResponseCache(MemoryCacheBackend(max_entries=10), ttl=60)
+    _, generation = cache.lookup(make_request(), "metrics:basic", 1)
+    cache.invalidate(1)
+    cache.store(make_request(), "metrics:basic", 1, {"stale": True}, generation)
+    assert cache.lookup(make_request(), "metrics:basic", 1)[0] is None
+
+
+def test_store_racing_an_invalidation_leaves_no_entry():
+    entered, release = threading.Event(), threading.Event()
+
+    class SlowBackend(MemoryCacheBackend):
+        def set(self, key, value, ttl):
+            entered.set()
+            release.wait(5)
+            super().set(key, value, ttl)
+
+    cache = ResponseCache(SlowBackend(max_entries=10), ttl=60)
+    _, generation = cache.lookup(make_request(), "metrics:basic", 1)
+    store = threading.Thread(target=cache.store, args=(make_request(), "metrics:basic", 1, {"stale": True}, generation))
+    store.start()
+    assert entered.wait(5)
+    # No lock is held across the backend write, so the invalidation completes first.
+    invalidate = threading.Thread(target=cache.invalidate, args=(1,))
+    invalidate.start()
+    invalidate.join(5)
+    assert not invalidate.is_alive()
+    release.set()
+    store.join(5)
+    assert cache.lookup(make_request(), "metrics:basic", 1)[0] is None
+
+
+def test_async_methods_run_a_blocking_backend_off_the_event_loop():
+    class RemoteBackend(MemoryCacheBackend):
+        blocking = True
+
+        def __init__(self, max_entries):
+            super().__init__(max_entries)
+            self.threads = set()
+
+        def get(self, key):
+            self.threads.add(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value, ttl):
+            self.threads.add(threading.get_ident())
+            super().set(key, value, ttl)
+
+        def delete(self, keys):
+            self.threads.add(threading.get_ident())
+            super().delete(keys)
+
+    async def exercise(cache):
+        cached, generation = await cache.lookup_async(make_request(), "experiment", 1)
+        assert cached is None
+        await cache.store_async(make_request(), "experiment", 1, {"id": 1}, generation)
+        cached, _ = await cache.lookup_async(make_request(), "experiment", 1)
+        assert cached.status_code == 200
+        await cache.invalidate_async(1)
+        assert (await cache.lookup_async(make_request(), "experiment", 1))[0] is None
+        return threading.get_ident()
+
+    backend = RemoteBackend(max_entries=10)
+    loop_thread = asyncio.run(exercise(ResponseCache(backend, ttl=60)))
+    assert backend.threads and loop_thread not in backend.threads
+
+
+def test_cache_backend_requires_every_method():
+    class Partial(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
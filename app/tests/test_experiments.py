@@ -0,0 +1,116 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from app.api import experiments as api_experiments
+from app.api.schemas import ExperimentCreate
+from app.db.experiments import experiments_query
+from app.db.models import BaseExperiment, ExperimentData
+
+
+def compile_sql(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_experiments_query_defaults_to_active_in_id_order():
+    sql = compile_sql(experiments_query(after=10))
+    assert "experiment.deleted_at IS NULL" in sql
+    assert "experiment.id > 10" in sql
+    assert sql.endswith("ORDER BY experiment.id")
+
+
+def test_experiments_query_deleted_filters():
+    assert "deleted_at IS NOT NULL" in compile_sql(experiments_query(deleted="deleted"))
+    all_sql = compile_sql(experiments_query(deleted="all", experiment_type="checkout"))
+    assert "deleted_at" not in all_sql.split("FROM", 1)[1]
+    assert "experiment.experiment_type = 'checkout'" in all_sql
+
+
+def make_create(**changes):
+    body = {
+        "name": "Checkout", "description": "New checkout", "goal_metric": "conversion_rate",
+        "experiment_type": "checkout", "desired_outcome": "more", "null_hypothesis": "same",
+        "alternative_hypothesis": "better", "sample_size_group_a": 100, "sample_size_group_b": 100,
+        "significance_level": 0.05, "power": 0.8, "bias_control_method": "random",
+        "identified_confounders": "none", "success_metrics": "conversion_rate",
+        "experiment_variants": [{"variant": "A", "conversion": False}, {"variant": "B", "conversion": False}],
+    }
+    return ExperimentCreate(**{**body, **changes})
+
+
+def stored_experiment(body):
+    now = datetime(2026, 1, 1)
+    fields = {field: getattr(body, field) for field in api_experiments.EXPERIMENT_FIELDS}
+    return BaseExperiment(
+        id=3, **fields, idempotency_key="key-1", request_fingerprint=api_experiments.request_fingerprint(body),
+        created_data_ids=[10, 11], created_at=now, updated_at=now,
+    )
+
+
+def stored_rows():
+    now = datetime(2026, 1, 1)
+    return [
+        ExperimentData(id=event_id, experiment_id=3, variant=variant, timestamp=now, conversion=False, revenue=0.0,
+                       engagement_minutes=0.0, created_at=now, updated_at=now)
+        for event_id, variant in ((10, "A"), (11, "B"))
+    ]
+
+
+def replay_session(rows):
+    db = MagicMock()
+    db.execute.return_value.scalars.return_value.all.return_value = rows
+    return db
+
+
+def test_same_key_and_body_replays_the_created_rows(monkeypatch):
+    body = make_create()
+    monkeypatch.setattr(api_experiments, "_find_by_idempotency_key", lambda db, key: stored_experiment(body))
+    db = replay_session(stored_rows())
+
+    response, created = api_experiments.create_experiment_record(db, body, "key-1")
+
+    assert created is False
+    assert response["experiment"].id == 3
+    assert [row.id for row in response["experiment_data"]] == [10, 11]
+    sql = compile_sql(db.execute.call_args.args[0])
+    assert "experiment_data.id IN (10, 11)" in sql
+    assert "created_at =" not in sql
+    db.add.assert_not_called()
+    db.commit.assert_not_called()
+
+
+def test_reused_key_with_another_body_is_a_conflict(monkeypatch):
+    monkeypatch.setattr(api_experiments, "_find_by_idempotency_key", lambda db, key: stored_experiment(make_create()))
+    db = replay_session(stored_rows())
+
+    with pytest.raises(HTTPException) as error:
+        api_experiments.create_experiment_record(db, make_create(name="Other"), "key-1")
+    assert error.value.status_code == 409
+    db.add.assert_not_called()
+
+
+def test_losing_the_creation_race_replays_the_winner(monkeypatch):
+    body = make_create()
+    # Not there when checked first; committed by a concurrent request by the time the insert fails.
+    found = iter([None, stored_experiment(body)])
+    monkeypatch.setattr(api_experiments, "_find_by_idempotency_key", lambda db, key: next(found))
+    db = replay_session(stored_rows())
+    db.flush.side_effect = IntegrityError("INSERT INTO experiment", {}, Exception("duplicate key"))
+
+    response, created = api_experiments.create_experiment_record(db, body, "key-1")
+
+    assert created is False
+    assert response["experiment"].id == 3
+    db.rollback.assert_called_once()
+    db.commit.assert_not_called()
+
+
+def test_creation_race_without_a_key_reraises(monkeypatch):
+    db = MagicMock()
+    db.flush.side_effect = IntegrityError("INSERT INTO experiment", {}, Exception("constraint"))
+
+    with pytest.raises(IntegrityError):
+        api_experiments.create_experiment_record(db, make_create(), None)
+    db.rollback.assert_called_once()
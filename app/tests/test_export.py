@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.api.export import encode_csv, encode_ndjson, encode_parquet
+from app.db.export import EXPORT_COLUMNS, get_events_page
+
+CREATED = datetime(2026, 1, 2, 3, 4, 5, 678901)
+
+ROWS = [
+    (1, 7, "A", datetime(2026, 1, 1, 12, 0), True, 19.99, 3.5, {"country": "US", "visits": 2}, "u1", "s1",
+     CREATED, CREATED),
+    (4, 7, "B", datetime(2026, 1, 1, 12, 30, 0, 250000), False, 0.0, 0.0, None, None, None, CREATED, CREATED),
+    (9, 7, "A, \"quoted\"", datetime(2026, 1, 31, 23, 59, 59), False, 1e-7, 120.25, {"note": "line\nbreak"}, "u,2",
+     None, CREATED, CREATED),
+]
+
+# Batches as the server-side cursor hands them to the encoders.
+BATCHES = [ROWS[:2], ROWS[2:]]
+
+
+def decode_ndjson(body):
+    rows = []
+    for line in body.decode().splitlines():
+        event = json.loads(line)
+        for column in ("timestamp", "created_at", "updated_at"):
+            event[column] = datetime.fromisoformat(event[column])
+        rows.append(event)
+    return rows
+
+
+def decode_csv(body):
+    rows = []
+    for record in csv.DictReader(io.StringIO(body.decode())):
+        event = {column: (value if value != "" else None) for column, value in record.items()}
+        for column in ("id", "experiment_id"):
+            event[column] = int(event[column])
+        for column in ("revenue", "engagement_minutes"):
+            event[column] = float(event[column])
+        for column in ("timestamp", "created_at", "updated_at"):
+            event[column] = datetime.fromisoformat(event[column])
+        event["conversion"] = event["conversion"] == "True"
+        if event["additional_data"] is not None:
+            event["additional_data"] = json.loads(event["additional_data"])
+        rows.append(event)
+    return rows
+
+
+def decode_parquet(body):
+    rows = pq.read_table(io.BytesIO(body)).to_pylist()
+    for event in rows:
+        if event["additional_data"] is not None:
+            event["additional_data"] = json.loads(event["additional_data"])
+    return rows
+
+
+@pytest.mark.parametrize("encoder, decoder", [
+    (encode_ndjson, decode_ndjson),
+    (encode_csv, decode_csv),
+    (encode_parquet, decode_parquet),
+])
+def test_every_format_round_trips_the_same_rows(encoder, decoder):
+    body = b"".join(encoder(iter(BATCHES)))
+    assert decoder(body) == [dict(zip(EXPORT_COLUMNS, row)) for row in ROWS]
+
+
+def test_parquet_writes_one_row_group_per_batch():
+    metadata = pq.ParquetFile(io.BytesIO(b"".join(encode_parquet(iter(BATCHES))))).metadata
+    assert [metadata.row_group(group).num_rows for group in range(metadata.num_row_groups)] == [2, 1]
+
+
+class FakeSession:
+    """
+    Answers keyset page queries over a fixed list of event ids.
+    """
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+
+    def execute(self, stmt):
+        sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        assert "ORDER BY experiment_data.id" in sql and "OFFSET" not in sql
+        after = re.search(r"experiment_data\.id > (\d+)", sql)
+        limit = int(re.search(r"LIMIT (\d+)", sql).group(1))
+        ids = [event_id for event_id in self.ids if after is None or event_id > int(after.group(1))][:limit]
+        return FakeResult([(event_id, 7) + ROWS[0][2:] for event_id in ids])
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+def walk_pages(db, limit):
+    pages, after = [], None
+    while True:
+        events, after = get_events_page(db, 7, after, limit)
+        pages.append([event["id"] for event in events])
+        if after is None:
+            return pages
+
+
+@pytest.mark.parametrize("ids, limit, expected", [
+    ([2, 3, 5, 8, 13, 21, 34], 3, [[2, 3, 5], [8, 13, 21], [34]]),
+    # A last page that is exactly full ends the walk without an empty extra page.
+    ([2, 3, 5, 8, 13, 21], 3, [[2, 3, 5], [8, 13, 21]]),
+    ([2, 3], 5, [[2, 3]]),
+    ([], 5, [[]]),
+])
+def test_keyset_pages_neither_skip_nor_repeat_events(ids, limit, expected):
+    assert walk_pages(FakeSession(ids), limit) == expected
+
+
+def test_next_cursor_is_the_last_id_of_the_page():
+    events, after = get_events_page(FakeSession([10, 20, 30]), 7, None, 2)
+    assert after == events[-1]["id"] == 20
+    events, after = get_events_page(FakeSession([10, 20, 30]), 7, after, 2)
+    assert [event["id"] for event in events] == [30] and after is None
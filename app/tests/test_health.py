@@ -0,0 +1,19 @@
+import os
+from dataclasses import replace
+from app.config import Settings
+from app.db.health import ALEMBIC_DIR, expected_revisions, warmup_connections
+
+
+def test_warmup_is_capped_at_the_pool_size():
+    assert warmup_connections(replace(Settings(), db_pool_warmup=2, db_pool_size=5)) == 2
+    assert warmup_connections(replace(Settings(), db_pool_warmup=20, db_pool_size=5)) == 5
+    assert warmup_connections(replace(Settings(), db_pool_warmup=0)) == 0
+
+
+def test_no_warmup_behind_pgbouncer():
+    assert warmup_connections(replace(Settings(), db_pool_warmup=2, db_pgbouncer=True)) == 0
+
+
+def test_expected_revision_is_the_latest_migration():
+    versions = sorted(name for name in os.listdir(os.path.join(ALEMBIC_DIR, "versions")) if name.endswith(".py"))
+    assert expected_revisions() == [versions[-1].split("_")[0]]
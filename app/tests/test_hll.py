@@ -0,0 +1,27 @@
+from app.analysis.hll import (
+    HLL_STANDARD_ERROR,
+    build_sketch,
+    estimate,
+    from_bytes,
+    hash_values,
+    merge,
+    to_bytes,
+)
+
+
+def sketch_of(first, last):
+    return build_sketch(hash_values(f"user-{i}" for i in range(first, last)))
+
+
+def test_estimate_within_error_bounds():
+    assert estimate(sketch_of(0, 0)) == 0
+    assert round(estimate(sketch_of(0, 10))) == 10
+    for size in (5_000, 200_000):
+        assert abs(estimate(sketch_of(0, size)) - size) / size < 4 * HLL_STANDARD_ERROR
+
+
+def test_merge_counts_union_and_survives_storage():
+    # Two overlapping days: 60k + 70k users with 30k in common.
+    merged = merge(from_bytes(to_bytes(sketch_of(0, 60_000))), sketch_of(30_000, 100_000))
+    assert abs(estimate(merged) - 100_000) / 100_000 < 4 * HLL_STANDARD_ERROR
+    assert (merged == merge(sketch_of(0, 100_000))).all()
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.api.ingest import iter_ndjson_stream
+from app.api.schemas import ExperimentEventData
+from app.db.ingest import build_event_row, utc_now
+from app.db.user_sketches import compute_sketch_deltas
+
+NOW = datetime(2026, 1, 5, 12, 0, 0)
+
+
+def test_offset_timestamps_are_stored_as_naive_utc():
+    event = ExperimentEventData(variant="A", conversion=True, timestamp="2026-01-01T23:30:00-05:00", user_id="u1")
+    row = build_event_row(1, event, NOW)
+    assert row["timestamp"] == datetime(2026, 1, 2, 4, 30)
+    assert row["timestamp"].tzinfo is None
+
+
+def test_naive_and_missing_timestamps_are_kept():
+    naive = ExperimentEventData(variant="A", conversion=False, timestamp="2026-01-01T23:30:00")
+    assert build_event_row(1, naive, NOW)["timestamp"] == datetime(2026, 1, 1, 23, 30)
+    missing = ExperimentEventData(variant="A", conversion=False)
+    assert build_event_row(1, missing, NOW)["timestamp"] == NOW
+
+
+def test_sketch_day_follows_the_utc_date():
+    event = ExperimentEventData(variant="A", conversion=True, timestamp="2026-01-01T23:30:00-05:00", user_id="u1")
+    deltas = compute_sketch_deltas([build_event_row(1, event, NOW)])
+    assert [day for _, day in deltas] == [datetime(2026, 1, 2).date()]
+
+
+def stream(*chunks):
+    async def chunks_iterator():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [record async for record in iter_ndjson_stream(chunks_iterator(), max_line_bytes=64)]
+
+    return asyncio.run(collect())
+
+
+def variants(records):
+    return [(index, event.variant if event is not None else None, error) for index, event, error in records]
+
+
+def test_ndjson_stream_joins_lines_split_across_chunks():
+    records = stream(b'{"variant": "A", "conver', b'sion": true}\n{"variant": "B", ', b'"conversion": false}\n')
+    assert variants(records) == [(0, "A", None), (1, "B", None)]
+
+
+def test_ndjson_stream_reads_a_last_line_without_newline():
+    records = stream(b'{"variant": "A", "conversion": true}\n{"variant": "B", "conversion": false}')
+    assert variants(records) == [(0, "A", None), (1, "B", None)]
+
+
+def test_ndjson_stream_skips_blank_lines_but_counts_them():
+    records = stream(b'\n{"variant": "A", "conversion": true}\n', b"  \r\n\n", b'{"variant": "B", "conversion": false}\n\n')
+    assert [record for record in variants(records) if record[1] is not None] == [(1, "A", None), (4, "B", None)]
+    assert all(error is None for _, _, error in records)
+
+
+def test_ndjson_stream_rejects_long_lines_without_buffering_them():
+    long_line = b'{"variant": "' + b"x" * 100 + b'", "conversion": true}'
+    # Split over chunks, in one chunk, and as the unterminated last line.
+    records = stream(
+        long_line[:40], long_line[40:90], long_line[90:] + b'\n{"variant": "A", "conversion": true}\n',
+        long_line + b"\n", long_line,
+    )
+    assert variants(records) == [
+        (0, None, "Line exceeds 64 bytes"),
+        (1, "A", None),
+        (2, None, "Line exceeds 64 bytes"),
+        (3, None, "Line exceeds 64 bytes"),
+    ]
+
+
+def test_ndjson_stream_resumes_after_a_line_longer_than_many_chunks():
+    records = stream(*([b"x" * 50] * 1000), b'\n{"variant": "A", "conversion": true}\n')
+    assert variants(records) == [(0, None, "Line exceeds 64 bytes"), (1, "A", None)]
+
+
+@pytest.fixture
+def new_york_time(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_default_timestamp_is_the_utc_ingestion_time(new_york_time):
+    before = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert abs(datetime.now() - before) > timedelta(hours=3)
+    row = build_event_row(1, ExperimentEventData(variant="A", conversion=False), utc_now())
+    after = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert row["timestamp"].tzinfo is None
+    assert before <= row["timestamp"] <= after
@@ -0,0 +1,39 @@
+from sqlalchemy import create_engine, text
+from app.instrumentation.metrics import Histogram
+from app.instrumentation.profiler import profiling_requested
+from app.instrumentation.sql import RequestStats, current_request, instrument_engine
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, "/a")
+    assert histogram.samples() == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 4.25',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_queries_are_attributed_to_the_request_and_repeats_flagged():
+    engine = instrument_engine(create_engine("sqlite://"))
+    stats = RequestStats()
+    token = current_request.set(stats)
+    try:
+        with engine.connect() as connection:
+            for value in range(12):
+                connection.execute(text("SELECT :value"), {"value": value})
+            connection.execute(text("SELECT 1 + 1"))
+    finally:
+        current_request.reset(token)
+    assert stats.queries == 13
+    assert stats.repeated_selects(10) == [("SELECT ?", 12)]
+
+
+def test_profiling_requires_the_configured_token():
+    assert not profiling_requested("anything", "")
+    assert not profiling_requested(None, "secret")
+    assert not profiling_requested("guess", "secret")
+    assert profiling_requested("secret", "secret")
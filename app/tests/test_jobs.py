@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from app.analysis import jobs
+from app.analysis.jobs import CANCELLED, CANCELLING, PENDING, RUNNING, JobManager
+from app.api.schemas import BootstrapParams
+
+
+def blocking_execute(started: threading.Event, release: threading.Event):
+    # Stands in for an analysis that only notices cancellation once `release` is set.
+    def execute(job):
+        started.set()
+        job.cancel_event.wait(5)
+        release.wait(5)
+        return "v1", {"done": True}
+    return execute
+
+
+async def wait_until(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_cancelling_a_running_job_reports_cancelling_until_the_thread_stops(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    monkeypatch.setattr(jobs, "_execute", blocking_execute(started, release))
+
+    async def scenario():
+        manager = JobManager(workers=1, queue_size=10, cache_size=10)
+        job = manager.submit(1, "bootstrap", BootstrapParams(seed=1), "v1")
+        await wait_until(started.is_set)
+        assert job.status == RUNNING
+
+        returned = await manager.cancel(job.id, wait=0.05)
+        assert returned.status == CANCELLING and returned.finished_at is None
+
+        release.set()
+        await wait_until(lambda: job.finished_at is not None)
+        assert job.status == CANCELLED and job.result is None
+
+    asyncio.run(scenario())
+
+
+def test_cancel_returns_cancelled_when_the_job_stops_in_time(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    release.set()
+    monkeypatch.setattr(jobs, "_execute", blocking_execute(started, release))
+
+    async def scenario():
+        manager = JobManager(workers=1, queue_size=10, cache_size=10)
+        job = manager.submit(1, "bootstrap", BootstrapParams(seed=1), "v1")
+        await wait_until(started.is_set)
+        assert (await manager.cancel(job.id, wait=5)).status == CANCELLED
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_a_pending_job_is_immediate(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    monkeypatch.setattr(jobs, "_execute", blocking_execute(started, release))
+
+    async def scenario():
+        manager = JobManager(workers=1, queue_size=10, cache_size=10)
+        running = manager.submit(1, "bootstrap", BootstrapParams(seed=1), "v1")
+        pending = manager.submit(1, "bootstrap", BootstrapParams(seed=2), "v1")
+        await wait_until(started.is_set)
+        assert pending.status == PENDING
+
+        assert (await manager.cancel(pending.id, wait=0.05)).status == CANCELLED
+        release.set()
+        await manager.cancel(running.id)
+        await wait_until(lambda: running.finished_at is not None)
+
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+import io
+import json
+import logging
+from app.api.schemas import ExperimentVariantData
+from app.instrumentation.logs import configure_logging, log_payload, request_id, stop_logging
+
+
+class Recorder:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "recorded"
+
+
+def test_records_are_formatted_off_thread_with_request_id():
+    stream = io.StringIO()
+    configure_logging("INFO", "tests.quiet=WARNING", "json", stream=stream)
+    try:
+        logger = logging.getLogger("tests.logging")
+        recorder = Recorder()
+        token = request_id.set("req-1")
+        logger.info("value %s", recorder, extra={"rows": 3})
+        logging.getLogger("tests.quiet").info("dropped by level")
+        request_id.reset(token)
+    finally:
+        stop_logging()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert recorder.formatted == 1
+    assert [(line["message"], line["request_id"], line["rows"]) for line in lines] == [("value recorded", "req-1", 3)]
+
+
+def test_payload_logging_is_sampled_and_truncated(caplog):
+    logger = logging.getLogger("tests.payload")
+    payload = ExperimentVariantData(variant="A" * 40, conversion=True, revenue=1.0)
+    with caplog.at_level(logging.DEBUG, logger="tests.payload"):
+        assert not log_payload(logger, "event", payload, sample_rate=0.0)
+        assert log_payload(logger, "event", payload, sample_rate=1.0, max_bytes=20)
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().startswith('Payload event: {"variant": "AAAAAAA... (')
@@ -0,0 +1,230 @@
+import re
+from datetime import date, datetime
+from unittest.mock import MagicMock
+import pytest
+from app.db import partitions
+from app.db.partitions import (
+    add_months,
+    apply_retention,
+    convert_table,
+    create_partition,
+    ensure_partitions,
+    partition_name,
+)
+
+INDEX_DEFINITION = (
+    "CREATE INDEX ix_experiment_data_experiment_id_variant "
+    "ON public.experiment_data USING btree (experiment_id, variant)"
+)
+
+
+def default_partition_exists(params):
+    return "experiment_data_default" if params["name"] == "experiment_data_default" else None
+
+
+class Scalars(list):
+    def all(self):
+        return list(self)
+
+
+class FakeConnection:
+    """
+    Records the SQL sent to it and answers catalog queries from `answers`.
+
+    `answers` maps a regular expression to the value a matching statement
+    returns; the first match wins and unmatched statements return None.
+    """
+
+    def __init__(self, answers=None, rowcount=0):
+        self.answers = list((answers or {}).items())
+        self.rowcount = rowcount
+        self.log = []
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.log.append((sql, params))
+        value = next((value for pattern, value in self.answers if re.search(pattern, sql)), None)
+        if callable(value):
+            value = value(params)
+        result = MagicMock()
+        result.scalar.return_value = value
+        rows = value if isinstance(value, list) else []
+        result.all.return_value = rows
+        result.scalars.return_value = Scalars(rows)
+        result.rowcount = self.rowcount
+        return result
+
+    def commit(self):
+        self.log.append(("COMMIT", None))
+
+    @property
+    def statements(self):
+        return [sql for sql, _ in self.log]
+
+    def ddl(self):
+        return [sql for sql in self.statements if not sql.startswith("SELECT")]
+
+
+def test_months_roll_over_year_boundaries():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name(date(2027, 3, 1)) == "experiment_data_p2027_03"
+
+
+def test_create_partition_moves_default_rows_then_attaches_the_month():
+    conn = FakeConnection({
+        r"to_regclass\(:name\)": default_partition_exists,
+    })
+    assert create_partition(conn, date(2026, 2, 17)) is True
+
+    assert conn.ddl() == [
+        "CREATE TABLE experiment_data_p2026_02 (LIKE experiment_data INCLUDING DEFAULTS)",
+        "WITH moved AS (DELETE FROM experiment_data_default "
+        "WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+        "INSERT INTO experiment_data_p2026_02 SELECT * FROM moved",
+        "ALTER TABLE experiment_data ATTACH PARTITION experiment_data_p2026_02 "
+        "FOR VALUES FROM ('2026-02-01T00:00:00') TO ('2026-03-01T00:00:00')",
+    ]
+    moved_params = conn.log[-2][1]
+    assert moved_params == {"start": datetime(2026, 2, 1), "end": datetime(2026, 3, 1)}
+
+
+def test_existing_partition_is_left_alone():
+    conn = FakeConnection({r"to_regclass\(:name\)": "experiment_data_p2026_02"})
+    assert create_partition(conn, date(2026, 2, 1)) is False
+    assert conn.ddl() == []
+
+
+def test_ensure_partitions_covers_first_month_through_months_ahead():
+    conn = FakeConnection()
+    created = ensure_partitions(conn, months_ahead=2, first_month=date(2026, 10, 3), now=datetime(2026, 11, 15))
+    assert created == [
+        "experiment_data_p2026_10", "experiment_data_p2026_11", "experiment_data_p2026_12", "experiment_data_p2027_01",
+    ]
+
+
+@pytest.fixture
+def retention_calls(monkeypatch):
+    calls = []
+    stats = {
+        (1, "A"): {field: 1 for field in partitions.STAT_FIELDS},
+        (2, "B"): {field: 2 for field in partitions.STAT_FIELDS},
+    }
+    monkeypatch.setattr(partitions, "aggregate_raw_variant_stats",
+                        lambda db, start, end: calls.append(("stats", start, end)) or stats)
+    monkeypatch.setattr(partitions, "apply_rollup_deltas",
+                        lambda db, experiment_id, deltas: calls.append(("rollups", experiment_id, deltas)))
+    monkeypatch.setattr(partitions, "delete_sketches", lambda db, start, end: calls.append(("sketches", start, end)))
+    monkeypatch.setattr(partitions, "drop_snapshots", lambda experiment_id: calls.append(("snapshots", experiment_id)))
+    return calls
+
+
+def retention_session():
+    return FakeConnection({
+        r"FROM pg_inherits": [
+            "experiment_data_p2026_03", "experiment_data_default",
+            "experiment_data_p2026_01", "experiment_data_p2026_02",
+        ],
+    })
+
+
+@pytest.mark.parametrize("drop, statement", [
+    (False, "ALTER TABLE experiment_data DETACH PARTITION {}"),
+    (True, "DROP TABLE {}"),
+])
+def test_retention_removes_months_that_ended_before_the_window(retention_calls, drop, statement):
+    db = retention_session()
+    # Keeping two whole months before May: March and April stay.
+    removed = apply_retention(db, retain_months=2, drop=drop, now=datetime(2026, 5, 10))
+
+    assert removed == ["experiment_data_p2026_01", "experiment_data_p2026_02"]
+    assert db.ddl() == [statement.format(name) for name in removed] + ["COMMIT"]
+    assert [call[1:] for call in retention_calls if call[0] == "stats"] == [
+        (datetime(2026, 1, 1), datetime(2026, 2, 1)),
+        (datetime(2026, 2, 1), datetime(2026, 3, 1)),
+    ]
+    rollups = [call for call in retention_calls if call[0] == "rollups"]
+    assert rollups[0] == ("rollups", 1, {"A": {field: -1 for field in partitions.STAT_FIELDS}})
+    assert [call[1] for call in rollups] == [1, 2, 1, 2]
+    assert ("sketches", date(2026, 1, 1), date(2026, 2, 1)) in retention_calls
+
+
+def test_retention_drops_snapshots_after_the_commit(retention_calls, monkeypatch):
+    db = retention_session()
+    events = []
+    monkeypatch.setattr(db, "commit", lambda: events.append("commit"))
+    monkeypatch.setattr(partitions, "drop_snapshots", lambda experiment_id: events.append(("snapshots", experiment_id)))
+
+    apply_retention(db, retain_months=2, now=datetime(2026, 5, 10))
+
+    assert events[0] == "commit"
+    assert sorted(events[1:]) == [("snapshots", 1), ("snapshots", 2)]
+
+
+def test_retention_without_old_partitions_touches_nothing(retention_calls):
+    db = retention_session()
+    assert apply_retention(db, retain_months=6, now=datetime(2026, 5, 10)) == []
+    assert db.ddl() == ["COMMIT"]
+    assert retention_calls == []
+
+
+def catalog(partitioned):
+    return {
+        r"pg_partitioned_table": partitioned,
+        r"FROM pg_index": [("ix_experiment_data_experiment_id_variant", INDEX_DEFINITION)],
+        r"contype = 'p'": "experiment_data_pkey",
+        r"contype = 'f'": ["experiment_data_experiment_id_fkey"],
+        r"pg_get_serial_sequence": "public.experiment_data_id_seq",
+        r"SELECT min\(timestamp\)": datetime(2026, 1, 15, 8, 30),
+        r"to_regclass\(:name\)": default_partition_exists,
+    }
+
+
+def test_convert_to_partitioned_rebuilds_the_table_and_keeps_rows():
+    conn = FakeConnection(catalog(partitioned=False), rowcount=42)
+    copied = convert_table(conn, partitioned=True, months_ahead=1)
+
+    assert copied == 42
+    ddl = conn.ddl()
+    assert ddl[:4] == [
+        "DROP INDEX ix_experiment_data_experiment_id_variant",
+        "ALTER TABLE experiment_data RENAME TO experiment_data_unpartitioned",
+        "ALTER TABLE experiment_data_unpartitioned RENAME CONSTRAINT experiment_data_pkey "
+        "TO experiment_data_unpartitioned_pkey",
+        "ALTER TABLE experiment_data_unpartitioned DROP CONSTRAINT experiment_data_experiment_id_fkey",
+    ]
+    assert ddl[4:9] == [
+        "CREATE TABLE experiment_data (LIKE experiment_data_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (timestamp)",
+        "ALTER TABLE experiment_data ADD PRIMARY KEY (id, timestamp)",
+        "ALTER TABLE experiment_data ADD FOREIGN KEY (experiment_id) REFERENCES experiment (id)",
+        INDEX_DEFINITION,
+        "ALTER SEQUENCE public.experiment_data_id_seq OWNED BY experiment_data.id",
+    ]
+    assert ddl[9] == "CREATE TABLE IF NOT EXISTS experiment_data_default PARTITION OF experiment_data DEFAULT"
+    attached = [re.search(r"PARTITION (\w+) FOR", sql).group(1) for sql in ddl if "ATTACH PARTITION" in sql]
+    # From the oldest event's month through one month after the current one.
+    current = partitions.month_start(datetime.now())
+    assert attached[0] == "experiment_data_p2026_01"
+    assert attached[-1] == partition_name(add_months(current, 1))
+    assert ddl[-2:] == [
+        "INSERT INTO experiment_data SELECT * FROM experiment_data_unpartitioned",
+        "DROP TABLE experiment_data_unpartitioned",
+    ]
+
+
+def test_convert_back_to_plain_has_no_partitions():
+    conn = FakeConnection(catalog(partitioned=True), rowcount=7)
+    assert convert_table(conn, partitioned=False, months_ahead=1) == 7
+
+    ddl = conn.ddl()
+    assert "CREATE TABLE experiment_data (LIKE experiment_data_partitioned INCLUDING DEFAULTS)" in ddl
+    assert "ALTER TABLE experiment_data ADD PRIMARY KEY (id)" in ddl
+    assert not any("PARTITION" in sql for sql in ddl)
+    assert ddl[-1] == "DROP TABLE experiment_data_partitioned"
+
+
+def test_convert_is_a_no_op_when_the_layout_already_matches():
+    conn = FakeConnection(catalog(partitioned=True))
+    assert convert_table(conn, partitioned=True, months_ahead=1) == -1
+    assert conn.ddl() == []
@@ -0,0 +1,44 @@
+from datetime import datetime
+from app.db.aggregations import stats_to_metrics
+from app.db.rollups import compute_rollup_deltas
+
+
+def make_row(variant, conversion, revenue=0.0, engagement_minutes=0.0):
+    return {
+        "experiment_id": 1,
+        "variant": variant,
+        "timestamp": datetime(2025, 1, 1),
+        "conversion": conversion,
+        "revenue": revenue,
+        "engagement_minutes": engagement_minutes,
+    }
+
+
+def test_compute_rollup_deltas_sums_per_variant():
+    deltas = compute_rollup_deltas([
+        make_row("A", False),
+        make_row("B", True, revenue=100.0, engagement_minutes=5.0),
+        make_row("B", False, revenue=20.0, engagement_minutes=1.0),
+    ])
+
+    assert deltas["A"]["count"] == 1
+    assert deltas["A"]["conversions"] == 0
+    assert deltas["B"]["count"] == 2
+    assert deltas["B"]["conversions"] == 1
+    assert deltas["B"]["revenue_sum"] == 120.0
+    assert deltas["B"]["revenue_sq_sum"] == 100.0 ** 2 + 20.0 ** 2
+    assert deltas["B"]["engagement_sum"] == 6.0
+    assert deltas["B"]["engagement_sq_sum"] == 26.0
+
+
+def test_stats_to_metrics_matches_basic_metrics_shape():
+    deltas = compute_rollup_deltas([make_row("B", True, revenue=100.0, engagement_minutes=5.0)])
+
+    assert stats_to_metrics(deltas["B"]) == {
+        "total_revenue": 100.0,
+        "total_conversion": 1,
+        "total_entries": 1,
+        "total_engagement_minutes": 5.0,
+        "conversion_rate": 100.0,
+        "average_engagement_minutes": 5.0,
+    }
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.api.schemas import ExperimentVariantData
+from app.db import aggregations
+from app.db.aggregations import segment_stats_query
+
+
+def compile_sql(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_segment_keys_are_inlined_in_select_group_and_order():
+    sql = compile_sql(segment_stats_query(1, ["country", "device.type"], {"channel": "email"}))
+    assert sql.count("experiment_data.additional_data ->> 'country'") == 3
+    assert sql.count("experiment_data.additional_data ->> 'device.type'") == 3
+    assert "experiment_data.additional_data @> %(additional_data_1)s" in sql
+
+
+@pytest.mark.parametrize("key", ["coun'try", "a b", "", "x" * 65, "country\n", "k); DROP TABLE experiment; --", "été"])
+def test_invalid_segment_keys_are_rejected_before_sql_is_built(key, monkeypatch):
+    def no_sql(text):
+        raise AssertionError(f"SQL built for {text!r}")
+
+    monkeypatch.setattr(aggregations, "literal_column", no_sql)
+    with pytest.raises(ValueError, match="Invalid segment key"):
+        segment_stats_query(1, [key])
+    with pytest.raises(ValueError, match="Invalid segment key"):
+        segment_stats_query(1, ["country"], {key: "x"})
+
+
+@pytest.mark.parametrize("value, expected", [
+    ('{"country": "US"}', {"country": "US"}),
+    ('  {"country": "US", "visits": 2}', {"country": "US", "visits": 2}),
+    ({"country": "US"}, {"country": "US"}),
+    ("{not json", "{not json"),
+    ("plain note", "plain note"),
+    ('["US"]', '["US"]'),
+    (None, None),
+])
+def test_additional_data_json_strings_become_objects(value, expected):
+    event = ExperimentVariantData(variant="A", conversion=False, additional_data=value)
+    assert event.additional_data == expected
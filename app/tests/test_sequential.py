@@ -0,0 +1,45 @@
+import numpy as np
+from app.analysis.sequential import ACCEPT, CONTINUE, REJECT, decide, sequential_observations
+
+
+def running_stats():
+    return {
+        "count": 0, "conversions": 0, "revenue_sum": 0.0, "revenue_sq_sum": 0.0,
+        "engagement_sum": 0.0, "engagement_sq_sum": 0.0,
+    }
+
+
+def add_batch(stats, conversions, revenue):
+    stats["count"] += len(revenue)
+    stats["conversions"] += int(np.sum(conversions))
+    stats["revenue_sum"] += float(revenue.sum())
+    stats["revenue_sq_sum"] += float((revenue ** 2).sum())
+
+
+def peek_every_batch(rng, rates, batches=40, size=200):
+    variant_stats = {"A": running_stats(), "B": running_stats()}
+    running_p_value = 1.0
+    for _ in range(batches):
+        for variant, rate in zip("AB", rates):
+            add_batch(variant_stats[variant], rng.random(size) < rate, rng.exponential(10.0, size))
+        observation = sequential_observations(variant_stats, 0.05, 0.8)["observations"][("B", "conversion")]
+        running_p_value = min(running_p_value, observation["p_value"])
+    return running_p_value
+
+
+def test_running_p_value_controls_false_positives_under_continuous_peeking():
+    rng = np.random.default_rng(11)
+    rejections = sum(peek_every_batch(rng, (0.1, 0.1)) <= 0.05 for _ in range(100))
+    assert rejections <= 5
+
+
+def test_detects_a_real_difference():
+    rng = np.random.default_rng(12)
+    assert peek_every_batch(rng, (0.1, 0.14)) <= 0.05
+
+
+def test_decide():
+    assert decide(0.01, 0.05, 10, 10, 1000, 1000) == REJECT
+    assert decide(0.20, 0.05, 10, 10, 1000, 1000) == CONTINUE
+    assert decide(0.20, 0.05, 1000, 1200, 1000, 1000) == ACCEPT
+    assert decide(None, 0.05, 5000, 5000, None, None) == CONTINUE
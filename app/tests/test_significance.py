@@ -0,0 +1,78 @@
+import math
+import numpy as np
+from scipy import stats as sp_stats
+from app.analysis.significance import analyze_significance
+
+
+def sufficient_stats(conversions, revenue, engagement):
+    revenue = np.asarray(revenue, dtype=float)
+    engagement = np.asarray(engagement, dtype=float)
+    return {
+        "count": len(revenue),
+        "conversions": int(np.sum(conversions)),
+        "revenue_sum": float(revenue.sum()),
+        "revenue_sq_sum": float((revenue ** 2).sum()),
+        "engagement_sum": float(engagement.sum()),
+        "engagement_sq_sum": float((engagement ** 2).sum()),
+    }
+
+
+def make_variant_stats(seed=7):
+    rng = np.random.default_rng(seed)
+    variant_stats = {}
+    for variant, rate, scale in (("A", 0.10, 10.0), ("B", 0.12, 11.0), ("C", 0.09, 9.5)):
+        size = 2000
+        variant_stats[variant] = sufficient_stats(
+            rng.random(size) < rate,
+            rng.exponential(scale, size),
+            rng.normal(5.0, 2.0, size),
+        )
+    return variant_stats, rng
+
+
+def test_welch_t_test_matches_scipy():
+    variant_stats, _ = make_variant_stats()
+    result = analyze_significance(variant_stats, control="A")
+
+    for variant in ("B", "C"):
+        for metric, sum_field, sq_field in (
+            ("revenue", "revenue_sum", "revenue_sq_sum"),
+            ("engagement_minutes", "engagement_sum", "engagement_sq_sum"),
+        ):
+            def mean_std(stats):
+                n = stats["count"]
+                mean = stats[sum_field] / n
+                return mean, math.sqrt((stats[sq_field] - n * mean ** 2) / (n - 1)), n
+
+            expected = sp_stats.ttest_ind_from_stats(
+                *mean_std(variant_stats[variant]), *mean_std(variant_stats["A"]), equal_var=False
+            )
+            assert math.isclose(result["variants"][variant][metric]["statistic"], expected.statistic, rel_tol=1e-9)
+            assert math.isclose(result["variants"][variant][metric]["p_value"], expected.pvalue, rel_tol=1e-9)
+
+
+def test_two_proportion_z_test():
+    variant_stats = {
+        "control": {"count": 1000, "conversions": 100, "revenue_sum": 0.0, "revenue_sq_sum": 0.0, "engagement_sum": 0.0, "engagement_sq_sum": 0.0},
+        "treatment": {"count": 1000, "conversions": 130, "revenue_sum": 0.0, "revenue_sq_sum": 0.0, "engagement_sum": 0.0, "engagement_sq_sum": 0.0},
+    }
+    result = analyze_significance(variant_stats, control="control", alpha=0.05)
+    conversion = result["variants"]["treatment"]["conversion"]
+
+    pooled = 230 / 2000
+    z = (0.13 - 0.10) / math.sqrt(pooled * (1 - pooled) * (2 / 1000))
+    assert math.isclose(conversion["statistic"], z, rel_tol=1e-12)
+    assert math.isclose(conversion["p_value"], 2 * sp_stats.norm.sf(z), rel_tol=1e-9)
+    assert math.isclose(conversion["lift"], 0.3, rel_tol=1e-12)
+    assert conversion["significant"] is True
+    assert conversion["ci_lower"] < 0.03 < conversion["ci_upper"]
+    # Revenue has no variance at all, so its test is undefined rather than an error.
+    assert result["variants"]["treatment"]["revenue"]["p_value"] is None
+
+
+def test_control_defaults_to_first_variant_and_is_excluded():
+    variant_stats, _ = make_variant_stats()
+    result = analyze_significance(variant_stats)
+
+    assert result["control"] == "A"
+    assert set(result["variants"]) == {"B", "C"}
@@ -0,0 +1,165 @@
+import array
+import dataclasses
+import os
+import re
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.analysis.bootstrap import load_samples
+from app.db import snapshots
+
+
+def delta(rows):
+    groups = {}
+    for variant, event_id, conversion, revenue, engagement in rows:
+        columns = groups.setdefault(variant, {
+            "id": array.array("q"), "conversion": array.array("b"),
+            "revenue": array.array("d"), "engagement_minutes": array.array("d"),
+        })
+        columns["id"].append(event_id)
+        columns["conversion"].append(conversion)
+        columns["revenue"].append(revenue)
+        columns["engagement_minutes"].append(engagement)
+    return groups
+
+
+class FakeSession:
+    """
+    Serves the sample queries from a list of (variant, id, conversion, revenue, engagement) events.
+
+    Rows come back grouped in a case-insensitive order, like a database with a
+    linguistic collation, so "a" sorts before "B".
+    """
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.after_ids = []
+
+    def execute(self, stmt):
+        sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        match = re.search(r"experiment_data\.id > (\d+)", sql)
+        after_id = int(match.group(1)) if match else None
+        if after_id is not None:
+            self.after_ids.append(after_id)
+        rows = sorted(
+            (event for event in self.events if after_id is None or event[1] > after_id),
+            key=lambda event: (event[0].casefold(), event[1]),
+        )
+        if len(stmt.selected_columns) == 3:
+            return [(variant, revenue, engagement) for variant, _, _, revenue, engagement in rows]
+        return [(variant, event_id, bool(conversion), revenue, engagement)
+                for variant, event_id, conversion, revenue, engagement in rows]
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "settings", dataclasses.replace(snapshots.settings, snapshot_dir=str(tmp_path)))
+    return tmp_path
+
+
+def use_version(monkeypatch, version):
+    monkeypatch.setattr(snapshots, "get_data_version", lambda db, experiment_id: version)
+
+
+def version_dirs(root, experiment_id):
+    return sorted(name for name in os.listdir(root / str(experiment_id)) if not name.startswith("."))
+
+
+def test_appended_snapshot_keeps_variant_then_id_order(snapshot_dir):
+    first = snapshots.open_snapshot(snapshots._write_snapshot(7, "3:a", None, delta([
+        ("A", 1, 1, 10.0, 1.0), ("A", 3, 0, 30.0, 3.0), ("B", 2, 0, 20.0, 2.0),
+    ])))
+    assert first.variants == ["A", "B"] and first.max_id == 3
+    assert isinstance(first.columns["metrics"], np.memmap)
+
+    second = snapshots.open_snapshot(snapshots._write_snapshot(7, "6:b", first, delta([
+        ("A", 5, 1, 50.0, 5.0), ("B", 4, 1, 40.0, 4.0), ("C", 6, 0, 60.0, 6.0),
+    ])))
+    assert second.variants == ["A", "B", "C"]
+    assert second.offsets.tolist() == [0, 3, 5, 6]
+    assert second.columns["id"].tolist() == [1, 3, 5, 2, 4, 6]
+    assert second.columns["variant"].tolist() == [0, 0, 0, 1, 1, 2]
+    assert second.columns["conversion"].tolist() == [True, False, True, False, True, False]
+    samples = second.samples()
+    assert samples.values[0].tolist() == [10.0, 30.0, 50.0, 20.0, 40.0, 60.0]
+    assert samples.values[1].tolist() == [1.0, 3.0, 5.0, 2.0, 4.0, 6.0]
+
+
+def test_snapshot_samples_match_load_samples_across_collations(snapshot_dir, monkeypatch):
+    db = FakeSession([
+        ("a", 1, 1, 10.0, 1.0), ("B", 2, 0, 20.0, 2.0), ("a", 3, 0, 30.0, 3.0), ("_c", 4, 1, 40.0, 4.0),
+    ])
+    use_version(monkeypatch, "4:a")
+
+    expected = load_samples(db, 7)
+    actual = snapshots.get_snapshot(db, 7).samples()
+
+    assert expected.variants == actual.variants == ["B", "_c", "a"]
+    assert expected.offsets.tolist() == actual.offsets.tolist() == [0, 1, 2, 4]
+    np.testing.assert_array_equal(expected.values, actual.values)
+
+
+def test_get_snapshot_appends_rows_added_since_the_previous_version(snapshot_dir, monkeypatch):
+    db = FakeSession([("A", 1, 1, 10.0, 1.0), ("B", 2, 0, 20.0, 2.0)])
+    use_version(monkeypatch, "2:a")
+    first = snapshots.get_snapshot(db, 7)
+    assert first.max_id == 2
+
+    db.events += [("A", 3, 0, 30.0, 3.0), ("C", 4, 1, 40.0, 4.0)]
+    use_version(monkeypatch, "4:b")
+    second = snapshots.get_snapshot(db, 7)
+
+    assert db.after_ids == [0, 2]
+    assert second.data_version == "4:b"
+    assert second.variants == ["A", "B", "C"]
+    assert second.columns["id"].tolist() == [1, 3, 2, 4]
+    assert version_dirs(snapshot_dir, 7) == [os.path.basename(snapshots._version_dir(7, "4:b"))]
+
+    # The current version is served from disk without reading events.
+    assert snapshots.get_snapshot(db, 7).rows == 4
+    assert db.after_ids == [0, 2]
+
+
+def test_get_snapshot_rebuilds_when_an_append_would_miss_rows(snapshot_dir, monkeypatch):
+    db = FakeSession([("A", 1, 1, 10.0, 1.0), ("A", 3, 0, 30.0, 3.0)])
+    use_version(monkeypatch, "2:a")
+    snapshots.get_snapshot(db, 7)
+
+    # Id 2 committed after id 3, so reading above the previous maximum misses it.
+    db.events.append(("B", 2, 0, 20.0, 2.0))
+    use_version(monkeypatch, "3:b")
+    snapshot = snapshots.get_snapshot(db, 7)
+
+    assert db.after_ids == [0, 3, 0]
+    assert snapshot.rows == 3
+    assert snapshot.columns["id"].tolist() == [1, 3, 2]
+    assert version_dirs(snapshot_dir, 7) == [os.path.basename(snapshots._version_dir(7, "3:b"))]
+
+
+def test_get_snapshot_rebuilds_after_rows_are_removed(snapshot_dir, monkeypatch):
+    db = FakeSession([("A", 1, 1, 10.0, 1.0), ("A", 2, 0, 20.0, 2.0), ("B", 3, 0, 30.0, 3.0)])
+    use_version(monkeypatch, "3:a")
+    snapshots.get_snapshot(db, 7)
+
+    del db.events[0]
+    use_version(monkeypatch, "2:b")
+    snapshot = snapshots.get_snapshot(db, 7)
+
+    assert db.after_ids == [0, 0]
+    assert snapshot.columns["id"].tolist() == [2, 3]
+    np.testing.assert_array_equal(snapshot.samples().values, load_samples(db, 7).values)
+
+
+def test_remove_other_versions_keeps_only_the_published_one(snapshot_dir):
+    old = snapshots._write_snapshot(7, "1:a", None, delta([("A", 1, 1, 10.0, 1.0)]))
+    new = snapshots._write_snapshot(7, "2:b", None, delta([("A", 1, 1, 10.0, 1.0), ("A", 2, 0, 20.0, 2.0)]))
+    other = snapshots._write_snapshot(8, "1:a", None, delta([("A", 1, 1, 10.0, 1.0)]))
+    building = snapshot_dir / "7" / ".build-in-progress"
+    building.mkdir()
+
+    snapshots._remove_other_versions(7, new)
+
+    assert not os.path.exists(old)
+    assert version_dirs(snapshot_dir, 7) == [os.path.basename(new)]
+    # Another worker's staging directory and other experiments are left alone.
+    assert building.exists() and os.path.exists(other)
@@ -0,0 +1,72 @@
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.db.aggregations import TIMESERIES_BUCKETS, get_variant_timeseries, timeseries_query
+
+START = datetime(2026, 1, 1)
+END = datetime(2026, 1, 2)
+
+
+def compile_sql(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.parametrize("bucket", TIMESERIES_BUCKETS)
+def test_buckets_truncate_the_timestamp_in_select_group_and_order(bucket):
+    sql = compile_sql(timeseries_query(1, bucket))
+    truncated = f"date_trunc('{bucket}', experiment_data.timestamp)"
+    assert sql.count(truncated) == 3
+    assert sql.endswith(f"ORDER BY experiment_data.variant, {truncated}")
+
+
+def test_range_is_half_open_on_the_raw_timestamp():
+    sql = compile_sql(timeseries_query(1, "hour", start=START, end=END))
+    # An event at `end` belongs to the next range, so adjacent ranges never count it twice.
+    assert "experiment_data.timestamp >= '2026-01-01 00:00:00'" in sql
+    assert "experiment_data.timestamp < '2026-01-02 00:00:00'" in sql
+    assert "date_trunc('hour', experiment_data.timestamp) >=" not in sql
+
+
+def test_cumulative_sums_run_per_variant_in_bucket_order():
+    sql = compile_sql(timeseries_query(1, "day", cumulative=True))
+    window = "OVER (PARTITION BY experiment_data.variant ORDER BY date_trunc('day', experiment_data.timestamp))"
+    assert sql.count(window) == 3
+
+
+def test_unknown_bucket_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported bucket"):
+        timeseries_query(1, "week'); --")
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, stmt):
+        return iter(self.rows)
+
+
+def test_buckets_without_events_are_omitted():
+    rows = [
+        ("A", datetime(2026, 1, 1, 0), 2, 1, 10.0),
+        # No A events in the 01:00 bucket.
+        ("A", datetime(2026, 1, 1, 2), 1, 0, 0.0),
+        ("B", datetime(2026, 1, 1, 1), 4, 1, 5.5),
+    ]
+    series = get_variant_timeseries(FakeSession(rows), 1, "hour", START, END)
+
+    assert [point["bucket"] for point in series["A"]] == [datetime(2026, 1, 1, 0), datetime(2026, 1, 1, 2)]
+    assert series["A"][0] == {
+        "bucket": datetime(2026, 1, 1, 0), "count": 2, "conversions": 1, "revenue": 10.0, "conversion_rate": 50.0,
+    }
+    assert series["B"][0]["conversion_rate"] == 25.0
+    assert get_variant_timeseries(FakeSession([]), 1, "hour", START, END) == {}
+
+
+def test_cumulative_window_sums_are_converted_from_numeric():
+    rows = [("A", datetime(2026, 1, 1), Decimal(3), Decimal(1), Decimal("12.50"))]
+    point = get_variant_timeseries(FakeSession(rows), 1, "day", cumulative=True)["A"][0]
+    assert (point["count"], point["conversions"], point["revenue"]) == (3, 1, 12.5)
+    assert all(type(point[field]) is int for field in ("count", "conversions"))
+    assert type(point["revenue"]) is float
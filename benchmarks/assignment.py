@@ -0,0 +1,135 @@
+"""
+Throughput benchmark of variant assignment.
+
+Measures the hashing alone (AssignmentConfig.assign and assign_many, in
+process) and then the HTTP endpoints. The HTTP part drives the app in process
+through httpx's ASGI transport, or a running server with --url, with a fixed
+number of concurrent clients. In process, the experiment's config is put in
+the snapshot directly, so nothing touches the database.
+
+Usage:
+    python benchmarks/assignment.py --users 1000000
+    python benchmarks/assignment.py --url http://localhost:8000 --experiment-id 1 --requests 20000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.assignment import AssignmentConfig
+
+BENCHMARK_EXPERIMENT_ID = 1
+WEIGHTS = {"A": 50.0, "B": 25.0, "C": 25.0}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure_hashing(users):
+    config = AssignmentConfig(BENCHMARK_EXPERIMENT_ID, "benchmark-salt", WEIGHTS)
+    user_ids = [f"user-{index}" for index in range(users)]
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        config.assign(user_id)
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    config.assign_many(user_ids)
+    batch = time.perf_counter() - started
+    return {
+        "users": users,
+        "assign_per_sec": round(users / single),
+        "assign_us": round(single / users * 1e6, 3),
+        "assign_many_per_sec": round(users / batch),
+    }
+
+
+async def run_http(client, experiment_id, total_requests, concurrency, batch_size):
+    latencies = []
+    counter = iter(range(total_requests))
+
+    async def worker():
+        for index in counter:
+            started = time.perf_counter()
+            if batch_size:
+                user_ids = [f"user-{index}-{offset}" for offset in range(batch_size)]
+                response = await client.post(f"/experiment/{experiment_id}/assign:batch", json={"user_ids": user_ids})
+            else:
+                response = await client.get(f"/experiment/{experiment_id}/assign", params={"user_id": f"user-{index}"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total_requests,
+        "batch_size": batch_size or 1,
+        "requests_per_sec": round(total_requests / elapsed),
+        "users_per_sec": round(total_requests * (batch_size or 1) / elapsed),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def measure_http(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=httpx.Limits(max_connections=args.concurrency))
+        experiment_id = args.experiment_id
+    else:
+        from app.api.assignment import assignment_service
+        from app.api.routes import app as routes_app
+        from fastapi import FastAPI
+
+        app = FastAPI()
+        app.include_router(routes_app)
+        # Fill the snapshot directly instead of loading it from the database.
+        assignment_service._configs = {
+            BENCHMARK_EXPERIMENT_ID: AssignmentConfig(BENCHMARK_EXPERIMENT_ID, "benchmark-salt", WEIGHTS),
+        }
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+        experiment_id = BENCHMARK_EXPERIMENT_ID
+    async with client:
+        single = await run_http(client, experiment_id, args.requests, args.concurrency, 0)
+        batch = await run_http(client, experiment_id, max(1, args.requests // 100), args.concurrency, args.batch_size)
+    return {"single": single, "batch": batch}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000, help="Users hashed in the in-process measurement")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--url", default=None, help="Benchmark a running server instead of the app in process")
+    parser.add_argument("--experiment-id", type=int, default=BENCHMARK_EXPERIMENT_ID, help="Experiment to use with --url")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {"hashing": measure_hashing(args.users), "http": asyncio.run(measure_http(args))}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    hashing = results["hashing"]
+    print(f"hashing: {hashing['assign_per_sec']:,} assign/s ({hashing['assign_us']} us each), "
+          f"{hashing['assign_many_per_sec']:,} users/s batched")
+    for name, result in results["http"].items():
+        print(f"http {name:>6}: {result['requests_per_sec']:,} req/s, {result['users_per_sec']:,} users/s, "
+              f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
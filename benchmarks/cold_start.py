@@ -0,0 +1,126 @@
+"""
+Cold-start benchmark of an API worker.
+
+Measures, each in a fresh interpreter:
+  - import: the time to import app.main;
+  - live: from spawning uvicorn to the first 200 from GET /health/live;
+  - ready: from spawning uvicorn to the first 200 from GET /health/ready,
+    which needs a reachable database migrated to head;
+  - shutdown: from SIGTERM to the process exiting.
+
+With --workers above 1, live and ready are those of the first worker to
+answer. The database in DATABASE_URL must be migrated (`alembic upgrade head`)
+for the ready measurement to finish. With --max-ready-seconds the script exits
+with status 1 when the median time to ready exceeds it, which is how CI
+catches cold-start regressions.
+
+Usage:
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --workers 4 --max-ready-seconds 10 --json
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+POLL_INTERVAL = 0.02
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(client, path, started, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(POLL_INTERVAL)
+    return None
+
+
+def measure_server(port, workers, timeout):
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+               "--log-level", "warning"]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            deadline = started + timeout
+            live = wait_for(client, "/health/live", started, deadline)
+            ready = wait_for(client, "/health/ready", started, deadline) if live is not None else None
+    finally:
+        stopping = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return {"live": live, "ready": ready, "shutdown": time.perf_counter() - stopping}
+
+
+def summarize(values):
+    measured = [value for value in values if value is not None]
+    if not measured:
+        return {"median_s": None, "max_s": None, "failed": len(values)}
+    return {
+        "median_s": round(statistics.median(measured), 3),
+        "max_s": round(max(measured), 3),
+        "failed": len(values) - len(measured),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for a server to become ready")
+    parser.add_argument("--max-ready-seconds", type=float, default=None,
+                        help="Exit with status 1 if the median time to ready exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    servers = [measure_server(args.port, args.workers, args.timeout) for _ in range(args.runs)]
+    results = {
+        "runs": args.runs,
+        "workers": args.workers,
+        "import": summarize(imports),
+        **{phase: summarize([server[phase] for server in servers]) for phase in ("live", "ready", "shutdown")},
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for phase in ("import", "live", "ready", "shutdown"):
+            result = results[phase]
+            print(f"{phase:>8}: median {result['median_s']} s, max {result['max_s']} s"
+                  + (f", {result['failed']} failed" if result["failed"] else ""))
+
+    ready = results["ready"]
+    if ready["failed"]:
+        print(f"{ready['failed']} of {args.runs} runs never became ready", file=sys.stderr)
+        sys.exit(1)
+    if args.max_ready_seconds is not None and ready["median_s"] > args.max_ready_seconds:
+        print(f"Median time to ready {ready['median_s']} s exceeds {args.max_ready_seconds} s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
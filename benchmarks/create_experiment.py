@@ -0,0 +1,145 @@
+"""
+Benchmark of experiment creation: the previous commit/refresh/commit path against the single-transaction one.
+
+Both paths run in-process against DATABASE_URL, one experiment at a time,
+for experiments with an increasing number of variant rows. The previous path
+is reproduced here as it was: commit the experiment, refresh it, add the rows
+through the ORM, commit again and serialize the (now expired) objects. The
+SQL statements each path issues are counted with the app's instrumentation.
+
+Usage:
+    python benchmarks/create_experiment.py --variants 2 10 100 1000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.experiments import create_experiment_record
+from app.api.schemas import ExperimentCreate, ExperimentDataResponse, ExperimentResponse
+from app.db.base import SessionLocal, engine
+from app.db.ingest import build_event_row
+from app.db.models import Base, BaseExperiment, ExperimentData
+from app.db.rollups import apply_rollup_deltas, compute_rollup_deltas
+from app.db.user_sketches import apply_sketch_deltas, compute_sketch_deltas
+from app.instrumentation.sql import RequestStats, current_request
+
+EXPERIMENT_FIELDS = {
+    "name": "Create benchmark",
+    "description": "Synthetic experiment for the creation benchmark",
+    "goal_metric": "conversion_rate",
+    "experiment_type": "benchmark",
+    "desired_outcome": "n/a",
+    "null_hypothesis": "n/a",
+    "alternative_hypothesis": "n/a",
+    "sample_size_group_a": 1000,
+    "sample_size_group_b": 1000,
+    "significance_level": 0.05,
+    "power": 0.8,
+    "bias_control_method": "random_assignment",
+    "identified_confounders": "none",
+    "success_metrics": "conversion_rate",
+}
+
+
+def make_payload(variant_rows):
+    return ExperimentCreate(**EXPERIMENT_FIELDS, experiment_variants=[
+        {
+            "variant": f"V{index % 4}",
+            "conversion": index % 3 == 0,
+            "revenue": float(index % 50),
+            "engagement_minutes": 1.5,
+            "user_id": f"user-{index}",
+        }
+        for index in range(variant_rows)
+    ])
+
+
+def create_previous(db, experiment):
+    new_experiment = BaseExperiment(
+        name=experiment.name,
+        description=experiment.description,
+        goal_metric=experiment.goal_metric,
+        experiment_type=experiment.experiment_type,
+        created_at=datetime.now(),
+        updated_at=datetime.now()
+    )
+    db.add(new_experiment)
+    db.commit()
+    db.refresh(new_experiment)
+
+    now = datetime.now()
+    rows = [build_event_row(new_experiment.id, variant_data, now) for variant_data in experiment.experiment_variants]
+    experiment_data_entries = [ExperimentData(**row) for row in rows]
+    db.add_all(experiment_data_entries)
+    apply_rollup_deltas(db, new_experiment.id, compute_rollup_deltas(rows))
+    apply_sketch_deltas(db, new_experiment.id, compute_sketch_deltas(rows))
+    db.commit()
+    return {
+        "experiment": ExperimentResponse.model_validate(new_experiment),
+        "experiment_data": [ExperimentDataResponse.model_validate(data) for data in experiment_data_entries],
+    }
+
+
+def create_single_transaction(db, experiment):
+    return create_experiment_record(db, experiment)[0]
+
+
+def measure(create, payload, repeat):
+    latencies = []
+    queries = 0
+    for _ in range(repeat):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        db = SessionLocal()
+        started = time.perf_counter()
+        try:
+            create(db, payload)
+        finally:
+            latencies.append(time.perf_counter() - started)
+            db.close()
+            current_request.reset(token)
+        queries = stats.queries
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "queries": queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", type=int, nargs="+", default=[2, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    results = []
+    for variant_rows in args.variants:
+        payload = make_payload(variant_rows)
+        # Warm up connections and statement caches before timing.
+        measure(create_single_transaction, payload, 1)
+        previous = measure(create_previous, payload, args.repeat)
+        single = measure(create_single_transaction, payload, args.repeat)
+        results.append({"variants": variant_rows, "previous": previous, "single_transaction": single})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'variants':>8}{'previous p50 ms':>18}{'queries':>10}{'single-tx p50 ms':>19}{'queries':>10}{'speedup':>10}")
+    for result in results:
+        previous, single = result["previous"], result["single_transaction"]
+        speedup = previous["p50_ms"] / single["p50_ms"] if single["p50_ms"] else 0.0
+        print(f"{result['variants']:>8}{previous['p50_ms']:>18}{previous['queries']:>10}"
+              f"{single['p50_ms']:>19}{single['queries']:>10}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Load benchmark comparing the sync and async request paths.
+
+Starts one uvicorn server per DB_MODE (or targets servers you already run),
+creates an experiment on each, then drives the experiment and metrics GET
+endpoints with a fixed number of concurrent clients and reports throughput
+and latency percentiles.
+
+Usage:
+    python benchmarks/load_sync_vs_async.py --requests 5000 --concurrency 64
+    python benchmarks/load_sync_vs_async.py --sync-url http://localhost:8000 --async-url http://localhost:8001
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import httpx
+
+EXPERIMENT_PAYLOAD = {
+    "name": "Load benchmark",
+    "description": "Synthetic experiment for the sync/async load benchmark",
+    "goal_metric": "conversion_rate",
+    "experiment_type": "benchmark",
+    "desired_outcome": "n/a",
+    "null_hypothesis": "n/a",
+    "alternative_hypothesis": "n/a",
+    "sample_size_group_a": 1000,
+    "sample_size_group_b": 1000,
+    "significance_level": 0.05,
+    "power": 0.8,
+    "bias_control_method": "random_assignment",
+    "identified_confounders": "none",
+    "success_metrics": "conversion_rate",
+    "experiment_variants": [
+        {"variant": "A", "conversion": False, "revenue": 0.0, "engagement_minutes": 1.0},
+        {"variant": "B", "conversion": True, "revenue": 10.0, "engagement_minutes": 2.0},
+    ],
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+@contextmanager
+def uvicorn_server(mode, port, workers):
+    env = dict(os.environ, DB_MODE=mode)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{url}/").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline or process.poll() is not None:
+                raise RuntimeError(f"{mode} server did not start on port {port}")
+            time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+async def run_load(base_url, total_requests, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        response = await client.post("/experiment/", json=EXPERIMENT_PAYLOAD)
+        response.raise_for_status()
+        experiment_id = response.json()["experiment"]["id"]
+        paths = [f"/experiment/{experiment_id}", f"/api/experiment/{experiment_id}/metrics/basic"]
+
+        latencies = []
+        errors = 0
+        remaining = iter(range(total_requests))
+
+        async def client_loop():
+            nonlocal errors
+            for request_number in remaining:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[request_number % len(paths)])
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per spawned server")
+    parser.add_argument("--sync-url", help="Use an already running sync server instead of spawning one")
+    parser.add_argument("--async-url", help="Use an already running async server instead of spawning one")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for mode, url, port in (("sync", args.sync_url, 8100), ("async", args.async_url, 8101)):
+        if url:
+            results[mode] = asyncio.run(run_load(url, args.requests, args.concurrency))
+        else:
+            with uvicorn_server(mode, port, args.workers) as spawned_url:
+                results[mode] = asyncio.run(run_load(spawned_url, args.requests, args.concurrency))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "errors")
+    print(f"{'mode':<6}" + "".join(f"{column:>16}" for column in columns))
+    for mode, result in results.items():
+        print(f"{mode:<6}" + "".join(f"{result[column]:>16}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""
+Reproducible performance benchmark suite of the API, with JSON baselines.
+
+`run` creates synthetic experiments (see benchmarks/synthetic.py), bulk
+ingests their events and then drives each endpoint group with a fixed
+number of concurrent clients:
+  - create: POST /experiment/
+  - ingest: POST /experiment/{id}/events:bulk, NDJSON batches
+  - metrics_basic, metrics_significance, metrics_sequential, metrics_segments
+  - export: GET /experiment/{id}/events:export?format=ndjson
+  - analysis_bootstrap: GET /api/experiment/{id}/metrics/bootstrap
+  - analysis_job: POST /experiment/{id}/analyses, polled until finished
+For each it reports throughput (requests/s and, for ingest and export,
+events/s), p50/p99 latency, errors and the peak RSS of the server and its
+child processes (including the bootstrap process pool) during the phase,
+sampled from /proc (Linux only).
+
+By default a single-worker uvicorn server is started against DATABASE_URL,
+with the response cache off so every request reaches the database. The
+database must be PostgreSQL migrated to head (`alembic upgrade head`); the
+app relies on PostgreSQL features, so SQLite cannot stand in. Use --url to
+target a server you already run (add --pid to sample its RSS).
+
+`compare` checks a run against a baseline and exits with status 1 when a
+metric regresses by more than --threshold: throughput lower, or latency or
+RSS higher. `run --baseline` does the same right after running.
+
+Usage:
+    python benchmarks/suite.py run --output benchmarks/baselines/local.json
+    python benchmarks/suite.py run --experiments 5 --variants 3 --events-per-variant 20000 --revenue pareto --revenue-skew 1.5
+    python benchmarks/suite.py run --baseline benchmarks/baselines/local.json --threshold 0.15
+    python benchmarks/suite.py compare benchmarks/baselines/local.json current.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import cycle
+
+import httpx
+
+from synthetic import REVENUE_DISTRIBUTIONS, experiment_payload, generate_events, to_ndjson
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Direction of each reported metric: a regression is a drop for "higher" and a rise for "lower".
+METRIC_DIRECTIONS = {
+    "requests_per_sec": "higher",
+    "events_per_sec": "higher",
+    "p50_ms": "lower",
+    "p99_ms": "lower",
+    "peak_rss_mb": "lower",
+}
+
+# Read-only phases: name -> path template, driven round-robin over the experiments.
+READ_PHASES = {
+    "metrics_basic": "/api/experiment/{id}/metrics/basic",
+    "metrics_significance": "/api/experiment/{id}/metrics/significance",
+    "metrics_sequential": "/api/experiment/{id}/metrics/sequential",
+    "metrics_segments": "/api/experiment/{id}/metrics/segments?by=country",
+}
+
+# Latencies at or below this many milliseconds are noise; they are not compared.
+MIN_COMPARED_MS = 1.0
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def read_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def child_pids(pid):
+    """
+    Returns the direct children of a process.
+
+    Reads /proc/<pid>/task/*/children, or scans the parent pids in
+    /proc/*/stat on kernels built without that file.
+    """
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return []
+    children = []
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as listing:
+                children.extend(int(child) for child in listing.read().split())
+        except FileNotFoundError:
+            break
+        except OSError:
+            continue
+    else:
+        return children
+
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The parent pid is the second field after the parenthesized command name.
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == pid:
+            children.append(int(entry))
+    return children
+
+
+def process_tree(pid):
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        pending.extend(child_pids(current))
+    return pids
+
+
+def read_tree_rss_mb(pid):
+    """
+    Sums the resident set size of a process and all its descendants, e.g. the bootstrap process pool.
+
+    Pages shared between the processes are counted once per process, so this
+    overstates the memory actually used; it is consistent between runs, which
+    is what the regression check needs.
+    """
+    root = read_rss_mb(pid)
+    if root is None:
+        return None
+    return root + sum(read_rss_mb(child) or 0.0 for child in process_tree(pid)[1:])
+
+
+class RssSampler:
+    """
+    Samples the resident set size of a process tree in a background thread and keeps the peak.
+    """
+
+    def __init__(self, pid, interval=0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.pid is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            rss = read_tree_rss_mb(self.pid)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            if self._stop.wait(self.interval):
+                return
+
+
+@contextmanager
+def uvicorn_server(port):
+    env = dict(os.environ, RESPONSE_CACHE_TTL="0", LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                response = httpx.get(f"{url}/health/ready")
+                if response.status_code == 200:
+                    break
+            except httpx.TransportError:
+                response = None
+            if time.monotonic() > deadline or process.poll() is not None:
+                detail = response.text if response is not None else "no answer"
+                raise RuntimeError(f"Server did not become ready on port {port}: {detail}")
+            time.sleep(0.1)
+        yield url, process.pid
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def drive(pid, requests, concurrency, send):
+    """
+    Runs `send(index)` for every index with `concurrency` clients; returns latencies, errors and peak RSS.
+
+    `send` returns the number of events it moved, or None.
+    """
+    latencies = []
+    errors = []
+    moved = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal moved
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                moved += await send(index) or 0
+            except (httpx.HTTPError, RuntimeError) as exc:
+                errors.append(str(exc)[:200])
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    with RssSampler(pid) as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        "requests": requests,
+        "errors": len(errors),
+        "requests_per_sec": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "peak_rss_mb": round(rss.peak, 1) if rss.peak is not None else None,
+    }
+    if moved:
+        result["events_per_sec"] = round(moved / elapsed, 1)
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def checked(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: {response.status_code} {response.text[:200]}")
+    return response
+
+
+async def run_suite(client, pid, args):
+    results = {}
+    experiment_ids = []
+
+    async def create(index):
+        payload = experiment_payload(index, args.variants, args.events_per_variant)
+        response = checked(await client.post("/experiment/", json=payload))
+        experiment_ids.append(response.json()["experiment"]["id"])
+
+    results["create"] = await drive(pid, args.experiments, args.concurrency, create)
+    if not experiment_ids:
+        return results
+
+    # Generated up front, so generation is not part of the ingest timings.
+    batches = []
+    for position, experiment_id in enumerate(experiment_ids):
+        events = generate_events(
+            args.seed + position, args.variants, args.events_per_variant, revenue=args.revenue,
+            revenue_skew=args.revenue_skew,
+        )
+        for start in range(0, len(events), args.batch_size):
+            chunk = events[start:start + args.batch_size]
+            batches.append((experiment_id, len(chunk), to_ndjson(chunk)))
+
+    async def ingest(index):
+        experiment_id, count, body = batches[index]
+        response = checked(await client.post(
+            f"/experiment/{experiment_id}/events:bulk", content=body,
+            headers={"content-type": "application/x-ndjson"},
+        ))
+        return response.json().get("inserted", count)
+
+    results["ingest"] = await drive(pid, len(batches), args.concurrency, ingest)
+
+    ids = cycle(experiment_ids)
+    for phase, template in READ_PHASES.items():
+        async def read(index, template=template):
+            checked(await client.get(template.format(id=next(ids))))
+        results[phase] = await drive(pid, args.requests, args.concurrency, read)
+
+    async def export(index):
+        experiment_id = experiment_ids[index % len(experiment_ids)]
+        rows = 0
+        async with client.stream("GET", f"/experiment/{experiment_id}/events:export", params={"format": "ndjson"}) as response:
+            checked(response)
+            async for line in response.aiter_lines():
+                rows += bool(line)
+        return rows
+
+    results["export"] = await drive(pid, len(experiment_ids) * args.export_rounds, args.concurrency, export)
+
+    async def bootstrap(index):
+        checked(await client.get(
+            f"/api/experiment/{next(ids)}/metrics/bootstrap", params={"resamples": args.resamples, "seed": index},
+        ))
+
+    results["analysis_bootstrap"] = await drive(pid, args.analysis_requests, args.concurrency, bootstrap)
+
+    async def analysis_job(index):
+        experiment_id = next(ids)
+        # A new seed each time, so the job is not answered from the result cache.
+        job = checked(await client.post(f"/experiment/{experiment_id}/analyses", json={
+            "kind": "bootstrap", "params": {"resamples": args.resamples, "seed": 1_000_000 + index},
+        })).json()
+        while job["status"] in ("pending", "running"):
+            await asyncio.sleep(0.01)
+            job = checked(await client.get(f"/experiment/{experiment_id}/analyses/{job['job_id']}")).json()
+        if job["status"] != "succeeded":
+            raise RuntimeError(f"Analysis {job['job_id']} {job['status']}: {job.get('error')}")
+
+    results["analysis_job"] = await drive(pid, args.analysis_requests, args.concurrency, analysis_job)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, threshold):
+    """
+    Compares every metric of `current` with `baseline`.
+
+    Args:
+        baseline (dict): A saved run.
+        current (dict): The run to check.
+        threshold (float): Largest accepted relative change in the bad direction, e.g. 0.1 for 10%.
+
+    Returns:
+        List[dict]: One row per metric present in both, with the relative change and whether it regressed.
+    """
+    rows = []
+    for phase, base_metrics in baseline["results"].items():
+        metrics = current["results"].get(phase)
+        if metrics is None:
+            continue
+        for metric, direction in METRIC_DIRECTIONS.items():
+            before, after = base_metrics.get(metric), metrics.get(metric)
+            if before is None or after is None or before == 0:
+                continue
+            if metric.endswith("_ms") and max(before, after) <= MIN_COMPARED_MS:
+                continue
+            change = (after - before) / before
+            worse = -change if direction == "higher" else change
+            rows.append({
+                "phase": phase, "metric": metric, "baseline": before, "current": after,
+                "change": round(change, 4), "regressed": worse > threshold,
+            })
+        if metrics.get("errors", 0) > base_metrics.get("errors", 0):
+            rows.append({
+                "phase": phase, "metric": "errors", "baseline": base_metrics.get("errors", 0),
+                "current": metrics["errors"], "change": None, "regressed": True,
+            })
+    return rows
+
+
+def print_comparison(rows, threshold):
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "n/a"
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(f"{row['phase']:>22} {row['metric']:>16}: {row['baseline']:>12} -> {row['current']:>12} {change:>8} {flag}")
+    regressions = [row for row in rows if row["regressed"]]
+    print(f"{len(regressions)} of {len(rows)} metrics regressed by more than {threshold:.0%}")
+    return not regressions
+
+
+def print_results(results):
+    for phase, result in results.items():
+        events = f", {result['events_per_sec']:,} events/s" if "events_per_sec" in result else ""
+        rss = f", peak RSS {result['peak_rss_mb']} MB" if result["peak_rss_mb"] is not None else ""
+        errors = f", {result['errors']} errors" if result["errors"] else ""
+        print(f"{phase:>22}: {result['requests_per_sec']:,} req/s{events}, "
+              f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms{rss}{errors}")
+
+
+def command_run(args):
+    config = {
+        name: getattr(args, name)
+        for name in ("experiments", "variants", "events_per_variant", "revenue", "revenue_skew", "batch_size",
+                     "requests", "analysis_requests", "resamples", "export_rounds", "concurrency", "seed")
+    }
+
+    async def run():
+        if args.url:
+            async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+                return await run_suite(client, args.pid, args)
+        with uvicorn_server(args.port) as (url, pid):
+            async with httpx.AsyncClient(base_url=url, timeout=args.timeout) as client:
+                return await run_suite(client, pid, args)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": asyncio.run(run()),
+    }
+    print_results(report["results"])
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Saved to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            if not print_comparison(compare(json.load(baseline), report, args.threshold), args.threshold):
+                sys.exit(1)
+
+
+def command_compare(args):
+    with open(args.baseline) as baseline, open(args.current) as current:
+        baseline, current = json.load(baseline), json.load(current)
+    if baseline.get("config") != current.get("config"):
+        print("Warning: the runs used different configurations", file=sys.stderr)
+    if not print_comparison(compare(baseline, current, args.threshold), args.threshold):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the suite")
+    run.add_argument("--experiments", type=int, default=4)
+    run.add_argument("--variants", type=int, default=2)
+    run.add_argument("--events-per-variant", type=int, default=10_000)
+    run.add_argument("--revenue", choices=REVENUE_DISTRIBUTIONS, default="lognormal")
+    run.add_argument("--revenue-skew", type=float, default=1.0, help="Lognormal sigma or Pareto shape")
+    run.add_argument("--batch-size", type=int, default=5000, help="Events per ingestion request")
+    run.add_argument("--requests", type=int, default=500, help="Requests per metrics phase")
+    run.add_argument("--analysis-requests", type=int, default=20, help="Requests per analysis phase")
+    run.add_argument("--resamples", type=int, default=1000, help="Bootstrap resamples per analysis")
+    run.add_argument("--export-rounds", type=int, default=2, help="Full exports of each experiment")
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--port", type=int, default=8766)
+    run.add_argument("--timeout", type=float, default=120.0, help="Seconds before a request fails")
+    run.add_argument("--url", default=None, help="Benchmark a running server instead of starting one")
+    run.add_argument("--pid", type=int, default=None, help="Process id of the --url server, to sample its RSS")
+    run.add_argument("--output", default=None, help="Save the results as JSON, e.g. to use as a baseline")
+    run.add_argument("--baseline", default=None, help="Compare with this saved run and fail on regressions")
+    run.add_argument("--threshold", type=float, default=0.10, help="Accepted relative regression")
+    run.set_defaults(handler=command_run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two saved runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Accepted relative regression")
+    compare_parser.set_defaults(handler=command_compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Synthetic experiment and event generator for the benchmarks.
+
+Events are drawn per variant with NumPy from a fixed seed and end at the
+start of the current UTC day, so the same arguments produce the same data
+all day. Each variant converts at the base rate times its lift; only
+converting events carry revenue, drawn from a right-skewed distribution:
+  - lognormal: exp(N(log(mean) - skew^2 / 2, skew)), the mean stays `mean`;
+  - pareto: classical Pareto with shape `skew` (heavier tails for smaller
+    values; the variance is infinite below 2), scaled to the same mean;
+  - normal: N(mean, mean / 4) clipped at 0, for an unskewed comparison.
+Users are drawn from a pool per experiment, so per-user metrics see repeat
+events, and every event carries `country` and `device` segment attributes.
+
+Usage:
+    python benchmarks/synthetic.py --variants 3 --events-per-variant 10000 > events.ndjson
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+REVENUE_DISTRIBUTIONS = ("lognormal", "pareto", "normal")
+COUNTRIES = ("US", "DE", "FR", "BR", "IN", "JP")
+COUNTRY_WEIGHTS = (0.4, 0.15, 0.1, 0.15, 0.15, 0.05)
+DEVICES = ("mobile", "desktop", "tablet")
+DEVICE_WEIGHTS = (0.6, 0.3, 0.1)
+
+
+def variant_names(count):
+    return [chr(ord("A") + index) if count <= 26 else f"V{index:03d}" for index in range(count)]
+
+
+def experiment_payload(index, variants, events_per_variant):
+    """
+    Returns the POST /experiment/ body of the index-th synthetic experiment.
+    """
+    return {
+        "name": f"Synthetic {index}",
+        "description": "Synthetic experiment generated for benchmarking",
+        "goal_metric": "conversion_rate",
+        "experiment_type": "benchmark",
+        "desired_outcome": "n/a",
+        "null_hypothesis": "n/a",
+        "alternative_hypothesis": "n/a",
+        "sample_size_group_a": events_per_variant,
+        "sample_size_group_b": events_per_variant,
+        "significance_level": 0.05,
+        "power": 0.8,
+        "bias_control_method": "random_assignment",
+        "identified_confounders": "none",
+        "success_metrics": "conversion_rate",
+        "experiment_variants": [
+            {"variant": variant, "conversion": False, "revenue": 0.0, "engagement_minutes": 0.0}
+            for variant in variant_names(variants)
+        ],
+    }
+
+
+def draw_revenue(rng, size, distribution, mean, skew):
+    if distribution == "lognormal":
+        return rng.lognormal(np.log(mean) - skew ** 2 / 2, skew, size)
+    if distribution == "pareto":
+        # numpy draws the Lomax distribution; 1 + Lomax is Pareto with minimum 1 and mean skew / (skew - 1).
+        scale = mean * (skew - 1) / skew if skew > 1 else mean
+        return (1 + rng.pareto(skew, size)) * scale
+    if distribution == "normal":
+        return np.maximum(rng.normal(mean, mean / 4, size), 0.0)
+    raise ValueError(f"Unknown revenue distribution: {distribution}")
+
+
+def generate_events(seed, variants, events_per_variant, conversion_rate=0.1, lift=0.05, revenue="lognormal",
+                    revenue_mean=20.0, revenue_skew=1.0, users=None, days=30, end=None):
+    """
+    Generates the events of one experiment, variant by variant.
+
+    Args:
+        seed: Seed of the random generator.
+        variants (int): Number of variants; the first is the control.
+        events_per_variant (int): Events drawn for each variant.
+        conversion_rate (float): Conversion rate of the control.
+        lift (float): Relative conversion lift added per variant after the control.
+        revenue (str): Revenue distribution, one of REVENUE_DISTRIBUTIONS.
+        revenue_mean (float): Mean revenue of a conversion.
+        revenue_skew (float): Lognormal sigma or Pareto shape.
+        users (Optional[int]): Size of the user pool; defaults to half the events of a variant.
+        days (int): Events are spread uniformly over this many days before `end`.
+        end (Optional[datetime]): Latest timestamp; defaults to the start of the current UTC day.
+
+    Returns:
+        List[dict]: Events in the shape accepted by the bulk ingestion endpoint.
+    """
+    rng = np.random.default_rng(seed)
+    users = users or max(1, events_per_variant // 2)
+    end = end or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    events = []
+    for index, variant in enumerate(variant_names(variants)):
+        size = events_per_variant
+        rate = min(1.0, conversion_rate * (1 + lift * index))
+        conversions = rng.random(size) < rate
+        revenues = np.where(conversions, draw_revenue(rng, size, revenue, revenue_mean, revenue_skew), 0.0)
+        engagement = rng.gamma(2.0, 3.0, size)
+        offsets = rng.integers(0, days * 86400, size)
+        user_ids = rng.integers(0, users, size)
+        countries = rng.choice(len(COUNTRIES), size, p=COUNTRY_WEIGHTS)
+        devices = rng.choice(len(DEVICES), size, p=DEVICE_WEIGHTS)
+        for row in range(size):
+            events.append({
+                "variant": variant,
+                "timestamp": (end - timedelta(seconds=int(offsets[row]))).isoformat(),
+                "conversion": bool(conversions[row]),
+                "revenue": round(float(revenues[row]), 2),
+                "engagement_minutes": round(float(engagement[row]), 2),
+                "user_id": f"user-{user_ids[row]}",
+                "additional_data": {"country": COUNTRIES[countries[row]], "device": DEVICES[devices[row]]},
+            })
+    return events
+
+
+def to_ndjson(events):
+    return "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in events).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", type=int, default=2)
+    parser.add_argument("--events-per-variant", type=int, default=1000)
+    parser.add_argument("--conversion-rate", type=float, default=0.1)
+    parser.add_argument("--lift", type=float, default=0.05)
+    parser.add_argument("--revenue", choices=REVENUE_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--revenue-mean", type=float, default=20.0)
+    parser.add_argument("--revenue-skew", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    events = generate_events(
+        args.seed, args.variants, args.events_per_variant, args.conversion_rate, args.lift,
+        args.revenue, args.revenue_mean, args.revenue_skew,
+    )
+    sys.stdout.buffer.write(to_ndjson(events))
+
+
+if __name__ == "__main__":
+    main()